@@ -0,0 +1,39 @@
+"""Compara dos archivos de resultados de benchmarks y marca las regresiones."""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comparar resultados de benchmarks")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Aumento relativo del tiempo mínimo considerado regresión")
+    args = parser.parse_args(argv)
+
+    base, new = load(args.base), load(args.new)
+    print(f"Base: {base['commit']}  Nuevo: {new['commit']}")
+    regressions = 0
+    for name, sizes in sorted(new["results"].items()):
+        for size, timing in sorted(sizes.items(), key=lambda item: int(item[0])):
+            old = base["results"].get(name, {}).get(size)
+            if old is None:
+                print(f"  {name:<22} {size:>9}  {timing['min']:.4f}s  (sin referencia)")
+                continue
+            ratio = timing["min"] / old["min"] if old["min"] > 0 else float("inf")
+            flag = ""
+            if ratio > 1 + args.threshold:
+                flag = "  REGRESIÓN"
+                regressions += 1
+            print(f"  {name:<22} {size:>9}  {old['min']:.4f}s -> {timing['min']:.4f}s  x{ratio:.2f}{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+class FakeTransport:
+    """Transporte sin red ni navegador: solo registra los mensajes enviados."""
+
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, phone, message, media_path=None):
+        self.sent += 1
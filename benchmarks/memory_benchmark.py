@@ -0,0 +1,81 @@
+"""Memoria de los clientes cargados en la interfaz: DataFrames completos frente a ClientStore.
+
+Uso:
+    python -m benchmarks.memory_benchmark --sizes 100000 1000000
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import tracemalloc
+
+from src.models.client_store import ClientStore
+from src.models.database import DatabaseManager
+from .synthetic_data import generate_clients
+
+FILTER = {"city": "Santiago"}
+
+
+def dataframe_bytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def measure(load):
+    # Memoria retenida por lo que devuelve load() y pico durante la carga (tracemalloc)
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak
+
+
+def run(size, tmp_dir):
+    db = DatabaseManager(os.path.join(tmp_dir, f"memoria_{size}.db"))
+    db.replace_clients(generate_clients(size))
+
+    # Forma actual: self.df y self.df_filtered como DataFrames de texto independientes
+    (df, df_filtered), peak_frames = measure(
+        lambda: (db.get_all_clients(), db.get_filtered_clients(**FILTER))
+    )
+    frames = dataframe_bytes(df) + dataframe_bytes(df_filtered)
+    del df, df_filtered
+
+    (store, view), peak_store = measure(
+        lambda: (lambda s: (s, s.filter(**FILTER)))(ClientStore.from_db(db))
+    )
+    compact = store.memory_usage() + store.all().memory_usage() + view.memory_usage()
+    return {
+        "filas": size,
+        "filtradas": len(view),
+        "dataframes_mb": frames / 1024 / 1024,
+        "client_store_mb": compact / 1024 / 1024,
+        "pico_dataframes_mb": peak_frames / 1024 / 1024,
+        "pico_client_store_mb": peak_store / 1024 / 1024,
+        "reduccion": frames / compact if compact else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memoria de clientes en la interfaz")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--output", help="Archivo JSON de resultados")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            result = run(size, tmp_dir)
+            results.append(result)
+            print(f"{size:>9} filas  DataFrames {result['dataframes_mb']:8.1f} MB  "
+                  f"ClientStore {result['client_store_mb']:8.1f} MB  (x{result['reduccion']:.1f})  "
+                  f"pico de carga {result['pico_dataframes_mb']:.0f} / {result['pico_client_store_mb']:.0f} MB",
+                  flush=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""Benchmarks de importación, filtrado, renderizado y envío.
+
+Uso:
+    python -m benchmarks.run_benchmarks --sizes 10000 100000
+    python -m benchmarks.compare benchmarks/results/<base>.json benchmarks/results/<nuevo>.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from src.models.database import DatabaseManager
+from src.models.client_store import ClientStore
+from src.models.exporter import DataExporter
+from src.controllers.recipient_sharding import shard_recipients
+from src.utils.rut import normalize_ruts
+from src.controllers.render_cache import RenderCache
+from src.utils.template_renderer import render_frame
+from .fake_transport import FakeTransport
+from .synthetic_data import ensure_workbook, ensure_source_folder, generate_clients
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+TEMPLATE_FILE = os.path.join(os.path.dirname(BENCH_DIR), "default_template.txt")
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+class BenchContext:
+    def __init__(self, size, workbook, tmp_dir):
+        self.size = size
+        self.workbook = workbook
+        self.tmp_dir = tmp_dir
+        self._loaded_db = None
+
+    def new_db(self, name):
+        path = os.path.join(self.tmp_dir, f"{name}_{self.size}.db")
+        if os.path.exists(path):
+            os.remove(path)
+        return DatabaseManager(path)
+
+    def loaded_db(self):
+        # Base con la planilla ya importada, compartida por los benchmarks de consulta
+        if self._loaded_db is None:
+            self._loaded_db = self.new_db("loaded")
+            ok, message = self._loaded_db.import_excel_to_db(self.workbook)
+            if not ok:
+                raise RuntimeError(message)
+        return self._loaded_db
+
+
+@benchmark("import_excel_to_db")
+def bench_import(ctx):
+    db = ctx.new_db("import")
+    return lambda: db.import_excel_to_db(ctx.workbook)
+
+
+@benchmark("import_sources")
+def bench_import_sources(ctx):
+    # La misma cantidad de filas en 4 planillas, leídas en paralelo (un proceso por archivo)
+    folder = ensure_source_folder(ctx.size, ctx.data_dir)
+    db = ctx.new_db("import_sources")
+    return lambda: db.import_sources_to_db([folder])
+
+
+@benchmark("import_sources_serial")
+def bench_import_sources_serial(ctx):
+    folder = ensure_source_folder(ctx.size, ctx.data_dir)
+    db = ctx.new_db("import_sources_serial")
+    return lambda: db.import_sources_to_db([folder], max_workers=1)
+
+
+@benchmark("get_filtered_clients")
+def bench_filtered(ctx):
+    db = ctx.loaded_db()
+    return lambda: db.get_filtered_clients(city="Santiago")
+
+
+@benchmark("client_store_filter")
+def bench_store_filter(ctx):
+    # Mismo filtro que get_filtered_clients, resuelto con los índices por valor del ClientStore
+    store = ClientStore.from_db(ctx.loaded_db())
+    return lambda: (store.filter(city="Santiago"), store.filter(city="Santiago", commune="Providencia"))
+
+
+@benchmark("get_unique_values")
+def bench_unique(ctx):
+    db = ctx.loaded_db()
+    return lambda: [db.get_unique_values(col) for col in ("ciudad", "comuna", "giro")]
+
+
+@benchmark("get_sent_phones")
+def bench_sent_phones(ctx):
+    db = ctx.new_db("history")
+    conn = db.get_connection()
+    conn.executemany(
+        "INSERT INTO historial_envios (razon_social, telefono, ciudad, resultado) VALUES (?, ?, ?, ?)",
+        ((f"Cliente {i}", f"+569{i % 100_000_000:08d}", "Santiago", "Éxito" if i % 2 else "Error")
+         for i in range(ctx.size))
+    )
+    conn.commit()
+    conn.close()
+    return db.get_sent_phones
+
+
+@benchmark("delete_history_records")
+def bench_delete_history(ctx):
+    # Eliminar todo el historial (tabla temporal de ids y copia para deshacer) y deshacerlo
+    db = ctx.new_db("delete_history")
+    conn = db.get_connection()
+    conn.executemany(
+        "INSERT INTO historial_envios (razon_social, telefono, ciudad, resultado) VALUES (?, ?, ?, ?)",
+        ((f"Cliente {i}", f"+569{i % 100_000_000:08d}", "Santiago", "Éxito" if i % 2 else "Error")
+         for i in range(ctx.size))
+    )
+    conn.commit()
+    conn.close()
+    ids = list(range(1, ctx.size + 1))
+    return lambda: db.undo_history_deletion(db.delete_history_records(ids))
+
+
+@benchmark("render_template")
+def bench_render(ctx):
+    # Renderizado en lote de toda la lista, como en una campaña nueva (sin caché)
+    df = ctx.loaded_db().get_all_clients()
+    with open(TEMPLATE_FILE, encoding="utf-8") as f:
+        template = f.read()
+    return lambda: render_frame(template, df)
+
+
+@benchmark("render_template_cached")
+def bench_render_cached(ctx):
+    # Segunda lectura de la misma campaña (planificar y luego enviar): todo sale de la caché
+    db = ctx.loaded_db()
+    df = db.get_all_clients()
+    with open(TEMPLATE_FILE, encoding="utf-8") as f:
+        template = f.read()
+    cache = RenderCache(db)
+    cache.messages_for(template, df)
+    return lambda: cache.messages_for(template, df)
+
+
+@benchmark("normalize_ruts")
+def bench_ruts(ctx):
+    # Validación módulo 11 pura, sin pasar por Excel ni SQLite (objetivo: 1M RUT/s)
+    ruts = generate_clients(ctx.size)['RUT']
+    return lambda: normalize_ruts(ruts)
+
+
+@benchmark("shard_recipients")
+def bench_shard(ctx):
+    # Orden por ciudad y comuna y reparto de los grupos entre tres cuentas
+    df = generate_clients(ctx.size)
+    return lambda: shard_recipients(df, ("Ciudad", "Comuna"), ["cuenta1", "cuenta2", "cuenta3"])
+
+
+def export_benchmark(fmt):
+    def factory(ctx):
+        if fmt == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                return None
+        exporter = DataExporter(ctx.loaded_db())
+        path = os.path.join(ctx.tmp_dir, f"export_{ctx.size}.{fmt}")
+        return lambda: exporter.export("clientes", path, fmt)
+    return factory
+
+
+for _fmt in ("csv", "jsonl", "parquet"):
+    benchmark(f"export_{_fmt}")(export_benchmark(_fmt))
+
+
+@benchmark("sender_loop")
+def bench_sender(ctx):
+    from src.controllers.whatsapp_sender import WhatsAppSenderThread
+    df = ctx.loaded_db().get_all_clients().head(ctx.sender_rows)
+    with open(TEMPLATE_FILE, encoding="utf-8") as f:
+        template = f.read()
+
+    def run():
+        db = ctx.new_db("sender")
+        sender = WhatsAppSenderThread(
+            df, template, db, check_history=True,
+            transport=FakeTransport(), post_send_wait=0, delay_range=(0, 0)
+        )
+        # run() se ejecuta en el hilo actual: no hace falta un event loop de Qt
+        sender.run()
+    return run
+
+
+def time_callable(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "min": min(timings),
+        "mean": statistics.mean(timings),
+        "median": statistics.median(timings),
+        "repeat": repeat,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de NostraWhatsApp")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Ejecutar solo estos benchmarks")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sender-max-rows", type=int, default=10_000,
+                        help="Máximo de filas para el benchmark del ciclo de envío")
+    parser.add_argument("--data-dir", default=os.path.join(BENCH_DIR, "data"))
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto results/<commit>.json)")
+    args = parser.parse_args(argv)
+
+    commit = git_commit()
+    results = {}
+    names = args.only or list(BENCHMARKS)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            print(f"Preparando planilla de {size} filas...", flush=True)
+            ctx = BenchContext(size, ensure_workbook(size, args.data_dir), tmp_dir)
+            ctx.sender_rows = min(size, args.sender_max_rows)
+            ctx.data_dir = args.data_dir
+            for name in names:
+                func = BENCHMARKS[name](ctx)
+                if func is None:
+                    print(f"  {name:<22} omitido (dependencia opcional no instalada)", flush=True)
+                    continue
+                timing = time_callable(func, args.repeat)
+                rows = ctx.sender_rows if name == "sender_loop" else size
+                timing["rows"] = rows
+                timing["rows_per_second"] = rows / timing["min"] if timing["min"] > 0 else None
+                results.setdefault(name, {})[str(size)] = timing
+                print(f"  {name:<22} {size:>9} filas  min {timing['min']:.4f}s  mediana {timing['median']:.4f}s", flush=True)
+
+    output = args.output or os.path.join(BENCH_DIR, "results", f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    payload = {
+        "commit": commit,
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Generación de planillas sintéticas de clientes chilenos para los benchmarks."""
+import os
+import numpy as np
+import pandas as pd
+
+from src.utils.rut import compute_check_digits
+
+CITIES = {
+    'Santiago': ['Santiago', 'Providencia', 'Las Condes', 'Ñuñoa', 'Maipú', 'La Florida', 'Puente Alto'],
+    'Valparaíso': ['Valparaíso', 'Viña del Mar', 'Quilpué', 'Villa Alemana'],
+    'Concepción': ['Concepción', 'Talcahuano', 'San Pedro de la Paz', 'Chiguayante'],
+    'Antofagasta': ['Antofagasta', 'Mejillones', 'Taltal'],
+    'Temuco': ['Temuco', 'Padre Las Casas', 'Villarrica'],
+    'La Serena': ['La Serena', 'Coquimbo', 'Ovalle'],
+    'Rancagua': ['Rancagua', 'Machalí', 'Graneros'],
+    'Puerto Montt': ['Puerto Montt', 'Puerto Varas', 'Osorno'],
+}
+GIROS = [
+    'Ferretería', 'Construcción', 'Transporte', 'Minería', 'Agrícola', 'Comercio al por mayor',
+    'Bodegaje', 'Retail', 'Industria alimentaria', 'Servicios de aseo',
+]
+SUFFIXES = ['SpA', 'Ltda.', 'S.A.', 'EIRL', 'y Cía. Ltda.']
+FIRST_NAMES = ['Juan', 'María', 'Pedro', 'Camila', 'José', 'Valentina', 'Luis', 'Fernanda', 'Diego', 'Javiera']
+LAST_NAMES = ['González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras', 'Silva', 'Martínez', 'Sepúlveda']
+
+
+def generate_clients(n_rows, seed=42):
+    rng = np.random.default_rng(seed)
+    city_names = list(CITIES)
+    city_idx = rng.integers(0, len(city_names), n_rows)
+    cities = np.array(city_names, dtype=object)[city_idx]
+    communes = np.array([
+        CITIES[city][i % len(CITIES[city])]
+        for city, i in zip(cities, rng.integers(0, 1000, n_rows))
+    ], dtype=object)
+
+    bodies = rng.integers(5_000_000, 99_999_999, n_rows)
+    dvs = compute_check_digits(bodies)
+    ruts = pd.Series(bodies).map('{:,}'.format).str.replace(',', '.') + '-' + dvs
+
+    # Mezcla de formatos de teléfono reales en planillas, con ~3% de números inválidos
+    numbers = rng.integers(10_000_000, 99_999_999, n_rows).astype(str)
+    formats = rng.integers(0, 4, n_rows)
+    phones = np.where(formats == 0, '9' + numbers,
+             np.where(formats == 1, '+56 9 ' + numbers,
+             np.where(formats == 2, '569' + numbers, '9 ' + numbers)))
+    invalid = rng.random(n_rows) < 0.03
+    phones = np.where(invalid, numbers, phones)
+
+    first = np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), n_rows)]
+    last = np.array(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), n_rows)]
+    giros = np.array(GIROS, dtype=object)[rng.integers(0, len(GIROS), n_rows)]
+    suffixes = np.array(SUFFIXES, dtype=object)[rng.integers(0, len(SUFFIXES), n_rows)]
+
+    return pd.DataFrame({
+        'Razón social': last + ' ' + giros + ' ' + suffixes,
+        'RUT': ruts.to_numpy(),
+        'Giro': giros,
+        'Dirección': 'Calle ' + rng.integers(1, 500, n_rows).astype(str) + ' #' + rng.integers(1, 9999, n_rows).astype(str),
+        'Comuna': communes,
+        'Ciudad': cities,
+        'Nombre contacto': first + ' ' + last,
+        'Teléfono': phones,
+    })
+
+
+def ensure_workbook(n_rows, data_dir, seed=42):
+    # Las planillas se generan una sola vez y se reutilizan entre ejecuciones
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"clientes_{n_rows}.xlsx")
+    if not os.path.exists(path):
+        generate_clients(n_rows, seed=seed).to_excel(path, index=False)
+    return path
+
+
+def ensure_source_folder(n_rows, data_dir, parts=4, seed=42):
+    # Misma cantidad de filas repartida en varias planillas, para medir la importación en paralelo
+    folder = os.path.join(data_dir, f"clientes_{n_rows}_partes{parts}")
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+        df = generate_clients(n_rows, seed=seed)
+        bounds = [n_rows * i // parts for i in range(parts + 1)]
+        for i in range(parts):
+            df.iloc[bounds[i]:bounds[i + 1]].to_excel(os.path.join(folder, f"parte_{i + 1}.xlsx"), index=False)
+    return folder
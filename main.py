@@ -1,12 +1,29 @@
 import sys
+import argparse
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from src.views.main_window import NostraWhatsApp
+from src.utils.constants import PROFILE_DIR
+from src.utils.profiling import PROFILER
 
 def main():
-    app = QApplication(sys.argv)
+    # Necesario para el pool de procesos de la importación en el ejecutable de PyInstaller
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="NostraWhatsApp - Envío Masivo")
+    parser.add_argument("--profile", nargs="?", const=PROFILE_DIR, default=None, metavar="CARPETA",
+                        help="Perfilar importación, filtros y envíos (cProfile y tracemalloc) en CARPETA")
+    # El resto de los argumentos son de Qt
+    args, qt_args = parser.parse_known_args()
+    if args.profile:
+        PROFILER.start(args.profile)
+    app = QApplication(sys.argv[:1] + qt_args)
     window = NostraWhatsApp()
     window.show()
-    sys.exit(app.exec_())
+    code = app.exec_()
+    bundle = PROFILER.stop()
+    if bundle:
+        print(f"Perfil guardado en {bundle}")
+    sys.exit(code)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,106 @@
+import pandas as pd
+from ..utils.constants import (
+    POST_SEND_WAIT, DELAY_RANGE, SEND_WAIT_TIME, SEND_CLOSE_TIME, REQUIRED_COLUMNS
+)
+from ..utils.template_renderer import compile_template
+from .render_cache import RenderCache
+from .recipient_sharding import order_recipients
+
+PLAN_STATES = ('enviar', 'ya_enviado', 'duplicado', 'invalido', 'suprimido')
+
+
+class CampaignPlan:
+    """Resultado de la planificación: destinatarios finales, mensajes renderizados y estimación."""
+
+    def __init__(self, rows, messages, unknown_placeholders, empty_fields,
+                 seconds_per_message, latency_measured, estimated_seconds):
+        self.rows = rows
+        self.messages = messages
+        self.unknown_placeholders = unknown_placeholders
+        self.empty_fields = empty_fields
+        self.seconds_per_message = seconds_per_message
+        self.latency_measured = latency_measured
+        self.estimated_seconds = estimated_seconds
+        counts = rows['estado'].value_counts()
+        self.counts = {state: int(counts.get(state, 0)) for state in PLAN_STATES}
+
+    @property
+    def total(self):
+        return len(self.rows)
+
+    @property
+    def to_send(self):
+        return self.counts['enviar']
+
+    def summary_text(self):
+        hours, remainder = divmod(int(self.estimated_seconds), 3600)
+        minutes = remainder // 60
+        lines = [
+            f"Contactos filtrados: {self.total}",
+            f"Mensajes a enviar: {self.to_send}",
+            f"Omitidos por historial: {self.counts['ya_enviado']}",
+            f"Repetidos en la lista: {self.counts['duplicado']}",
+            f"Números inválidos: {self.counts['invalido']}",
+            f"En lista de exclusión: {self.counts['suprimido']}",
+            f"Duración estimada: {hours} h {minutes} min "
+            f"({self.seconds_per_message:.1f} s por mensaje, latencia "
+            f"{'medida' if self.latency_measured else 'estimada'})",
+        ]
+        if self.unknown_placeholders:
+            lines.append("Variables desconocidas en la plantilla: "
+                         + ", ".join(f"[{name}]" for name in self.unknown_placeholders))
+        for column, count in self.empty_fields.items():
+            lines.append(f"Variable [{column}] vacía en {count} mensajes")
+        return "\n".join(lines)
+
+    def write_preview(self, path):
+        # Archivo de vista previa con el estado de cada destinatario y su mensaje final
+        preview = pd.DataFrame({
+            'Razón social': self.rows['Razón social'],
+            'Teléfono': self.rows['telefono_e164'].where(self.rows['telefono_e164'] != '', self.rows['Teléfono']),
+            'Estado': self.rows['estado'],
+            'Mensaje': self.messages.reindex(self.rows.index).fillna(''),
+        })
+        preview.to_csv(path, index=False, encoding='utf-8-sig')
+
+
+class CampaignPlanner:
+    def __init__(self, db_manager, post_send_wait=POST_SEND_WAIT, delay_range=DELAY_RANGE):
+        self.db_manager = db_manager
+        self.post_send_wait = post_send_wait
+        self.delay_range = delay_range
+
+    def plan(self, template, city=None, commune=None, giro=None, check_history=False, test_mode=False,
+             order_keys=()):
+        rows = self.db_manager.get_send_plan(city=city, commune=commune, giro=giro, check_history=check_history)
+        # Orden de envío por grupos (p. ej. ciudad y comuna); los repetidos ya se marcaron por id
+        rows = order_recipients(rows, order_keys)
+        if test_mode:
+            # El modo prueba solo procesa el primer contacto filtrado
+            rows = rows.head(1)
+
+        # Solo las columnas que ve el hilo de envío, para compartir la caché de mensajes con él
+        sendable = rows.loc[rows['estado'] == 'enviar', REQUIRED_COLUMNS]
+        segments, unknown = compile_template(template, sendable.columns)
+        # Los mensajes quedan renderizados en SQLite: el envío solo lee el texto listo
+        messages = RenderCache(self.db_manager).messages_for(template, sendable)
+
+        empty_fields = {}
+        for column in dict.fromkeys(value for is_field, value in segments if is_field):
+            empty = int((sendable[column].astype(str).str.strip() == '').sum())
+            if empty:
+                empty_fields[column] = empty
+
+        latency = self.db_manager.get_average_send_latency()
+        latency_measured = latency is not None
+        if not latency_measured:
+            latency = SEND_WAIT_TIME + SEND_CLOSE_TIME
+        seconds_per_message = latency + self.post_send_wait
+        count = len(sendable)
+        mean_delay = 0 if test_mode else sum(self.delay_range) / 2
+        estimated = count * seconds_per_message + max(count - 1, 0) * mean_delay
+
+        return CampaignPlan(
+            rows, messages, unknown, empty_fields,
+            seconds_per_message + mean_delay, latency_measured, estimated
+        )
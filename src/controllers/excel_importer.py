@@ -0,0 +1,169 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+import datetime
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from ..models.contact_dedup import deduplicate_contacts
+from ..models.ingestion import expand_sources, parse_source, validate_rows
+from ..utils.constants import REQUIRED_COLUMNS, IMPORT_MAX_WORKERS, IMPORT_CHUNK_SIZE, IMPORT_REJECTS_DIR
+from ..utils.profiling import profiled
+
+REJECT_COLUMNS = ['Origen', 'Fila', 'Motivo'] + REQUIRED_COLUMNS
+
+
+class ExcelImportThread(QThread):
+    """Importa planillas y CSV fuera del hilo de la interfaz.
+
+    Informa las filas leídas, validadas y guardadas. Las filas que no se pueden importar (y las hojas o
+    archivos ilegibles) se escriben con su motivo en un CSV de rechazadas; el resto se guarda por lotes en
+    una sola transacción, que se deshace completa si se cancela.
+    """
+    # etapa ('leidas', 'validadas', 'guardadas'), filas procesadas, total conocido
+    progress_update = pyqtSignal(str, int, int)
+    finished_import = pyqtSignal(bool, str)
+
+    def __init__(self, paths, db_manager, deduplicate=True, fuzzy_names=False, max_workers=IMPORT_MAX_WORKERS,
+                 rejects_dir=IMPORT_REJECTS_DIR, chunk_size=IMPORT_CHUNK_SIZE):
+        super().__init__()
+        self.paths = paths
+        self.db_manager = db_manager
+        self.deduplicate = deduplicate
+        self.fuzzy_names = fuzzy_names
+        self.max_workers = max_workers
+        self.rejects_dir = rejects_dir
+        self.chunk_size = chunk_size
+        self.cancel_event = threading.Event()
+        self.imported = None
+        self.merges = None
+        self.rejected = None
+        self.rejects_file = None
+
+    @profiled("importacion")
+    def run(self):
+        try:
+            success, message = self.import_sources()
+        except Exception as e:
+            success, message = False, f"Error al importar: {str(e)}"
+        self.finished_import.emit(success, message)
+
+    def import_sources(self):
+        files = expand_sources(self.paths)
+        if not files:
+            return False, "No se encontraron planillas ni archivos CSV para importar."
+        frames, rejected, loaded, errors = [], [], [], []
+        parsed = validated = 0
+        for results in self.parse_files(files):
+            for origin, df, error in results:
+                if error:
+                    errors.append((origin, error))
+                    rejected.append(pd.DataFrame({'Origen': [origin], 'Motivo': [error]}))
+                    continue
+                parsed += len(df)
+                self.progress_update.emit('leidas', parsed, 0)
+                valid, invalid = validate_rows(df)
+                validated += len(df)
+                self.progress_update.emit('validadas', validated, parsed)
+                loaded.append((origin, len(df)))
+                # Origen y fila viajan con cada cliente para poder informar los RUT repetidos al guardar
+                frames.append(valid.assign(Origen=origin, Fila=valid.index + 2))
+                if len(invalid):
+                    # Número de fila en la planilla: encabezado en la fila 1
+                    rejected.append(invalid.assign(Origen=origin, Fila=invalid.index + 2))
+            if self.cancel_event.is_set():
+                return False, "Importación cancelada. No se modificaron los clientes."
+
+        if not loaded:
+            self.save_rejects(rejected)
+            return False, self.summary(
+                "No se importaron clientes.", 0, 0, loaded, errors
+            )
+        df = pd.concat(frames, ignore_index=True)
+        valid_rows = len(df)
+        if valid_rows == 0:
+            # Reemplazar con nada borraría todos los clientes
+            self.save_rejects(rejected)
+            return False, self.summary(
+                "No hay filas válidas para importar. No se modificaron los clientes.", 0, parsed, loaded, errors
+            )
+        self.merges = None
+        if self.deduplicate:
+            df, self.merges = deduplicate_contacts(df, fuzzy_names=self.fuzzy_names)
+        if self.cancel_event.is_set():
+            return False, "Importación cancelada. No se modificaron los clientes."
+
+        total = len(df)
+        self.imported = self.db_manager.replace_clients(
+            df,
+            progress=lambda written: self.progress_update.emit('guardadas', written, total),
+            should_cancel=self.cancel_event.is_set,
+            chunk_size=self.chunk_size,
+        )
+        if self.imported is None:
+            return False, "Importación cancelada. No se modificaron los clientes."
+        conflicts = self.db_manager.last_import_rut_conflicts
+        if len(conflicts):
+            rejected.append(conflicts)
+        self.save_rejects(rejected)
+        return True, self.summary(
+            f"Se importaron {self.imported} registros.", valid_rows, parsed, loaded, errors
+        )
+
+    def parse_files(self, files):
+        # Resultados por archivo en el orden de files (como read_sources), así la deduplicación conserva la
+        # misma fila canónica; se informa avance y se puede cancelar entre archivos
+        workers = min(len(files), self.max_workers or os.cpu_count() or 1)
+        if workers <= 1:
+            for path in files:
+                if self.cancel_event.is_set():
+                    return
+                yield parse_source(path)
+            return
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = [executor.submit(parse_source, path) for path in files]
+            for future in futures:
+                if self.cancel_event.is_set():
+                    return
+                yield future.result()
+        finally:
+            executor.shutdown(wait=not self.cancel_event.is_set(), cancel_futures=True)
+
+    def save_rejects(self, rejected):
+        self.rejected = None
+        if rejected:
+            self.rejected = pd.concat(rejected, ignore_index=True).reindex(columns=REJECT_COLUMNS)
+            self.rejected['Fila'] = self.rejected['Fila'].astype('Int64')
+            self.rejects_file = self.write_rejects(self.rejected)
+
+    def summary(self, headline, valid_rows, parsed, loaded, errors):
+        lines = [headline]
+        conflicts = 0
+        if self.imported is not None:
+            conflicts = len(self.db_manager.last_import_rut_conflicts)
+            merged = valid_rows - self.imported - conflicts
+            if merged:
+                lines.append(f"{merged} filas duplicadas fusionadas.")
+        rejected_rows = parsed - valid_rows
+        if rejected_rows:
+            lines.append(f"{rejected_rows} filas rechazadas.")
+        if conflicts:
+            lines.append(f"{conflicts} filas rechazadas por repetir el RUT de otro cliente.")
+        if len(loaded) > 1:
+            lines.append(f"Fuentes leídas: {len(loaded)}.")
+        if errors:
+            lines.append("Omitidas: " + "; ".join(f"{origin} ({error})" for origin, error in errors))
+        if self.rejects_file:
+            lines.append(f"Detalle de rechazos: {self.rejects_file}")
+        return "\n".join(lines)
+
+    def write_rejects(self, rejected):
+        os.makedirs(self.rejects_dir, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.rejects_dir, f"importacion_rechazadas_{timestamp}.csv")
+        rejected.to_csv(path, index=False, encoding='utf-8-sig')
+        return path
+
+    def cancel(self):
+        # Se respeta entre archivos, antes de guardar y entre lotes de escritura (con rollback)
+        self.cancel_event.set()
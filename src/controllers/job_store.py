@@ -0,0 +1,182 @@
+import datetime
+import itertools
+import threading
+
+
+def _iso(moment):
+    # Mismo formato en todos los nodos para que las fechas se comparen como texto en SQLite
+    return moment.isoformat(timespec='milliseconds')
+
+
+def jobs_from_plan(plan, attachment=None, accounts=None):
+    # Un trabajo por destinatario a enviar del plan, en su orden y con el mensaje ya renderizado.
+    # accounts: Serie con la cuenta asignada a cada fila (mismo índice que plan.rows); None = cualquier nodo
+    sendable = plan.rows[plan.rows['estado'] == 'enviar']
+    messages = plan.messages.reindex(sendable.index)
+    assigned = accounts.reindex(sendable.index) if accounts is not None else [None] * len(sendable)
+    return [
+        {'razon_social': razon_social, 'telefono': telefono, 'ciudad': ciudad, 'mensaje': mensaje,
+         'adjunto': attachment, 'cuenta': account}
+        for razon_social, telefono, ciudad, mensaje, account in zip(
+            sendable['Razón social'], sendable['telefono_e164'], sendable['Ciudad'], messages, assigned
+        )
+    ]
+
+
+class SqliteJobStore:
+    """Cola de envíos en la tabla trabajos_envio.
+
+    Varios nodos comparten la cola apuntando a la misma base (p. ej. en una carpeta de red). Cada trabajo
+    se reserva por un plazo (lease) y se marca "enviando" justo antes de llamar al transporte, así un
+    destinatario nunca se envía dos veces aunque un nodo se caiga: a lo más queda como incierto.
+    """
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def enqueue(self, campaign_id, jobs):
+        return self.db_manager.enqueue_send_jobs(campaign_id, jobs)
+
+    def claim(self, node, account, min_interval, lease_seconds, now):
+        lease_until = now + datetime.timedelta(seconds=lease_seconds)
+        return self.db_manager.claim_send_job(node, account, min_interval, _iso(lease_until), _iso(now))
+
+    def start(self, job, node, lease_seconds, now):
+        lease_until = now + datetime.timedelta(seconds=lease_seconds)
+        return self.db_manager.start_send_job(job['id'], node, _iso(lease_until), _iso(now))
+
+    def complete(self, job, resultado, counter, dead_letter=None):
+        return self.db_manager.complete_send_job(job, resultado, counter, dead_letter)
+
+    def retry_later(self, job, available_at, error_text):
+        self.db_manager.retry_send_job(job['id'], _iso(available_at), error_text)
+
+    def release(self, node):
+        return self.db_manager.release_send_jobs(node)
+
+    def has_active_leases(self, now):
+        return self.db_manager.count_active_leases(_iso(now)) > 0
+
+    def reclaim_expired(self, now):
+        return self.db_manager.reclaim_send_jobs(_iso(now))
+
+    def counts(self, campaign_id=None):
+        return self.db_manager.count_send_jobs(campaign_id)
+
+
+class MemoryJobStore:
+    """Misma cola en memoria, para pruebas y para varios nodos (hilos) dentro de un solo proceso."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.history = []
+        self.dead_letters = []
+        self.accounts = {}
+        self.campaigns = {}
+        self._ids = itertools.count(1)
+
+    def enqueue(self, campaign_id, jobs):
+        added = 0
+        with self.lock:
+            queued = {(job['campaign_id'], job['telefono']) for job in self.jobs.values()}
+            for job in jobs:
+                if (campaign_id, job['telefono']) in queued:
+                    continue
+                queued.add((campaign_id, job['telefono']))
+                job_id = next(self._ids)
+                self.jobs[job_id] = dict(job, id=job_id, campaign_id=campaign_id, estado='pendiente', intentos=0,
+                                         disponible_desde=None, nodo=None, lease_hasta=None, ultimo_error=None)
+                added += 1
+            self.campaigns.setdefault(campaign_id, {'enviados': 0, 'fallidos': 0})
+        return added
+
+    def claim(self, node, account, min_interval, lease_seconds, now):
+        lease_until = now + datetime.timedelta(seconds=lease_seconds)
+        with self.lock:
+            job = next((job for job in self.jobs.values()
+                        if job['estado'] == 'pendiente' and job.get('cuenta') in (None, account)
+                        and (job['disponible_desde'] is None or job['disponible_desde'] <= now)), None)
+            if job is None:
+                return None, 0
+            last = self.accounts.get(account)
+            if last is not None:
+                elapsed = (now - last).total_seconds()
+                if elapsed < min_interval:
+                    return None, min_interval - elapsed
+            self.accounts[account] = now
+            job.update(estado='reservado', nodo=node, lease_hasta=lease_until)
+            return dict(job), 0
+
+    def start(self, job, node, lease_seconds, now):
+        with self.lock:
+            current = self.jobs[job['id']]
+            if current['nodo'] != node or current['estado'] != 'reservado' or current['lease_hasta'] <= now:
+                return False
+            current['estado'] = 'enviando'
+            current['intentos'] += 1
+            current['lease_hasta'] = now + datetime.timedelta(seconds=lease_seconds)
+            return True
+
+    def complete(self, job, resultado, counter, dead_letter=None):
+        with self.lock:
+            current = self.jobs[job['id']]
+            if current['estado'] != 'enviando':
+                return False
+            current['estado'] = 'enviado' if counter == 'enviados' else 'fallido'
+            current['lease_hasta'] = None
+            self._finish(current, resultado, counter, dead_letter)
+            return True
+
+    def _finish(self, job, resultado, counter, dead_letter):
+        self.history.append({'telefono': job['telefono'], 'resultado': resultado, 'campaign_id': job['campaign_id'],
+                             'nodo': job['nodo']})
+        if dead_letter is not None:
+            self.dead_letters.append(dict(dead_letter, telefono=job['telefono'], campaign_id=job['campaign_id']))
+        self.campaigns[job['campaign_id']][counter] += 1
+
+    def retry_later(self, job, available_at, error_text):
+        with self.lock:
+            current = self.jobs[job['id']]
+            if current['estado'] == 'enviando':
+                current.update(estado='pendiente', disponible_desde=available_at, ultimo_error=error_text,
+                               nodo=None, lease_hasta=None)
+
+    def release(self, node):
+        with self.lock:
+            released = 0
+            for job in self.jobs.values():
+                if job['nodo'] == node and job['estado'] == 'reservado':
+                    job.update(estado='pendiente', nodo=None, lease_hasta=None)
+                    released += 1
+            return released
+
+    def has_active_leases(self, now):
+        with self.lock:
+            return any(job['estado'] in ('reservado', 'enviando') and job['lease_hasta'] > now
+                       for job in self.jobs.values())
+
+    def reclaim_expired(self, now):
+        with self.lock:
+            released = uncertain = 0
+            for job in self.jobs.values():
+                if job['lease_hasta'] is None or job['lease_hasta'] > now:
+                    continue
+                if job['estado'] == 'reservado':
+                    job.update(estado='pendiente', nodo=None, lease_hasta=None)
+                    released += 1
+                elif job['estado'] == 'enviando':
+                    error = f"Nodo {job['nodo']} sin respuesta durante el envío; no se reintenta para evitar duplicados"
+                    job.update(estado='incierto', lease_hasta=None, ultimo_error=error)
+                    self._finish(job, "Error - Resultado incierto", 'fallidos',
+                                 {'intentos': job['intentos'], 'ultimo_error': error})
+                    uncertain += 1
+            return released, uncertain
+
+    def counts(self, campaign_id=None):
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                if campaign_id is None or job['campaign_id'] == campaign_id:
+                    counts[job['estado']] = counts.get(job['estado'], 0) + 1
+            return counts
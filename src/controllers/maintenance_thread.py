@@ -0,0 +1,20 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class MaintenanceThread(QThread):
+    """Ejecuta el mantenimiento de la base (archivo, VACUUM y ANALYZE) fuera del hilo de la interfaz."""
+    # informe (None si no correspondía o falló), texto del error
+    finished_maintenance = pyqtSignal(object, str)
+
+    def __init__(self, maintenance, only_if_due=False):
+        super().__init__()
+        self.maintenance = maintenance
+        self.only_if_due = only_if_due
+
+    def run(self):
+        try:
+            report = self.maintenance.run_if_due() if self.only_if_due else self.maintenance.run()
+        except Exception as e:
+            self.finished_maintenance.emit(None, str(e))
+            return
+        self.finished_maintenance.emit(report, "")
@@ -0,0 +1,85 @@
+import heapq
+import numpy as np
+import pandas as pd
+from ..models.database import filter_key
+
+
+def _group_codes(column):
+    # Código entero por fila, ordenado según la misma clave que usan los filtros (filter_key).
+    # Solo se normalizan los valores distintos, no cada fila.
+    codes, uniques = pd.factorize(column, use_na_sentinel=False)
+    labels = pd.Index(uniques, dtype=object).fillna('').map(filter_key)
+    label_codes, label_uniques = pd.factorize(labels, sort=True)
+    return label_codes[codes], label_uniques
+
+
+def _sort_positions(df, keys):
+    codes = [_group_codes(df[key]) for key in keys]
+    # lexsort es estable y toma la última clave como principal
+    positions = np.lexsort([key_codes for key_codes, _ in reversed(codes)])
+    return positions, codes
+
+
+def order_recipients(df, keys):
+    # Orden estable: dentro de cada grupo se conserva el orden original (por id)
+    if not keys or len(df) == 0:
+        return df
+    positions, _ = _sort_positions(df, keys)
+    return df.iloc[positions]
+
+
+def partition_recipients(df, keys):
+    # Grupos en orden de sus claves, como posiciones de fila (sin copiar el DataFrame)
+    if len(df) == 0:
+        return {}
+    if not keys:
+        return {(): np.arange(len(df))}
+    positions, codes = _sort_positions(df, keys)
+    sorted_codes = np.column_stack([key_codes[positions] for key_codes, _ in codes])
+    starts = np.flatnonzero(np.r_[True, (sorted_codes[1:] != sorted_codes[:-1]).any(axis=1)])
+    ends = np.r_[starts[1:], len(positions)]
+    partitions = {}
+    for start, end in zip(starts, ends):
+        key = tuple(labels[code] for (_, labels), code in zip(codes, sorted_codes[start]))
+        partitions[key] = positions[start:end]
+    return partitions
+
+
+def assign_accounts(partitions, accounts):
+    # Cada grupo completo va a una cuenta; el más grande primero a la cuenta con menos carga
+    if not accounts:
+        raise ValueError("Debe indicar al menos una cuenta")
+    loads = [(0, position, account) for position, account in enumerate(accounts)]
+    heapq.heapify(loads)
+    assignment = {}
+    for key, positions in sorted(partitions.items(), key=lambda item: -len(item[1])):
+        load, position, account = heapq.heappop(loads)
+        assignment[key] = account
+        heapq.heappush(loads, (load + len(positions), position, account))
+    return assignment
+
+
+def shard_recipients(df, keys, accounts):
+    """Ordena los destinatarios por las claves y asigna cada grupo (p. ej. una comuna) a una cuenta.
+
+    Devuelve el DataFrame ordenado, una Serie con la cuenta de cada fila (mismo índice) y un resumen por
+    cuenta con la cantidad de grupos y de destinatarios.
+    """
+    if keys:
+        partitions = partition_recipients(df, keys)
+        ordered_positions = np.concatenate(list(partitions.values())) if partitions else np.arange(0)
+    else:
+        # Sin claves de grupo se reparten tramos consecutivos del mismo tamaño
+        ordered_positions = np.arange(len(df))
+        chunks = np.array_split(ordered_positions, len(accounts)) if accounts else []
+        partitions = {(number,): chunk for number, chunk in enumerate(chunks) if len(chunk)}
+    assignment = assign_accounts(partitions, accounts)
+    values = np.empty(len(df), dtype=object)
+    summary = {account: {'grupos': 0, 'destinatarios': 0} for account in accounts}
+    for key, positions in partitions.items():
+        account = assignment[key]
+        values[positions] = account
+        summary[account]['grupos'] += 1
+        summary[account]['destinatarios'] += len(positions)
+    ordered = df.iloc[ordered_positions]
+    return ordered, pd.Series(values[ordered_positions], index=ordered.index, dtype=object), summary
@@ -0,0 +1,25 @@
+from ..utils.template_renderer import render_frame, template_key, row_hashes
+
+
+class RenderCache:
+    """Mensajes ya renderizados por (hash de plantilla, hash de la fila), guardados en SQLite.
+
+    Si cambia la plantilla o algún dato del contacto que usa, cambia la clave y el mensaje se vuelve
+    a renderizar; no hace falta invalidar nada a mano.
+    """
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def messages_for(self, template, df):
+        # Serie de mensajes con el mismo índice que df; solo se renderizan (en lote) las filas sin caché
+        template_hash, fields = template_key(template, df.columns)
+        hashes = row_hashes(df, fields)
+        cached = self.db_manager.get_rendered_messages(template_hash)
+        messages = hashes.map(cached).astype(object)
+        missing = messages.isna()
+        if missing.any():
+            rendered = render_frame(template, df[missing])
+            messages[missing] = rendered
+            self.db_manager.store_rendered_messages(template_hash, hashes[missing], rendered)
+        return messages
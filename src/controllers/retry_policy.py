@@ -0,0 +1,61 @@
+import datetime
+import heapq
+import random
+from ..utils.constants import (
+    RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, RETRY_JITTER, RETRYABLE_ERRORS
+)
+
+
+class RetryPolicy:
+    """Decide si un error de envío se reintenta y cuánto esperar antes del siguiente intento."""
+
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS, base_delay=RETRY_BASE_DELAY,
+                 max_delay=RETRY_MAX_DELAY, jitter=RETRY_JITTER, retryable=RETRYABLE_ERRORS, rng=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retryable = set(retryable)
+        self.rng = rng if rng is not None else random.Random()
+
+    def is_retryable(self, error):
+        # Se compara por nombre de clase para no importar pywhatkit (sus excepciones incluidas)
+        return any(cls.__name__ in self.retryable for cls in type(error).__mro__)
+
+    def should_retry(self, error, attempts):
+        return attempts < self.max_attempts and self.is_retryable(error)
+
+    def next_delay(self, attempts):
+        # Espera exponencial tras el intento número `attempts`, acotada y con jitter
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class RetryQueue:
+    """Reintentos pendientes ordenados por fecha; el respaldo persistente es la tabla cola_reintentos."""
+
+    def __init__(self):
+        self._heap = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, entry):
+        heapq.heappush(self._heap, (entry['proximo_intento'], entry['id'], entry))
+
+    def next_due_at(self):
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        if self._heap and self._heap[0][0] <= now:
+            return heapq.heappop(self._heap)[2]
+        return None
+
+    @classmethod
+    def from_rows(cls, rows):
+        queue = cls()
+        for row in rows:
+            entry = dict(row)
+            entry['proximo_intento'] = datetime.datetime.fromisoformat(entry['proximo_intento'])
+            queue.push(entry)
+        return queue
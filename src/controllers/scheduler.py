@@ -0,0 +1,156 @@
+import datetime
+import json
+import time
+from ..utils.constants import (
+    SEND_WINDOW_START_HOUR, SEND_WINDOW_END_HOUR, SEND_WINDOW_WEEKDAYS,
+    SEND_WAIT_TIME, SEND_CLOSE_TIME, POST_SEND_WAIT, DELAY_RANGE
+)
+
+
+def default_rate_per_hour():
+    # Tasa máxima que permiten las esperas configuradas del envío
+    return 3600 / (SEND_WAIT_TIME + SEND_CLOSE_TIME + POST_SEND_WAIT + sum(DELAY_RANGE) / 2)
+
+
+class SystemClock:
+    def now(self):
+        return datetime.datetime.now()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def wait(self, seconds, event):
+        # Espera que termina antes si se activa el evento; devuelve True si fue interrumpida
+        return event.wait(seconds)
+
+
+class SimulatedClock:
+    """Reloj simulado: sleep() avanza el tiempo al instante, para verificar planes largos."""
+
+    def __init__(self, start):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def wait(self, seconds, event):
+        if event.is_set():
+            return True
+        self.advance(seconds)
+        return False
+
+    def advance(self, seconds):
+        self.current += datetime.timedelta(seconds=seconds)
+
+
+class SendingWindow:
+    """Horario permitido de envío: días de la semana y rango de horas."""
+
+    def __init__(self, start_hour=SEND_WINDOW_START_HOUR, end_hour=SEND_WINDOW_END_HOUR,
+                 weekdays=SEND_WINDOW_WEEKDAYS):
+        if not 0 <= start_hour < end_hour <= 24:
+            raise ValueError("Horario de envío inválido")
+        if not weekdays:
+            raise ValueError("Debe haber al menos un día de envío")
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.weekdays = frozenset(weekdays)
+
+    def _at_hour(self, moment, hour):
+        day = datetime.datetime.combine(moment.date(), datetime.time())
+        return day + datetime.timedelta(hours=hour)
+
+    def is_open(self, moment):
+        return (moment.weekday() in self.weekdays
+                and self._at_hour(moment, self.start_hour) <= moment < self._at_hour(moment, self.end_hour))
+
+    def next_open(self, moment):
+        # Instante más próximo (>= moment) en que el horario está abierto
+        if self.is_open(moment):
+            return moment
+        for days in range(8):
+            day = moment + datetime.timedelta(days=days)
+            opening = self._at_hour(day, self.start_hour)
+            if day.weekday() in self.weekdays and opening >= moment:
+                return opening
+        raise ValueError("No hay horario de envío disponible")
+
+    def window_end(self, moment):
+        return self._at_hour(moment, self.end_hour)
+
+    def seconds_until_open(self, moment):
+        return (self.next_open(moment) - moment).total_seconds()
+
+
+def plan_windows(count, start, rate_per_hour, window):
+    # Reparte count mensajes en los horarios permitidos a la tasa indicada
+    if rate_per_hour <= 0:
+        raise ValueError("La tasa de envío debe ser mayor que cero")
+    slots = []
+    remaining = count
+    cursor = start
+    while remaining > 0:
+        opening = window.next_open(cursor)
+        closing = window.window_end(opening)
+        # Con una separación mayor que el bloque, el envío igual manda uno al abrir y espera al
+        # siguiente bloque: la capacidad nunca es 0 (si lo fuera, el ciclo no terminaría)
+        capacity = max(1, int((closing - opening).total_seconds() * rate_per_hour / 3600))
+        assigned = min(capacity, remaining)
+        finish = min(closing, opening + datetime.timedelta(seconds=assigned * 3600 / rate_per_hour))
+        slots.append({'inicio': opening, 'fin': finish, 'mensajes': assigned})
+        remaining -= assigned
+        cursor = closing
+    return slots
+
+
+class CampaignScheduler:
+    """Cola de campañas programadas persistida en SQLite."""
+
+    def __init__(self, db_manager, window=None, clock=None):
+        self.db_manager = db_manager
+        self.window = window or SendingWindow()
+        self.clock = clock or SystemClock()
+
+    def schedule(self, start_at, template, filters, check_history=True, respect_window=True, rate_per_hour=None,
+                 attachment=None, template_id=None):
+        return self.db_manager.add_scheduled_campaign(
+            start_at.isoformat(timespec='seconds'),
+            template,
+            json.dumps(filters, ensure_ascii=False),
+            check_history,
+            respect_window,
+            rate_per_hour,
+            attachment,
+            template_id
+        )
+
+    def due_jobs(self):
+        # Campañas cuya hora de inicio ya pasó; las que quedaron "en_curso" tras un
+        # reinicio se reanudan (el historial evita reenviar a quien ya recibió el mensaje)
+        now = self.clock.now()
+        due = []
+        for job in self.db_manager.get_scheduled_campaigns(('pendiente', 'en_curso')):
+            if datetime.datetime.fromisoformat(job['inicio_programado']) > now:
+                continue
+            if job['respetar_horario'] and not self.window.is_open(now):
+                continue
+            job['filtros'] = json.loads(job['filtros'])
+            due.append(job)
+        return due
+
+    def plan(self, start_at, count, rate_per_hour=None):
+        # Bloques de horario en que se enviará la campaña a la tasa indicada
+        start = max(start_at, self.clock.now())
+        return plan_windows(count, start, rate_per_hour or default_rate_per_hour(), self.window)
+
+    def mark_started(self, job_id, campaign_id=None):
+        self.db_manager.update_scheduled_campaign(job_id, 'en_curso', campaign_id)
+
+    def mark_finished(self, job_id, estado, campaign_id=None):
+        self.db_manager.update_scheduled_campaign(job_id, estado, campaign_id)
+
+    def cancel(self, job_id):
+        self.db_manager.update_scheduled_campaign(job_id, 'cancelada')
@@ -0,0 +1,127 @@
+import datetime
+import os
+import socket
+import threading
+from ..utils.constants import (
+    POST_SEND_WAIT, WORKER_LEASE_SECONDS, WORKER_POLL_SECONDS, WORKER_ACCOUNT_MIN_INTERVAL
+)
+from ..utils.log_file import get_send_logger
+from ..utils.media_cache import MediaCache
+from .transports import PyWhatKitTransport
+from .scheduler import SystemClock
+from .retry_policy import RetryPolicy
+
+
+class SendWorker:
+    """Nodo sin interfaz: reserva trabajos de la cola compartida y los envía con su sesión de WhatsApp.
+
+    Cada nodo usa una cuenta (la sesión de WhatsApp Web de esa máquina). La separación mínima entre envíos
+    de una cuenta se respeta entre todos los nodos que la usan, y cada resultado se registra en el
+    historial_envios de la base compartida.
+    """
+
+    def __init__(self, store, account, node=None, transport=None, clock=None, retry_policy=None,
+                 media_cache=None, min_interval=WORKER_ACCOUNT_MIN_INTERVAL,
+                 lease_seconds=WORKER_LEASE_SECONDS, poll_seconds=WORKER_POLL_SECONDS,
+                 post_send_wait=POST_SEND_WAIT, log=None):
+        self.store = store
+        self.account = account
+        self.node = node or f"{socket.gethostname()}-{os.getpid()}"
+        self.transport = transport if transport is not None else PyWhatKitTransport()
+        self.clock = clock if clock is not None else SystemClock()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.media_cache = media_cache if media_cache is not None else MediaCache()
+        self.prepared_media = {}
+        self.min_interval = min_interval
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.post_send_wait = post_send_wait
+        self.stop_event = threading.Event()
+        self.counts = {'enviados': 0, 'fallidos': 0, 'reintentos': 0, 'perdidos': 0}
+        self.logger = get_send_logger()
+        self.log_callback = log if log is not None else print
+
+    def run(self, exit_when_idle=False):
+        self.log(f"Nodo {self.node} iniciado con la cuenta {self.account}.")
+        try:
+            while not self.stop_event.is_set():
+                released, uncertain = self.store.reclaim_expired(self.clock.now())
+                if released or uncertain:
+                    self.log(f"Reservas vencidas de otros nodos: {released} vuelven a la cola, "
+                             f"{uncertain} quedan como resultado incierto.")
+                # Un trabajo por turno de la cuenta: la reserva nunca espera al límite de envíos
+                job, remaining = self.store.claim(self.node, self.account, self.min_interval,
+                                                  self.lease_seconds, self.clock.now())
+                if job is not None:
+                    self.process(job)
+                elif remaining > 0:
+                    self.wait(remaining)
+                elif exit_when_idle:
+                    break
+                else:
+                    self.wait(self.poll_seconds)
+        finally:
+            released = self.store.release(self.node)
+            if released:
+                self.log(f"{released} trabajos reservados vuelven a la cola.")
+        self.log(f"Nodo {self.node} detenido: {self.counts}.")
+        return self.counts
+
+    def process(self, job):
+        # Desde aquí el trabajo no se vuelve a entregar a otro nodo, aunque este se caiga
+        if not self.store.start(job, self.node, self.lease_seconds, self.clock.now()):
+            self.counts['perdidos'] += 1
+            self.log(f"{job['telefono']} ya no está reservado para este nodo (reserva vencida o número excluido).")
+            return
+        job['intentos'] += 1
+        self.log(f"Enviando mensaje a {job['razon_social']} ({job['telefono']})...")
+        error = None
+        try:
+            media_path = self.media_path_for(job.get('adjunto'))
+            if media_path:
+                self.transport.send(job['telefono'], job['mensaje'], media_path=media_path)
+            else:
+                self.transport.send(job['telefono'], job['mensaje'])
+            self.wait(self.post_send_wait)
+        except Exception as e:
+            error = e
+            self.log(f"Error al enviar a {job['razon_social']} ({job['telefono']}): {str(e)}")
+
+        if error is None:
+            self.finish(job, "Éxito", 'enviados')
+        elif self.retry_policy.should_retry(error, job['intentos']):
+            delay = self.retry_policy.next_delay(job['intentos'])
+            # Cualquier nodo puede tomar el reintento cuando se cumpla la espera
+            self.store.retry_later(job, self.clock.now() + datetime.timedelta(seconds=delay),
+                                   f"{type(error).__name__}: {error}")
+            self.counts['reintentos'] += 1
+            self.log(f"Reintento {job['intentos'] + 1}/{self.retry_policy.max_attempts} para "
+                     f"{job['razon_social']} en {delay:.0f} segundos.")
+        else:
+            dead_letter = {'intentos': job['intentos'], 'ultimo_error': f"{type(error).__name__}: {error}"}
+            self.finish(job, "Error", 'fallidos', dead_letter=dead_letter)
+
+    def finish(self, job, resultado, counter, dead_letter=None):
+        if self.store.complete(job, resultado, counter, dead_letter):
+            self.counts[counter] += 1
+        else:
+            self.log(f"El resultado de {job['telefono']} llegó tarde: otro nodo ya lo registró como incierto.")
+
+    def media_path_for(self, attachment):
+        # El adjunto debe estar accesible desde el nodo (p. ej. en la misma carpeta compartida)
+        if not attachment:
+            return None
+        if attachment not in self.prepared_media:
+            self.prepared_media[attachment] = self.media_cache.prepare(attachment).path
+        return self.prepared_media[attachment]
+
+    def wait(self, seconds):
+        self.clock.wait(seconds, self.stop_event)
+
+    def log(self, text):
+        self.logger.info(text)
+        self.log_callback(text)
+
+    def stop(self):
+        # La llamada a pywhatkit en curso termina y su resultado se registra; el resto vuelve a la cola
+        self.stop_event.set()
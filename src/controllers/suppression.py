@@ -0,0 +1,73 @@
+import pandas as pd
+from ..models.ingestion import normalize_header
+from ..utils.constants import OPT_OUT_KEYWORDS, OPT_OUT_FILLER_WORDS, OPT_OUT_PHRASES
+from ..utils.phone import normalize_phones
+
+# Encabezados aceptados en los CSV de exclusiones o de respuestas (ya normalizados)
+PHONE_HEADERS = ('telefono', 'fono', 'celular', 'movil', 'whatsapp', 'numero')
+REPLY_HEADERS = ('mensaje', 'respuesta', 'texto')
+
+
+def is_opt_out(text):
+    # Respuesta que pide no recibir más mensajes: es solo una palabra clave, a lo más con cortesía ("BAJA",
+    # "stop por favor"), o contiene una frase explícita ("no me escriban más"). "Cancelar pedido 123" no lo es.
+    normalized = normalize_header(str(text))
+    words = normalized.split()
+    if words and words[0] in OPT_OUT_KEYWORDS and all(word in OPT_OUT_FILLER_WORDS for word in words[1:]):
+        return True
+    padded = f" {normalized} "
+    return any(f" {phrase} " in padded for phrase in OPT_OUT_PHRASES)
+
+
+class SuppressionList:
+    """Teléfonos que pidieron no recibir mensajes.
+
+    La tabla suppressed_phones es la fuente; para el envío se carga una vez en un set, así cada
+    destinatario se revisa en tiempo constante.
+    """
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.phones = set()
+
+    def load(self):
+        self.phones = self.db_manager.get_suppressed_phones()
+        return self
+
+    def __contains__(self, phone):
+        return phone in self.phones
+
+    def __len__(self):
+        return len(self.phones)
+
+    def add(self, phones, motivo, origen):
+        # Devuelve cuántos números nuevos quedaron excluidos; los inválidos se descartan
+        normalized = normalize_phones(phones)
+        valid = list(dict.fromkeys(normalized[normalized != '']))
+        added = self.db_manager.add_suppressed_phones(valid, motivo, origen)
+        self.phones.update(valid)
+        return added
+
+    def remove(self, phone):
+        normalized = normalize_phones([phone]).iloc[0]
+        self.db_manager.remove_suppressed_phone(normalized)
+        self.phones.discard(normalized)
+
+    def ingest_replies(self, replies, origen='respuestas'):
+        # Sustituto local de la captura de respuestas entrantes: pares (teléfono, texto)
+        opt_outs = [phone for phone, text in replies if is_opt_out(text)]
+        return self.add(opt_outs, "Solicitó la baja", origen) if opt_outs else 0
+
+    def import_csv(self, path):
+        """Importa un CSV de teléfonos a excluir o de respuestas recibidas.
+
+        Si el archivo trae una columna de mensaje (mensaje/respuesta/texto), solo se excluyen los números
+        cuya respuesta pide la baja; si no, se excluyen todos los números del archivo.
+        """
+        df = pd.read_csv(path, dtype=str, sep=None, engine='python', encoding='utf-8-sig').fillna('')
+        headers = {normalize_header(column): column for column in df.columns}
+        phone_column = next((headers[h] for h in PHONE_HEADERS if h in headers), df.columns[0])
+        reply_column = next((headers[h] for h in REPLY_HEADERS if h in headers), None)
+        if reply_column is not None:
+            return self.ingest_replies(zip(df[phone_column], df[reply_column]), origen='csv_respuestas')
+        return self.add(df[phone_column], "Importado desde CSV", 'csv')
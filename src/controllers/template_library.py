@@ -0,0 +1,50 @@
+import hashlib
+import json
+import os
+from ..utils.constants import REQUIRED_COLUMNS, DEFAULT_TEMPLATE_FILE, DEFAULT_TEMPLATE_NAME
+from ..utils.template_renderer import compile_template
+
+
+class TemplateLibrary:
+    """Plantillas con nombre y versión guardadas en SQLite, con sus variables ya analizadas."""
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def save(self, name, content):
+        # Guarda una versión nueva si el contenido cambió; si no, devuelve la vigente
+        segments, unknown = compile_template(content, REQUIRED_COLUMNS)
+        variables = list(dict.fromkeys(value for is_field, value in segments if is_field))
+        content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        template_id, version, created = self.db_manager.save_template(
+            name, content, content_hash,
+            json.dumps(variables, ensure_ascii=False), json.dumps(unknown, ensure_ascii=False)
+        )
+        return {'id': template_id, 'nombre': name, 'version': version, 'nueva': created,
+                'variables': variables, 'desconocidas': unknown}
+
+    def get(self, template_id):
+        return self._decode(self.db_manager.get_template(template_id))
+
+    def latest(self, name):
+        return self._decode(self.db_manager.get_latest_template(name))
+
+    def names(self):
+        return self.db_manager.get_template_names()
+
+    def seed_from_file(self, path=DEFAULT_TEMPLATE_FILE, name=DEFAULT_TEMPLATE_NAME):
+        # Primera ejecución: el antiguo default_template.txt pasa a ser la versión 1
+        if self.names() or not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            content = f.read()
+        if not content.strip():
+            return None
+        return self.save(name, content)
+
+    def _decode(self, template):
+        if template is None:
+            return None
+        template['variables'] = json.loads(template['variables'] or '[]')
+        template['desconocidas'] = json.loads(template['desconocidas'] or '[]')
+        return template
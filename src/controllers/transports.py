@@ -0,0 +1,31 @@
+from ..utils.constants import SEND_WAIT_TIME, SEND_CLOSE_TIME
+
+
+class PyWhatKitTransport:
+    """Envía mensajes mediante WhatsApp Web usando pywhatkit."""
+
+    def __init__(self, wait_time=SEND_WAIT_TIME, close_time=SEND_CLOSE_TIME):
+        self.wait_time = wait_time
+        self.close_time = close_time
+
+    def send(self, phone, message, media_path=None):
+        # Importación diferida: pywhatkit abre el navegador y verifica conexión al importarse
+        import pywhatkit
+        if media_path:
+            # La imagen ya viene validada y optimizada desde la caché de adjuntos; el texto va como pie
+            pywhatkit.sendwhats_image(
+                phone,
+                media_path,
+                caption=message,
+                wait_time=self.wait_time,
+                tab_close=True,
+                close_time=self.close_time
+            )
+            return
+        pywhatkit.sendwhatmsg_instantly(
+            phone,
+            message,
+            wait_time=self.wait_time,
+            tab_close=True,
+            close_time=self.close_time
+        )
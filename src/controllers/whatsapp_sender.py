@@ -1,8 +1,19 @@
 from PyQt5.QtCore import QThread, pyqtSignal
-import pywhatkit
-import time
+import datetime
 import random
-import re
+import threading
+from ..models.campaign_stats import CampaignStats
+from ..utils.constants import METRICS_ENABLED, METRICS_MAX_SAMPLES, POST_SEND_WAIT, DELAY_RANGE
+from ..utils.instrumentation import Instrumentation
+from ..utils.log_file import get_send_logger
+from ..utils.phone import normalize_phone
+from ..utils.media_cache import MediaCache
+from ..utils.profiling import profiled
+from .transports import PyWhatKitTransport
+from .scheduler import SystemClock
+from .retry_policy import RetryPolicy, RetryQueue
+from .render_cache import RenderCache
+from .suppression import SuppressionList
 
 class WhatsAppSenderThread(QThread):
     progress_update = pyqtSignal(int, int)
@@ -11,123 +22,363 @@ class WhatsAppSenderThread(QThread):
     message_sent = pyqtSignal(str, str, str, bool)
     finished_sending = pyqtSignal()
     log_message = pyqtSignal(str)
+    metrics_update = pyqtSignal(dict)
 
-    def __init__(self, df_filtered, message_template, db_manager, test_mode=False, check_history=False):
+    def __init__(self, df_filtered, message_template, db_manager, test_mode=False, check_history=False,
+                 transport=None, post_send_wait=POST_SEND_WAIT, delay_range=DELAY_RANGE,
+                 send_window=None, clock=None, min_interval=0, retry_policy=None, attachment=None,
+                 media_cache=None, template_id=None):
         super().__init__()
+        # Horario permitido (SendingWindow) y separación mínima entre envíos para campañas programadas
+        self.send_window = send_window
+        self.clock = clock if clock is not None else SystemClock()
+        self.min_interval = min_interval
+        self.transport = transport if transport is not None else PyWhatKitTransport()
+        self.post_send_wait = post_send_wait
+        self.delay_range = delay_range
         self.df = df_filtered
         self.message_template = message_template
+        # Versión de la biblioteca de plantillas que corresponde a message_template (si se conoce)
+        self.template_id = template_id
         self.test_mode = test_mode
         self.check_history = check_history
         self.db_manager = db_manager
         self.stop_requested = False
+        self.paused = False
+        # interrupt_event corta cualquier espera en curso (detener o pausar);
+        # resume_event bloquea el hilo mientras está en pausa
+        self.interrupt_event = threading.Event()
+        self.resume_event = threading.Event()
+        self.resume_event.set()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.retry_queue = RetryQueue()
+        self.sent_numbers = set()
+        self.suppressed = SuppressionList(db_manager)
+        self.messages = None
+        # Imagen adjunta (ruta original); se prepara una sola vez en la caché de adjuntos
+        self.attachment = attachment
+        self.media_cache = media_cache if media_cache is not None else MediaCache()
+        self.prepared_media = {}
+        self.campaign_id = None
+        self.stats = None
+        self.metrics = Instrumentation(enabled=METRICS_ENABLED, max_samples=METRICS_MAX_SAMPLES)
+        self.logger = get_send_logger()
 
+    @profiled("envio")
     def run(self):
         total = 1 if self.test_mode else len(self.df)
-        processed_count = 0 # Contador para contactos procesados (intentados o saltados)
-        sent_numbers = set()
+        # Estadísticas exactas de esta sesión, sin volver a leer el historial
+        self.stats = CampaignStats(total)
+        self.campaign_id = self.db_manager.create_campaign(total, self.test_mode, self.template_id)
+        self.sent_numbers = set()
         if self.check_history:
-            sent_numbers = self.db_manager.get_sent_phones()
+            self.sent_numbers = self.db_manager.get_sent_phones()
+        # La lista de exclusión se respeta siempre, incluso en modo prueba
+        self.suppressed.load()
+        # Los reintentos pendientes de sesiones anteriores se retoman junto con esta campaña
+        if not self.test_mode:
+            pending = self.db_manager.adopt_retries(self.campaign_id)
+            if pending:
+                self.retry_queue = RetryQueue.from_rows(pending)
+                self.stats.total += len(pending)
+                self.db_manager.update_campaign(self.campaign_id, self.stats)
+                self.log(f"Se retoman {len(pending)} reintentos pendientes de envíos anteriores.")
+        if self.attachment:
+            try:
+                item = self.media_cache.prepare(self.attachment)
+                self.prepared_media[self.attachment] = item.path
+                self.log(f"Adjunto preparado: {item.source} ({item.size / 1024:.0f} KB, sha256 {item.sha256[:12]}).")
+            except Exception as e:
+                self.log(f"No se pudo preparar el adjunto, envío cancelado: {str(e)}")
+                self.stop_requested = True
         process_df = self.df.head(1) if self.test_mode else self.df
+        # Mensajes renderizados en lote (o leídos de la caché si ya se planificó la campaña)
+        with self.metrics.timer('render_bulk'):
+            self.messages = RenderCache(self.db_manager).messages_for(self.message_template, process_df)
 
         for index, row in process_df.iterrows():
+            self.wait_while_paused()
             if self.stop_requested:
                 break
+            # Un reintento vencido se intercala antes del siguiente envío nuevo
+            if not self.process_due_retry() or self.stop_requested:
+                break
+            if not self.process_row(row):
+                break
 
-            phone = str(row['Teléfono']).strip()
-            phone = re.sub(r'\D', '', phone)
-            valid_phone = False
-            formatted_phone = phone # Default to raw phone
-
-            # Phone number validation and formatting
-            if phone.startswith('9') and len(phone) == 9:
-                formatted_phone = f"+56{phone}"
-                valid_phone = True
-            elif phone.startswith('569') and len(phone) == 11:
-                formatted_phone = f"+{phone}"
-                valid_phone = True
-            elif phone.startswith('+569') and len(phone) == 12:
-                formatted_phone = phone
-                valid_phone = True
-
-            razon_social = row['Razón social']
-            ciudad = row['Ciudad']
-            rut = str(row['RUT']) # Get RUT from the row
-            nombre_contacto = str(row['Nombre contacto']) # Get Nombre contacto from the row
-
-
-            # Check history BEFORE processing
-            if self.check_history and valid_phone and formatted_phone in sent_numbers:
-                # Modified log message to include RUT and Nombre contacto
-                self.log_message.emit(f"Saltando a {razon_social} (RUT: {rut}, Contacto: {nombre_contacto}, Teléfono: {formatted_phone}): Ya enviado con éxito.")
-                processed_count += 1 # Incrementar contador de procesados
-                self.progress_update.emit(processed_count, total)
-                continue # Saltar al siguiente contacto
-
-            if valid_phone:
-                # Prepare personalized message
-                message = self.message_template
-                for col in self.df.columns:
-                    placeholder = f"[{col}]"
-                    if placeholder in message:
-                        message = message.replace(placeholder, str(row[col]))
-
-                self.log_message.emit(f"Enviando mensaje a {razon_social} ({formatted_phone})...")
-                success = False
-
-                try:
-                    # Usar pywhatkit sin especificar navegador
-                    pywhatkit.sendwhatmsg_instantly(
-                        formatted_phone,
-                        message,
-                        wait_time=15,  # Tiempo reducido
-                        tab_close=True,
-                        close_time=3   # Tiempo para cerrar la pestaña
-                    )
-
-                    # Dar tiempo para que se complete el envío
-                    time.sleep(2)
-                    success = True
-
-                except Exception as e:
-                    self.log_message.emit(f"Error al enviar a {razon_social} ({formatted_phone}): {str(e)}")
-
-                # Registrar resultado
-                resultado = "Éxito" if success else "Error"
-                self.db_manager.record_message_sent(
-                    razon_social,
-                    formatted_phone,
-                    ciudad,
-                    resultado
-                )
+        # Reintentos que siguen pendientes al terminar la lista
+        while len(self.retry_queue) and not self.stop_requested:
+            self.wait_while_paused()
+            due_at = self.retry_queue.next_due_at()
+            remaining = (due_at - self.clock.now()).total_seconds()
+            if remaining > 0:
+                self.log(f"Esperando {remaining:.0f} segundos para el siguiente reintento "
+                         f"({len(self.retry_queue)} pendientes)...")
+                self.wait_until(due_at)
+            if not self.process_due_retry():
+                break
+
+        self.stats.finish()
+        estado = "detenida" if self.stop_requested else "completada"
+        send_summary = self.metrics.snapshot()['stages'].get('send')
+        avg_send_seconds = send_summary['sum'] / send_summary['count'] if send_summary else None
+        self.db_manager.update_campaign(self.campaign_id, self.stats, estado=estado,
+                                        avg_send_seconds=avg_send_seconds)
+        self.emit_metrics()
+        self.finished_sending.emit()
+
+    def process_row(self, row):
+        # Procesa un contacto nuevo de la lista; devuelve False si se pidió detener
+        with self.metrics.timer('parse_phone'):
+            # Si el número no es válido, formatted_phone queda con los dígitos originales
+            formatted_phone, valid_phone = normalize_phone(row['Teléfono'])
+
+        razon_social = row['Razón social']
+        ciudad = row['Ciudad']
+        rut = str(row['RUT']) # Get RUT from the row
+        nombre_contacto = str(row['Nombre contacto']) # Get Nombre contacto from the row
+
+        # Check history BEFORE processing
+        if self.check_history and valid_phone and formatted_phone in self.sent_numbers:
+            # Modified log message to include RUT and Nombre contacto
+            self.log(f"Saltando a {razon_social} (RUT: {rut}, Contacto: {nombre_contacto}, Teléfono: {formatted_phone}): Ya enviado con éxito.")
+            self.skip_recipient('duplicados')
+            return True
+
+        if valid_phone and formatted_phone in self.suppressed:
+            self.log(f"Saltando a {razon_social} ({formatted_phone}): En lista de exclusión.")
+            self.skip_recipient('suprimidos')
+            return True
+
+        if not valid_phone:
+            self.log(f"Saltando a {razon_social} ({formatted_phone}): Número inválido.")
+            entry = {'id': None, 'razon_social': razon_social, 'telefono': formatted_phone, 'ciudad': ciudad}
+            self.finish_recipient(entry, "Error - Número inválido", 'invalidos')
+            return True
+
+        if not self.wait_for_window():
+            return False
+        cycle_start = self.clock.now()
+
+        # Mensaje personalizado ya renderizado
+        with self.metrics.timer('render'):
+            message = self.messages[row.name]
 
-                # Emitir señales de progreso y log
-                # self.message_sent.emit(razon_social, formatted_phone, ciudad, success) # Signal connected but slot is empty
+        self.log(f"Enviando mensaje a {razon_social} ({formatted_phone})...")
+        entry = {
+            'id': None,
+            'razon_social': razon_social,
+            'telefono': formatted_phone,
+            'ciudad': ciudad,
+            'mensaje': message,
+            'intentos': 1,
+            'adjunto': self.attachment,
+        }
+        self.deliver(entry)
+        self.pause_between_messages(cycle_start)
+        return True
 
-                processed_count += 1 # Incrementar contador de procesados
-                self.progress_update.emit(processed_count, total)
+    def process_due_retry(self):
+        # Envía como máximo un reintento vencido; devuelve False si se pidió detener
+        entry = self.retry_queue.pop_due(self.clock.now())
+        if entry is None:
+            return True
+        if self.check_history and entry['telefono'] in self.sent_numbers:
+            # El número recibió el mensaje por otra fila de la lista mientras esperaba
+            self.db_manager.delete_retry(entry['id'])
+            self.skip_recipient('duplicados')
+            return True
+        if entry['telefono'] in self.suppressed:
+            # Pidió la baja mientras el reintento esperaba
+            self.db_manager.delete_retry(entry['id'])
+            self.log(f"Reintento a {entry['razon_social']} ({entry['telefono']}) cancelado: en lista de exclusión.")
+            self.skip_recipient('suprimidos')
+            return True
+        if not self.wait_for_window():
+            # El reintento sigue guardado en cola_reintentos para la próxima sesión
+            return False
+        cycle_start = self.clock.now()
+        entry['intentos'] += 1
+        self.log(f"Reintentando ({entry['intentos']}/{self.retry_policy.max_attempts}) envío a "
+                 f"{entry['razon_social']} ({entry['telefono']})...")
+        self.deliver(entry)
+        self.pause_between_messages(cycle_start)
+        return True
 
+    def deliver(self, entry):
+        error = None
+        try:
+            media_path = self.media_path_for(entry.get('adjunto'))
+            with self.metrics.timer('send'):
+                if media_path:
+                    self.transport.send(entry['telefono'], entry['mensaje'], media_path=media_path)
+                else:
+                    self.transport.send(entry['telefono'], entry['mensaje'])
 
-                # Esperar entre mensajes
-                if not self.test_mode and processed_count < total and not self.stop_requested: # Check processed_count and stop_requested
-                    delay = random.uniform(3, 5)  # Reducido el tiempo de espera
-                    self.log_message.emit(f"Esperando {delay:.1f} segundos...")
-                    time.sleep(delay)
+            # Dar tiempo para que se complete el envío
+            with self.metrics.timer('post_send_sleep'):
+                self.wait(self.post_send_wait)
 
-            else: # Invalid phone number
-                self.log_message.emit(f"Saltando a {razon_social} ({phone}): Número inválido.")
-                self.db_manager.record_message_sent(
-                    razon_social,
-                    phone,
-                    ciudad,
-                    "Error - Número inválido"
+        except Exception as e:
+            error = e
+            self.log(f"Error al enviar a {entry['razon_social']} ({entry['telefono']}): {str(e)}")
+
+        if error is None:
+            # Un mismo número repetido en la lista recibe el mensaje una sola vez por campaña
+            if self.check_history:
+                self.sent_numbers.add(entry['telefono'])
+            self.finish_recipient(entry, "Éxito", 'enviados')
+        elif self.retry_policy.should_retry(error, entry['intentos']):
+            self.schedule_retry(entry, error)
+        else:
+            dead_letter = {
+                'mensaje': entry['mensaje'],
+                'intentos': entry['intentos'],
+                'ultimo_error': f"{type(error).__name__}: {error}",
+            }
+            self.finish_recipient(entry, "Error", 'fallidos', dead_letter=dead_letter)
+
+    def schedule_retry(self, entry, error):
+        # El reintento se guarda en cola_reintentos antes de seguir, para sobrevivir a un cierre de la app
+        delay = self.retry_policy.next_delay(entry['intentos'])
+        due_at = self.clock.now() + datetime.timedelta(seconds=delay)
+        error_text = f"{type(error).__name__}: {error}"
+        with self.metrics.timer('db_write'):
+            if entry['id'] is None:
+                entry['id'] = self.db_manager.add_retry(
+                    self.campaign_id, entry['razon_social'], entry['telefono'], entry['ciudad'],
+                    entry['mensaje'], entry['intentos'], due_at, error_text, adjunto=entry.get('adjunto')
                 )
-                # self.message_sent.emit(razon_social, phone, ciudad, False) # Signal connected but slot is empty
+            else:
+                self.db_manager.reschedule_retry(entry['id'], entry['intentos'], due_at, error_text)
+        entry['proximo_intento'] = due_at
+        self.retry_queue.push(entry)
+        self.metrics.incr('reintentos')
+        self.log(f"Reintento {entry['intentos'] + 1}/{self.retry_policy.max_attempts} para "
+                 f"{entry['razon_social']} programado en {delay:.0f} segundos.")
 
-                processed_count += 1 # Incrementar contador de procesados
-                self.progress_update.emit(processed_count, total)
+    def media_path_for(self, attachment):
+        # Los reintentos de sesiones anteriores pueden traer otro adjunto: se prepara al primer uso
+        if not attachment:
+            return None
+        if attachment not in self.prepared_media:
+            self.prepared_media[attachment] = self.media_cache.prepare(attachment).path
+        return self.prepared_media[attachment]
 
+    def finish_recipient(self, entry, resultado, counter, dead_letter=None):
+        # Resultado final de un destinatario: historial, contadores y (si corresponde) salida de la cola
+        self.stats.increment(counter)
+        self.metrics.incr(counter)
+        with self.metrics.timer('db_write'):
+            self.db_manager.record_message_sent(
+                entry['razon_social'],
+                entry['telefono'],
+                entry['ciudad'],
+                resultado,
+                campaign_id=self.campaign_id,
+                campaign_stats=self.stats,
+                retry_id=entry['id'],
+                dead_letter=dead_letter
+            )
+        self.progress_update.emit(self.stats.processed, self.stats.total)
+        self.emit_metrics()
 
-        self.finished_sending.emit()
+    def skip_recipient(self, counter):
+        # Destinatario omitido sin intentar el envío (ya enviado o en lista de exclusión)
+        self.stats.increment(counter)
+        self.metrics.incr(counter)
+        with self.metrics.timer('db_write'):
+            self.db_manager.update_campaign(self.campaign_id, self.stats)
+        self.progress_update.emit(self.stats.processed, self.stats.total)
+        self.emit_metrics()
+
+    def pause_between_messages(self, cycle_start):
+        # Esperar entre mensajes
+        if self.test_mode or self.stop_requested or self.stats.processed >= self.stats.total:
+            return
+        delay = random.uniform(*self.delay_range)
+        if self.min_interval:
+            cycle_elapsed = (self.clock.now() - cycle_start).total_seconds()
+            delay = max(delay, self.min_interval - cycle_elapsed)
+        self.log(f"Esperando {delay:.1f} segundos...")
+        with self.metrics.timer('delay'):
+            self.wait(delay)
+
+    def wait_until(self, moment):
+        remaining = (moment - self.clock.now()).total_seconds()
+        if remaining > 0:
+            self.wait(remaining)
+
+    def wait(self, seconds):
+        # Espera interrumpible: detener corta la espera al instante y una pausa congela lo que falta
+        deadline = self.clock.now() + datetime.timedelta(seconds=seconds)
+        while not self.stop_requested:
+            remaining = (deadline - self.clock.now()).total_seconds()
+            if remaining <= 0 or not self.clock.wait(remaining, self.interrupt_event):
+                return
+            if self.paused:
+                paused_at = self.clock.now()
+                self.wait_while_paused()
+                deadline += self.clock.now() - paused_at
+
+    def wait_while_paused(self):
+        if not self.paused or self.stop_requested:
+            return
+        self.log("Envío en pausa.")
+        self.db_manager.update_campaign(self.campaign_id, self.stats, estado='pausada')
+        self.emit_metrics()
+        # stop() también libera la espera
+        self.resume_event.wait()
+        if not self.stop_requested:
+            self.db_manager.update_campaign(self.campaign_id, self.stats, estado='en_curso')
+            self.log("Envío reanudado.")
+
+    def wait_for_window(self):
+        # Pausa automática fuera del horario permitido; devuelve False si se pidió detener
+        if self.send_window is None or self.send_window.is_open(self.clock.now()):
+            return True
+        reopen = self.send_window.next_open(self.clock.now())
+        self.log(f"Fuera del horario de envío. Pausa hasta {reopen:%d-%m-%Y %H:%M}.")
+        while not self.stop_requested and not self.send_window.is_open(self.clock.now()):
+            self.wait(min(60, max(self.send_window.seconds_until_open(self.clock.now()), 0.001)))
+        if not self.stop_requested:
+            self.log("Reanudando envío dentro del horario permitido.")
+        return not self.stop_requested
+
+    def log(self, text):
+        # El log completo va al archivo rotativo; la ventana solo muestra las últimas líneas
+        self.logger.info(text)
+        self.log_message.emit(text)
+
+    def emit_metrics(self):
+        if not self.metrics.enabled:
+            return
+        self.metrics_update.emit(self.metrics_snapshot())
+
+    def metrics_snapshot(self):
+        # Velocidad y tiempo restante estimado a partir del avance de la sesión
+        snapshot = self.metrics.snapshot()
+        processed = self.stats.processed
+        remaining = max(self.stats.total - processed, 0)
+        snapshot['msgs_por_min'] = self.stats.msgs_per_min
+        snapshot['eta_segundos'] = self.stats.elapsed / processed * remaining if processed else None
+        snapshot['procesados'] = processed
+        snapshot['total'] = self.stats.total
+        return snapshot
+
+    def pause(self):
+        self.paused = True
+        self.resume_event.clear()
+        self.interrupt_event.set()
+
+    def resume(self):
+        self.paused = False
+        self.interrupt_event.clear()
+        self.resume_event.set()
 
     def stop(self):
+        # Efecto inmediato: interrumpe la espera en curso y libera una pausa.
+        # La llamada a pywhatkit en curso no se puede cortar; su resultado se registra igual.
         self.stop_requested = True
+        self.interrupt_event.set()
+        self.resume_event.set()
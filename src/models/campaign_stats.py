@@ -0,0 +1,53 @@
+import time
+
+# Contadores de una campaña, mantenidos en memoria por el hilo de envío
+CAMPAIGN_COUNTERS = ('enviados', 'fallidos', 'duplicados', 'invalidos', 'suprimidos')
+
+
+class CampaignStats:
+    def __init__(self, total=0):
+        self.total = total
+        self.enviados = 0
+        self.fallidos = 0
+        self.duplicados = 0
+        self.invalidos = 0
+        self.suprimidos = 0
+        self._start = time.monotonic()
+        self._end = None
+
+    def increment(self, counter):
+        if counter not in CAMPAIGN_COUNTERS:
+            raise ValueError(f"Contador desconocido: {counter}")
+        setattr(self, counter, getattr(self, counter) + 1)
+
+    def finish(self):
+        if self._end is None:
+            self._end = time.monotonic()
+
+    @property
+    def processed(self):
+        return self.enviados + self.fallidos + self.duplicados + self.invalidos + self.suprimidos
+
+    @property
+    def elapsed(self):
+        end = self._end if self._end is not None else time.monotonic()
+        return end - self._start
+
+    @property
+    def msgs_per_min(self):
+        elapsed = self.elapsed
+        if elapsed <= 0:
+            return 0.0
+        return self.enviados * 60.0 / elapsed
+
+    def as_dict(self):
+        return {
+            'total': self.total,
+            'enviados': self.enviados,
+            'fallidos': self.fallidos,
+            'duplicados': self.duplicados,
+            'invalidos': self.invalidos,
+            'suprimidos': self.suprimidos,
+            'segundos': round(self.elapsed, 3),
+            'msgs_por_min': round(self.msgs_per_min, 2),
+        }
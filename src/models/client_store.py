@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+from ..utils.constants import REQUIRED_COLUMNS, CATEGORY_MAX_RATIO, FILTER_COLUMNS
+from .database import CLIENT_COLUMNS, filter_key
+
+
+def _phone_codes(e164_values):
+    # '+56912345678' -> 56912345678; 0 si el número no es válido
+    digits = pd.Series(e164_values, dtype=object).fillna('').str.lstrip('+')
+    return pd.to_numeric(digits.where(digits != '', '0'), errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+
+
+class ClientStore:
+    """Clientes en memoria en formato compacto, compartido por todas las vistas.
+
+    Las columnas repetitivas (ciudad, comuna, giro...) se guardan como códigos enteros con su diccionario
+    de valores (pandas Categorical) y el teléfono como entero E.164. El texto original del teléfono solo
+    se conserva para los números inválidos. Una vista es un arreglo de posiciones: filtrar no copia datos.
+
+    Para las columnas de filtro se precalcula, por cada valor según filter_key (igual que _filter_clause), el
+    arreglo ordenado de filas que lo tienen, junto al código de valor de cada fila. Un filtro devuelve ese
+    arreglo tal cual; varios filtros parten del grupo más chico y comparan los códigos de las demás columnas.
+    """
+
+    def __init__(self, ids, columns, phones, invalid_phones):
+        self.ids = ids
+        self.columns = columns
+        self.phones = phones
+        self.invalid_phones = invalid_phones
+        # Acceso directo por celda para el modelo de la tabla
+        self._cells = {}
+        for name, values in columns.items():
+            if isinstance(values, pd.Categorical):
+                self._cells[name] = (values.codes, values.categories.to_numpy(dtype=object))
+            else:
+                self._cells[name] = (None, values)
+        self._all = np.arange(len(ids), dtype=np.intp)
+        self._indexes = {column: self._build_index(column) for column in FILTER_COLUMNS}
+
+    @classmethod
+    def from_db(cls, db_manager, category_max_ratio=CATEGORY_MAX_RATIO):
+        wanted = ['id', 'telefono_e164', 'telefono'] + [
+            CLIENT_COLUMNS[name] for name in REQUIRED_COLUMNS if name != 'Teléfono'
+        ]
+        db_names = {db: name for name, db in CLIENT_COLUMNS.items()}
+        ids = phones = raw_phones = None
+        columns = {}
+        for column, values in db_manager.iter_client_columns(wanted):
+            if column == 'id':
+                ids = np.asarray(values, dtype=np.int64)
+            elif column == 'telefono_e164':
+                phones = _phone_codes(values)
+            elif column == 'telefono':
+                raw_phones = values
+            else:
+                columns[db_names[column]] = cls._compact(values, category_max_ratio)
+        invalid = np.flatnonzero(phones == 0)
+        invalid_phones = {int(position): '' if raw_phones[position] is None else str(raw_phones[position])
+                          for position in invalid}
+        return cls(ids, columns, phones, invalid_phones)
+
+    @staticmethod
+    def _compact(values, category_max_ratio):
+        # Diccionario de valores solo si la columna se repite lo suficiente; si no, texto tal cual
+        values = pd.Series(values, dtype=object).fillna('').astype(str).to_numpy(dtype=object)
+        if len(values) and len(pd.unique(values)) <= category_max_ratio * len(values):
+            return pd.Categorical(values)
+        return values
+
+    def _build_index(self, column):
+        codes, values = self._cells[column]
+        if codes is None:
+            codes, values = pd.factorize(values)
+            values = np.asarray(values, dtype=object)
+        # Valores que solo difieren en mayúsculas comparten código; filter_key se aplica a cada valor distinto
+        labels = pd.Index([filter_key(value) for value in values], dtype=object)
+        label_codes, label_uniques = pd.factorize(labels)
+        row_codes = label_codes[codes].astype(np.min_scalar_type(max(len(label_uniques) - 1, 0)))
+        # Orden estable: cada grupo queda con sus filas en orden creciente
+        order = np.argsort(row_codes, kind='stable').astype(np.intp)
+        bounds = np.r_[0, np.cumsum(np.bincount(row_codes, minlength=len(label_uniques)))]
+        groups = {label: (code, order[bounds[code]:bounds[code + 1]]) for code, label in enumerate(label_uniques)}
+        return row_codes, groups
+
+    def __len__(self):
+        return len(self.ids)
+
+    def all(self):
+        return ClientView(self, self._all)
+
+    def unique_values(self, column):
+        # Valores distintos (según filter_key) de una columna de filtro, sin el vacío
+        return sorted(label for label in self._indexes[column][1] if label)
+
+    def positions_for(self, filters):
+        # filters: {columna: valor o None}; sin filtros activos se devuelven todas las filas
+        selected = []
+        for column, value in filters.items():
+            if not value:
+                continue
+            row_codes, groups = self._indexes[column]
+            group = groups.get(filter_key(value))
+            if group is None:
+                return np.empty(0, dtype=np.intp)
+            selected.append((row_codes, group))
+        if not selected:
+            return self._all
+        selected.sort(key=lambda item: len(item[1][1]))
+        positions = selected[0][1][1]
+        for row_codes, (code, _) in selected[1:]:
+            positions = positions[row_codes[positions] == code]
+        return positions
+
+    def filter(self, city=None, commune=None, giro=None):
+        return ClientView(self, self.positions_for({'Ciudad': city, 'Comuna': commune, 'Giro': giro}))
+
+    def view_for_ids(self, ids):
+        # Los ids de clientes vienen ordenados igual que el almacén (por id)
+        positions = np.searchsorted(self.ids, ids)
+        valid = positions < len(self.ids)
+        valid[valid] = self.ids[positions[valid]] == ids[valid]
+        return ClientView(self, positions[valid])
+
+    def cell(self, position, column):
+        if column == 'Teléfono':
+            phone = self.phones[position]
+            return f"+{phone}" if phone else self.invalid_phones.get(int(position), '')
+        codes, values = self._cells[column]
+        return values[codes[position]] if codes is not None else values[position]
+
+    def phone_text(self, positions):
+        phones = self.phones[positions]
+        text = np.char.add('+', phones.astype(str)).astype(object)
+        for index in np.flatnonzero(phones == 0):
+            text[index] = self.invalid_phones.get(int(positions[index]), '')
+        return text
+
+    def memory_usage(self):
+        # Bytes ocupados por el almacén, incluidos los diccionarios de valores y los textos
+        total = self.ids.nbytes + self.phones.nbytes + self._all.nbytes
+        for row_codes, groups in self._indexes.values():
+            total += row_codes.nbytes + sum(positions.nbytes for _, positions in groups.values())
+        total += sum(len(text) + 50 for text in self.invalid_phones.values())
+        for values in self.columns.values():
+            if isinstance(values, pd.Categorical):
+                total += pd.Series(values).memory_usage(deep=True, index=False)
+            else:
+                total += pd.Series(values, dtype=object).memory_usage(deep=True, index=False)
+        return int(total)
+
+
+class ClientView:
+    """Subconjunto de un ClientStore como arreglo de posiciones, sin copiar las columnas."""
+
+    def __init__(self, store, positions):
+        self.store = store
+        # Sin copia si ya es un arreglo de posiciones (p. ej. el índice precalculado de un valor)
+        self.positions = np.asarray(positions, dtype=np.intp)
+        self.columns = pd.Index(REQUIRED_COLUMNS)
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def shape(self):
+        return (len(self.positions), len(self.columns))
+
+    def cell(self, row, column):
+        return self.store.cell(self.positions[row], self.columns[column])
+
+    def to_frame(self):
+        # DataFrame con el formato de las planillas, solo para las filas de la vista (p. ej. al enviar)
+        data = {}
+        for name in REQUIRED_COLUMNS:
+            if name == 'Teléfono':
+                # Igual que PHONE_DISPLAY_SQL en las consultas: el envío y el plan renderizan el mismo texto
+                data[name] = self.store.phone_text(self.positions)
+            else:
+                codes, values = self.store._cells[name]
+                data[name] = values[codes[self.positions]] if codes is not None else values[self.positions]
+        return pd.DataFrame(data, index=pd.RangeIndex(len(self.positions)))
+
+    def memory_usage(self):
+        return int(self.positions.nbytes)
@@ -0,0 +1,130 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from itertools import groupby
+
+import numpy as np
+import pandas as pd
+
+from ..utils.phone import normalize_phones
+from ..utils.rut import rut_keys
+
+# Sufijos societarios que no distinguen a una empresa de otra
+LEGAL_SUFFIXES = re.compile(
+    r'\b(spa|s a|sa|ltda|limitada|eirl|e i r l|y cia|cia|sociedad|comercial)\b'
+)
+
+FUZZY_NAME_THRESHOLD = 0.85
+REPORT_COLUMNS = ['grupo', 'filas', 'motivo', 'Razón social', 'RUT', 'Teléfono']
+
+
+def normalize_name_keys(values):
+    # Clave aproximada por nombre: sin tildes, puntuación ni sufijos societarios, palabras ordenadas
+    def key(name):
+        text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode().lower()
+        text = re.sub(r'[^a-z0-9 ]', ' ', text)
+        text = LEGAL_SUFFIXES.sub(' ', text)
+        return ' '.join(sorted(text.split()))
+    return pd.Series(values, dtype="object").fillna("").map(key)
+
+
+def _block_edges(key):
+    # Bloqueo por hash: cada fila se enlaza con la primera fila de su bloque (misma clave)
+    codes, _ = pd.factorize(key.where(key != '', None), use_na_sentinel=True)
+    rows = np.flatnonzero(codes >= 0)
+    codes = codes[rows]
+    first = np.full(codes.max() + 1 if len(codes) else 0, len(key), dtype=np.int64)
+    np.minimum.at(first, codes, rows)
+    targets = first[codes]
+    keep = targets != rows
+    return rows[keep], targets[keep]
+
+
+def _connected_components(sources, targets, n_rows):
+    # Componentes conexas: propagación de la etiqueta mínima por las aristas y salto de punteros
+    labels = np.arange(n_rows, dtype=np.int64)
+    while True:
+        previous = labels.copy()
+        lowest = np.minimum(labels[sources], labels[targets])
+        np.minimum.at(labels, sources, lowest)
+        np.minimum.at(labels, targets, lowest)
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def _similar_names(names, sources, targets, threshold):
+    return np.array([
+        not names[a] or not names[b] or SequenceMatcher(None, names[a], names[b]).ratio() >= threshold
+        for a, b in zip(sources, targets)
+    ], dtype=bool)
+
+
+def deduplicate_contacts(df, fuzzy_names=False):
+    """Agrupa filas del mismo contacto por teléfono o RUT normalizados.
+
+    Con fuzzy_names=True, además se exige que la razón social sea parecida. df trae las columnas
+    Origen y Fila de la importación, con las que el reporte identifica cada fila en su planilla.
+
+    Devuelve (filas canónicas, reporte de fusiones). La fila canónica es la primera del
+    grupo, completando sus campos vacíos con los valores de las demás filas.
+    """
+    df = df.reset_index(drop=True)
+    n_rows = len(df)
+    if n_rows == 0:
+        return df, pd.DataFrame(columns=REPORT_COLUMNS)
+
+    keys = {
+        'teléfono': normalize_phones(df['Teléfono']).reset_index(drop=True),
+        'rut': rut_keys(df['RUT']).reset_index(drop=True),
+    }
+    edges = [_block_edges(key) for key in keys.values()]
+    sources = np.concatenate([edge[0] for edge in edges])
+    targets = np.concatenate([edge[1] for edge in edges])
+    if fuzzy_names:
+        # Dentro de cada bloque solo se fusionan filas con nombres parecidos, para no unir
+        # empresas distintas que comparten, por ejemplo, el teléfono de su contador
+        involved = np.unique(np.concatenate([sources, targets]))
+        names = np.full(n_rows, '', dtype=object)
+        names[involved] = normalize_name_keys(df['Razón social'].to_numpy()[involved]).to_numpy()
+        similar = _similar_names(names, sources, targets, FUZZY_NAME_THRESHOLD)
+        sources, targets = sources[similar], targets[similar]
+
+    labels = _connected_components(sources, targets, n_rows)
+
+    sizes = np.bincount(labels, minlength=n_rows)
+    merged = sizes[labels] > 1
+    if not merged.any():
+        return df, pd.DataFrame(columns=REPORT_COLUMNS)
+
+    # Fila canónica: primer valor no vacío de cada columna dentro del grupo (orden original).
+    # Solo se agrupan las filas fusionadas; el resto se conserva tal cual.
+    grouped = df[merged].replace('', np.nan).groupby(labels[merged], sort=True).first().fillna('')
+    keep = ~merged | (labels == np.arange(n_rows))
+    canonical = df[keep].copy()
+    representatives = labels[keep & merged]
+    canonical.loc[merged[keep], df.columns] = grouped.loc[representatives, df.columns].to_numpy()
+    canonical = canonical.reset_index(drop=True)
+
+    # Reporte de fusiones: solo recorre las filas fusionadas, agrupadas por etiqueta
+    rows = np.flatnonzero(merged)
+    rows = rows[np.argsort(labels[rows], kind='stable')]
+    columns = {name: df[name].astype(str).to_numpy() for name in ('Razón social', 'RUT', 'Teléfono')}
+    locations = (df['Origen'].astype(str) + ':' + df['Fila'].astype(str)).to_numpy()
+    key_values = {name: key.to_numpy() for name, key in keys.items()}
+    records = []
+    for label, members in groupby(rows, key=lambda row: labels[row]):
+        members = list(members)
+        shared = [
+            name for name, values in key_values.items()
+            if values[members[0]] != '' and all(values[row] == values[members[0]] for row in members)
+        ]
+        record = {
+            'grupo': int(label),
+            'filas': ', '.join(locations[row] for row in members),
+            'motivo': ', '.join(shared) if shared else 'coincidencia encadenada',
+        }
+        for name, values in columns.items():
+            record[name] = ' | '.join(dict.fromkeys(values[row] for row in members))
+        records.append(record)
+    return canonical, pd.DataFrame(records, columns=REPORT_COLUMNS)
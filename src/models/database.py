@@ -1,14 +1,67 @@
+import datetime
+import logging
+import os
 import sqlite3
+import numpy as np
 import pandas as pd
-from PyQt5.QtWidgets import QMessageBox
+from ..utils.phone import normalize_phones
+from ..utils.rut import normalize_ruts
+from .contact_dedup import deduplicate_contacts
+from .ingestion import read_sources, validate_rows
+from .maintenance import archive_file_for
+from ..utils.profiling import profiled
+from ..utils.constants import (
+    REQUIRED_COLUMNS, IMPORT_MAX_WORKERS, IMPORT_CHUNK_SIZE, RENDER_CACHE_MAX_TEMPLATES, DB_BUSY_TIMEOUT
+)
+
+# Columnas de clientes con el nombre que usan las planillas
+CLIENT_COLUMNS = {
+    'Razón social': 'razon_social',
+    'RUT': 'rut',
+    'Giro': 'giro',
+    'Dirección': 'direccion',
+    'Comuna': 'comuna',
+    'Ciudad': 'ciudad',
+    'Nombre contacto': 'nombre_contacto',
+    'Teléfono': 'telefono',
+}
+# Estados de trabajos_envio que aún no tienen resultado
+OPEN_JOB_STATES = ('pendiente', 'reservado', 'enviando')
+# Estados finales de una campaña: solo estos fijan fecha_fin (pausar y reanudar no la terminan)
+FINAL_CAMPAIGN_STATES = ('completada', 'detenida', 'error')
+RUT_CONFLICT_REASON = "RUT repetido"
+# Reintentos que una campaña real puede retomar: los de campañas en modo prueba no se envían de verdad
+ADOPTABLE_RETRIES = "(campaign_id IS NULL OR campaign_id NOT IN (SELECT id FROM campaigns WHERE modo_prueba = 1))"
+# Teléfono tal como lo muestra ClientStore: E.164 si es válido y, si no, el texto original. Planificación,
+# vista previa y envío renderizan [Teléfono] igual y comparten las claves de la caché de mensajes.
+PHONE_DISPLAY_SQL = "CASE WHEN telefono_e164 != '' THEN telefono_e164 ELSE COALESCE(telefono, '') END"
+
+logger = logging.getLogger(__name__)
+
+
+def filter_key(value):
+    # Clave de los filtros por ciudad, comuna y giro. La usan ClientStore y, registrada como FILTER_KEY,
+    # las consultas: LOWER de SQLite solo pasa a minúsculas letras ASCII ('CONCEPCIÓN' -> 'concepciÓn')
+    return None if value is None else str(value).lower()
+
 
 class DatabaseManager:
     def __init__(self, db_file="nostra_whatsapp.db"):
         self.db_file = db_file
+        self.last_import_merges = None
+        self.last_import_sources = None
+        # Filas descartadas en la última importación por repetir un RUT válido (DataFrame o None)
+        self.last_import_rut_conflicts = None
+        # Filas sin teléfono válido (o vacías) de la última importación, con la columna Motivo
+        self.last_import_rejected = None
+        self.rut_index_unique = True
         self.create_tables()
 
     def get_connection(self):
-        return sqlite3.connect(self.db_file)
+        # Con varios nodos sobre la misma base, las escrituras esperan el bloqueo en vez de fallar al instante
+        conn = sqlite3.connect(self.db_file, timeout=DB_BUSY_TIMEOUT)
+        conn.create_function("FILTER_KEY", 1, filter_key, deterministic=True)
+        return conn
 
     def create_tables(self):
         conn = self.get_connection()
@@ -36,44 +89,368 @@ class DatabaseManager:
             resultado TEXT
         )
         ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS campaigns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha_inicio TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            fecha_fin TIMESTAMP,
+            estado TEXT DEFAULT 'en_curso',
+            modo_prueba INTEGER DEFAULT 0,
+            total INTEGER DEFAULT 0,
+            enviados INTEGER DEFAULT 0,
+            fallidos INTEGER DEFAULT 0,
+            duplicados INTEGER DEFAULT 0,
+            invalidos INTEGER DEFAULT 0,
+            segundos REAL DEFAULT 0
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS campanas_programadas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            inicio_programado TEXT NOT NULL,
+            estado TEXT DEFAULT 'pendiente',
+            plantilla TEXT,
+            filtros TEXT,
+            evitar_reenvios INTEGER DEFAULT 1,
+            respetar_horario INTEGER DEFAULT 1,
+            mensajes_por_hora REAL,
+            campaign_id INTEGER
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS exportaciones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            tabla TEXT NOT NULL,
+            formato TEXT,
+            ruta TEXT,
+            desde_id INTEGER,
+            hasta_id INTEGER,
+            filas INTEGER
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cola_reintentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            campaign_id INTEGER,
+            razon_social TEXT,
+            telefono TEXT,
+            ciudad TEXT,
+            mensaje TEXT,
+            intentos INTEGER DEFAULT 1,
+            proximo_intento TEXT NOT NULL,
+            ultimo_error TEXT,
+            adjunto TEXT
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS envios_fallidos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            campaign_id INTEGER,
+            razon_social TEXT,
+            telefono TEXT,
+            ciudad TEXT,
+            mensaje TEXT,
+            intentos INTEGER,
+            ultimo_error TEXT
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS mensajes_renderizados (
+            plantilla_hash TEXT NOT NULL,
+            fila_hash INTEGER NOT NULL,
+            mensaje TEXT,
+            fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (plantilla_hash, fila_hash)
+        ) WITHOUT ROWID
+        ''')
+        # Último uso (lectura o escritura) de cada plantilla en la caché, para descartar la menos usada
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS uso_mensajes_renderizados (
+            plantilla_hash TEXT PRIMARY KEY,
+            ultimo_uso TEXT NOT NULL
+        )
+        ''')
+        cursor.execute('''
+        INSERT OR IGNORE INTO uso_mensajes_renderizados (plantilla_hash, ultimo_uso)
+        SELECT plantilla_hash, MAX(fecha) FROM mensajes_renderizados GROUP BY plantilla_hash
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS plantillas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            contenido TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            variables TEXT,
+            desconocidas TEXT,
+            fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (nombre, version)
+        )
+        ''')
+        # Cola compartida de envíos para nodos trabajadores (worker.py): un trabajo por destinatario
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS trabajos_envio (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            campaign_id INTEGER NOT NULL,
+            razon_social TEXT,
+            telefono TEXT NOT NULL,
+            ciudad TEXT,
+            mensaje TEXT,
+            adjunto TEXT,
+            cuenta TEXT,
+            estado TEXT DEFAULT 'pendiente',
+            intentos INTEGER DEFAULT 0,
+            disponible_desde TEXT,
+            nodo TEXT,
+            lease_hasta TEXT,
+            ultimo_error TEXT,
+            UNIQUE (campaign_id, telefono)
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cuentas_envio (
+            cuenta TEXT PRIMARY KEY,
+            ultimo_envio TEXT,
+            envios INTEGER DEFAULT 0
+        )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trabajos_estado ON trabajos_envio(estado, disponible_desde)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trabajos_telefono ON trabajos_envio(telefono)")
+        # Lista de exclusión: números que pidieron no recibir mensajes (clave = teléfono E.164)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS suppressed_phones (
+            telefono TEXT PRIMARY KEY,
+            motivo TEXT,
+            origen TEXT,
+            fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+        ''')
+        # Migración de bases creadas antes de existir la tabla de campañas
+        self._add_column_if_missing(cursor, 'historial_envios', 'campaign_id', 'INTEGER')
+        self._add_column_if_missing(cursor, 'campaigns', 'seg_envio_promedio', 'REAL')
+        self._add_column_if_missing(cursor, 'campaigns', 'suprimidos', 'INTEGER DEFAULT 0')
+        # Ruta original del adjunto (imagen) de un reintento o de una campaña programada
+        self._add_column_if_missing(cursor, 'cola_reintentos', 'adjunto', 'TEXT')
+        self._add_column_if_missing(cursor, 'campanas_programadas', 'adjunto', 'TEXT')
+        # Versión exacta de la plantilla usada por cada campaña
+        self._add_column_if_missing(cursor, 'campaigns', 'plantilla_id', 'INTEGER')
+        self._add_column_if_missing(cursor, 'campanas_programadas', 'plantilla_id', 'INTEGER')
+        # Teléfono normalizado a E.164 ('' si no es válido) para deduplicar y cruzar con el historial en SQL
+        if self._add_column_if_missing(cursor, 'clientes', 'telefono_e164', 'TEXT'):
+            self._backfill_phone_e164(cursor)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_clientes_telefono_e164 ON clientes(telefono_e164)")
+        # RUT como clave entera (cuerpo sin dígito verificador) más su validación módulo 11
+        rut_added = self._add_column_if_missing(cursor, 'clientes', 'rut_num', 'INTEGER')
+        rut_added = self._add_column_if_missing(cursor, 'clientes', 'rut_valido', 'INTEGER DEFAULT 0') or rut_added
+        if rut_added:
+            self._backfill_rut(cursor)
+        self.rut_index_unique = self._ensure_rut_index(cursor)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_historial_telefono_resultado ON historial_envios(telefono, resultado)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_historial_fecha ON historial_envios(fecha_hora)")
+        # Último envío exitoso por teléfono: la deduplicación no depende del historial completo, que se
+        # archiva por mes (src/models/maintenance.py). Un trigger lo mantiene con cada resultado 'Éxito'.
+        summary_exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ultimo_envio_exitoso'"
+        ).fetchone()
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ultimo_envio_exitoso (
+            telefono TEXT PRIMARY KEY,
+            fecha TIMESTAMP,
+            campaign_id INTEGER
+        ) WITHOUT ROWID
+        ''')
+        if not summary_exists:
+            cursor.execute('''
+            INSERT INTO ultimo_envio_exitoso (telefono, fecha, campaign_id)
+            SELECT telefono, MAX(fecha_hora), campaign_id
+            FROM historial_envios
+            WHERE resultado = 'Éxito' AND telefono IS NOT NULL
+            GROUP BY telefono
+            ''')
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_historial_exito AFTER INSERT ON historial_envios
+        WHEN NEW.resultado = 'Éxito' AND NEW.telefono IS NOT NULL
+        BEGIN
+            INSERT INTO ultimo_envio_exitoso (telefono, fecha, campaign_id)
+            VALUES (NEW.telefono, NEW.fecha_hora, NEW.campaign_id)
+            ON CONFLICT(telefono) DO UPDATE SET fecha = excluded.fecha, campaign_id = excluded.campaign_id
+            WHERE excluded.fecha >= ultimo_envio_exitoso.fecha;
+        END
+        ''')
+        # Eliminaciones del historial desde la ventana de historial: copia de las filas para deshacerlas
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS eliminaciones_historial (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            filas INTEGER DEFAULT 0,
+            deshecha INTEGER DEFAULT 0
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS historial_eliminado (
+            eliminacion_id INTEGER NOT NULL,
+            id INTEGER NOT NULL,
+            fecha_hora TIMESTAMP,
+            razon_social TEXT,
+            telefono TEXT,
+            ciudad TEXT,
+            resultado TEXT,
+            campaign_id INTEGER,
+            PRIMARY KEY (eliminacion_id, id)
+        ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS mantenimientos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            detalle TEXT
+        )
+        ''')
         conn.commit()
         conn.close()
 
-    def import_excel_to_db(self, excel_file):
+    def _add_column_if_missing(self, cursor, table, column, definition):
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            return True
+        return False
+
+    def _backfill_phone_e164(self, cursor):
+        rows = cursor.execute("SELECT id, telefono FROM clientes").fetchall()
+        if not rows:
+            return
+        ids, phones = zip(*rows)
+        cursor.executemany(
+            "UPDATE clientes SET telefono_e164 = ? WHERE id = ?",
+            zip(normalize_phones(list(phones)).tolist(), ids)
+        )
+
+    def _backfill_rut(self, cursor):
+        rows = cursor.execute("SELECT id, rut FROM clientes").fetchall()
+        if not rows:
+            return
+        ids, ruts = zip(*rows)
+        normalized = normalize_ruts(list(ruts))
+        cursor.executemany(
+            "UPDATE clientes SET rut_num = ?, rut_valido = ? WHERE id = ?",
+            zip(normalized['rut_num'].tolist(), normalized['rut_valido'].astype(int).tolist(), ids)
+        )
+
+    def _ensure_rut_index(self, cursor):
+        # Índice único solo sobre RUTs válidos: búsquedas por RUT en O(log n). Devuelve False si no pudo ser único
+        try:
+            cursor.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_clientes_rut_num ON clientes(rut_num) WHERE rut_valido = 1"
+            )
+            return True
+        except sqlite3.IntegrityError:
+            # Bases antiguas pueden tener RUTs repetidos; se usa un índice simple hasta la próxima importación
+            logger.warning("Hay RUTs repetidos en clientes; el índice por RUT no será único hasta la próxima importación")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_clientes_rut_num_no_unico ON clientes(rut_num)")
+            return False
+
+    @profiled("import_excel_to_db")
+    def import_excel_to_db(self, excel_file, deduplicate=True, fuzzy_names=False):
+        return self.import_sources_to_db([excel_file], deduplicate, fuzzy_names, max_workers=1)
+
+    def import_sources_to_db(self, paths, deduplicate=True, fuzzy_names=False, max_workers=IMPORT_MAX_WORKERS):
+        # Archivos, carpetas y hojas se leen en paralelo y se guardan juntos en una sola transacción
+        try:
+            df, loaded, errors = read_sources(paths, max_workers=max_workers)
+            self.last_import_sources = (loaded, errors)
+            if not loaded:
+                if errors:
+                    return False, "; ".join(f"{origin}: {error}" for origin, error in errors)
+                return False, "No se encontraron planillas ni archivos CSV para importar."
+            if len(df) == 0:
+                return False, "Las planillas no tienen filas para importar. No se modificaron los clientes."
+            # Misma validación que la importación desde la interfaz: sin teléfono válido no se importa
+            df, self.last_import_rejected = validate_rows(df)
+            rejected = len(self.last_import_rejected)
+            total_rows = len(df)
+            if total_rows == 0:
+                return False, (f"No hay filas válidas para importar ({rejected} filas rechazadas). "
+                               "No se modificaron los clientes.")
+            # Un mismo contacto (teléfono o RUT) queda como una sola fila canónica
+            self.last_import_merges = None
+            if deduplicate:
+                df, self.last_import_merges = deduplicate_contacts(df, fuzzy_names=fuzzy_names)
+            imported = self.replace_clients(df)
+            conflicts = len(self.last_import_rut_conflicts)
+            merged = total_rows - imported - conflicts
+            message = f"Se importaron {imported} registros."
+            if merged:
+                message += f"\n{merged} filas duplicadas fusionadas."
+            if rejected:
+                message += f"\n{rejected} filas rechazadas (sin teléfono válido o vacías)."
+            if conflicts:
+                message += f"\n{conflicts} filas omitidas por repetir el RUT de otro cliente."
+            if len(loaded) > 1:
+                message += f"\nFuentes leídas: {len(loaded)}."
+            if errors:
+                message += "\nOmitidas: " + "; ".join(f"{origin} ({error})" for origin, error in errors)
+            return True, message
+        except Exception as e:
+            return False, f"Error al importar: {str(e)}"
+
+    def replace_clients(self, df, progress=None, should_cancel=None, chunk_size=IMPORT_CHUNK_SIZE):
+        # Todo en una transacción: si should_cancel() se cumple entre lotes se deshace y se devuelve None,
+        # dejando los clientes anteriores intactos. progress(filas_escritas) se llama tras cada lote.
+        # Un RUT válido repetido (p. ej. sin deduplicar, o con nombres distintos en la deduplicación difusa)
+        # conserva la primera fila; las demás quedan en last_import_rut_conflicts con las columnas recibidas.
+        df = df.copy()
+        df['telefono_e164'] = normalize_phones(df['Teléfono'])
+        ruts = normalize_ruts(df['RUT'])
+        df['rut_num'] = ruts['rut_num'].to_numpy()
+        df['rut_valido'] = ruts['rut_valido'].astype(int).to_numpy()
+        repeated = (df['rut_valido'] == 1) & df['rut_num'].where(df['rut_valido'] == 1).duplicated()
+        self.last_import_rut_conflicts = df.loc[repeated, df.columns.drop(['telefono_e164', 'rut_num', 'rut_valido'])].assign(Motivo=RUT_CONFLICT_REASON)
+        rows = df.loc[~repeated, REQUIRED_COLUMNS + ['telefono_e164', 'rut_num', 'rut_valido']]
+        conn = self.get_connection()
         try:
-            df = pd.read_excel(excel_file)
-            required_columns = [
-                'Razón social', 'RUT', 'Giro', 'Dirección', 'Comuna',
-                'Ciudad', 'Nombre contacto', 'Teléfono'
-            ]
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                return False, f"Columnas faltantes: {', '.join(missing_columns)}"
-            df = df.fillna("")
-            for col in required_columns:
-                df[col] = df[col].astype(str)
-            conn = self.get_connection()
             cursor = conn.cursor()
             cursor.execute("DELETE FROM clientes")
-            for _, row in df.iterrows():
-                cursor.execute('''
-                INSERT INTO clientes (razon_social, rut, giro, direccion, comuna, ciudad, nombre_contacto, telefono)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    row['Razón social'],
-                    row['RUT'],
-                    row['Giro'],
-                    row['Dirección'],
-                    row['Comuna'],
-                    row['Ciudad'],
-                    row['Nombre contacto'],
-                    row['Teléfono']
-                ))
+            # Con la tabla vacía el índice único por RUT siempre se puede crear
+            cursor.execute("DROP INDEX IF EXISTS idx_clientes_rut_num_no_unico")
+            self._ensure_rut_index(cursor)
+            for start in range(0, len(rows), chunk_size):
+                if should_cancel is not None and should_cancel():
+                    conn.rollback()
+                    return None
+                cursor.executemany('''
+                INSERT INTO clientes (razon_social, rut, giro, direccion, comuna, ciudad, nombre_contacto, telefono,
+                                      telefono_e164, rut_num, rut_valido)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows.iloc[start:start + chunk_size].itertuples(index=False, name=None))
+                if progress is not None:
+                    progress(min(start + chunk_size, len(rows)))
+            if should_cancel is not None and should_cancel():
+                conn.rollback()
+                return None
+            imported = cursor.execute("SELECT COUNT(*) FROM clientes").fetchone()[0]
             conn.commit()
+            return imported
+        finally:
             conn.close()
-            return True, f"Se importaron {len(df)} registros."
-        except Exception as e:
-            return False, f"Error al importar: {str(e)}"
+
+    def get_client_by_rut(self, rut):
+        ruts = normalize_ruts([rut])
+        if not ruts['rut_valido'].iloc[0]:
+            return None
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        row = conn.execute(
+            "SELECT * FROM clientes WHERE rut_num = ? AND rut_valido = 1",
+            (int(ruts['rut_num'].iloc[0]),)
+        ).fetchone()
+        conn.close()
+        return dict(row) if row is not None else None
 
     def get_all_clients(self):
         conn = self.get_connection()
@@ -85,13 +462,38 @@ class DatabaseManager:
                comuna as 'Comuna',
                ciudad as 'Ciudad',
                nombre_contacto as 'Nombre contacto',
-               telefono as 'Teléfono'
+               ''' + PHONE_DISPLAY_SQL + ''' as 'Teléfono'
         FROM clientes
         '''
         df = pd.read_sql_query(query, conn)
         conn.close()
         return df
 
+    def iter_client_columns(self, columns):
+        # Una columna a la vez (ordenada por id) dentro de una misma lectura: quien la recibe puede
+        # compactarla antes de que se lea la siguiente
+        allowed = {'id', 'telefono_e164', *CLIENT_COLUMNS.values()}
+        conn = self.get_connection()
+        try:
+            conn.execute("BEGIN")
+            for column in columns:
+                if column not in allowed:
+                    raise ValueError(f"Columna desconocida: {column}")
+                yield column, [row[0] for row in conn.execute(f"SELECT {column} FROM clientes ORDER BY id")]
+        finally:
+            conn.rollback()
+            conn.close()
+
+    def get_filtered_client_ids(self, city=None, commune=None, giro=None):
+        conn = self.get_connection()
+        filter_sql, params = self._filter_clause(city, commune, giro)
+        ids = np.fromiter(
+            (row[0] for row in conn.execute("SELECT id FROM clientes WHERE 1=1" + filter_sql + " ORDER BY id", params)),
+            dtype=np.int64
+        )
+        conn.close()
+        return ids
+
     def get_filtered_clients(self, city=None, commune=None, giro=None):
         conn = self.get_connection()
         query = '''
@@ -102,54 +504,768 @@ class DatabaseManager:
                comuna as 'Comuna',
                ciudad as 'Ciudad',
                nombre_contacto as 'Nombre contacto',
-               telefono as 'Teléfono'
+               ''' + PHONE_DISPLAY_SQL + ''' as 'Teléfono'
         FROM clientes
         WHERE 1=1
         '''
+        filter_sql, params = self._filter_clause(city, commune, giro)
+        df = pd.read_sql_query(query + filter_sql, conn, params=params)
+        conn.close()
+        return df
+
+    def _filter_clause(self, city=None, commune=None, giro=None):
+        query = ""
         params = []
-        if city and city.lower() != "todas las ciudades":
-            query += " AND LOWER(ciudad) = ?"
-            params.append(city.lower())
-        if commune and commune.lower() != "todas las comunas":
-            query += " AND LOWER(comuna) = ?"
-            params.append(commune.lower())
-        if giro and giro.lower() != "todos los giros":
-            query += " AND LOWER(giro) = ?"
-            params.append(giro.lower())
-        df = pd.read_sql_query(query, conn, params=params)
+        if city and filter_key(city) != "todas las ciudades":
+            query += " AND FILTER_KEY(ciudad) = ?"
+            params.append(filter_key(city))
+        if commune and filter_key(commune) != "todas las comunas":
+            query += " AND FILTER_KEY(comuna) = ?"
+            params.append(filter_key(commune))
+        if giro and filter_key(giro) != "todos los giros":
+            query += " AND FILTER_KEY(giro) = ?"
+            params.append(filter_key(giro))
+        return query, params
+
+    def get_send_plan(self, city=None, commune=None, giro=None, check_history=False):
+        # Clasifica cada destinatario filtrado tal como lo hará el hilo de envío:
+        # número inválido, ya enviado con éxito, repetido en la lista o a enviar. La importación ya rechaza los
+        # números inválidos; solo quedan en clientes guardados por versiones anteriores.
+        conn = self.get_connection()
+        query = '''
+        SELECT razon_social as 'Razón social',
+               rut as 'RUT',
+               giro as 'Giro',
+               direccion as 'Dirección',
+               comuna as 'Comuna',
+               ciudad as 'Ciudad',
+               nombre_contacto as 'Nombre contacto',
+               ''' + PHONE_DISPLAY_SQL + ''' as 'Teléfono',
+               telefono_e164,
+               CASE
+                   WHEN telefono_e164 = '' THEN 'invalido'
+                   WHEN EXISTS (
+                       SELECT 1 FROM suppressed_phones s WHERE s.telefono = clientes.telefono_e164
+                   ) THEN 'suprimido'
+                   WHEN ? AND EXISTS (
+                       SELECT 1 FROM ultimo_envio_exitoso u WHERE u.telefono = clientes.telefono_e164
+                   ) THEN 'ya_enviado'
+                   WHEN ? AND ROW_NUMBER() OVER (
+                       PARTITION BY telefono_e164 ORDER BY id
+                   ) > 1 THEN 'duplicado'
+                   ELSE 'enviar'
+               END AS estado
+        FROM clientes
+        WHERE 1=1
+        '''
+        filter_sql, params = self._filter_clause(city, commune, giro)
+        check = int(bool(check_history))
+        df = pd.read_sql_query(query + filter_sql + " ORDER BY id", conn, params=[check, check] + params)
         conn.close()
         return df
 
     def get_unique_values(self, column):
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute(f"SELECT DISTINCT LOWER({column}) FROM clientes WHERE {column} IS NOT NULL AND {column} != ''")
+        cursor.execute(f"SELECT DISTINCT FILTER_KEY({column}) FROM clientes WHERE {column} IS NOT NULL AND {column} != ''")
         values = [row[0] for row in cursor.fetchall()]
         conn.close()
         return sorted(values)
 
-    def record_message_sent(self, razon_social, telefono, ciudad, resultado):
+    def record_message_sent(self, razon_social, telefono, ciudad, resultado,
+                            campaign_id=None, campaign_stats=None, retry_id=None, dead_letter=None):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+        INSERT INTO historial_envios (razon_social, telefono, ciudad, resultado, campaign_id)
+        VALUES (?, ?, ?, ?, ?)
+        ''', (razon_social, telefono, ciudad, resultado, campaign_id))
+        # Los contadores de la campaña se actualizan en la misma transacción
+        if campaign_id is not None and campaign_stats is not None:
+            self._write_campaign_stats(cursor, campaign_id, campaign_stats)
+        # Resultado final de un reintento: sale de la cola en la misma transacción
+        if retry_id is not None:
+            cursor.execute("DELETE FROM cola_reintentos WHERE id = ?", (retry_id,))
+        # Fallo definitivo: queda en envios_fallidos con el mensaje para revisarlo o reenviarlo a mano
+        if dead_letter is not None:
+            cursor.execute('''
+            INSERT INTO envios_fallidos (campaign_id, razon_social, telefono, ciudad, mensaje, intentos, ultimo_error)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (campaign_id, razon_social, telefono, ciudad, dead_letter['mensaje'],
+                  dead_letter['intentos'], dead_letter['ultimo_error']))
+        conn.commit()
+        conn.close()
+
+    def add_retry(self, campaign_id, razon_social, telefono, ciudad, mensaje, intentos, proximo_intento, ultimo_error,
+                  adjunto=None):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+        INSERT INTO cola_reintentos (campaign_id, razon_social, telefono, ciudad, mensaje, intentos,
+                                     proximo_intento, ultimo_error, adjunto)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (campaign_id, razon_social, telefono, ciudad, mensaje, intentos,
+              proximo_intento.isoformat(), ultimo_error, adjunto))
+        retry_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return retry_id
+
+    def reschedule_retry(self, retry_id, intentos, proximo_intento, ultimo_error):
+        conn = self.get_connection()
+        conn.execute(
+            "UPDATE cola_reintentos SET intentos = ?, proximo_intento = ?, ultimo_error = ? WHERE id = ?",
+            (intentos, proximo_intento.isoformat(), ultimo_error, retry_id)
+        )
+        conn.commit()
+        conn.close()
+
+    def delete_retry(self, retry_id):
+        conn = self.get_connection()
+        conn.execute("DELETE FROM cola_reintentos WHERE id = ?", (retry_id,))
+        conn.commit()
+        conn.close()
+
+    def adopt_retries(self, campaign_id):
+        # Reintentos pendientes de sesiones anteriores (p. ej. tras cerrar la app) pasan a la campaña actual,
+        # salvo los de campañas en modo prueba
+        conn = self._begin_immediate()
+        try:
+            conn.execute(f"UPDATE cola_reintentos SET campaign_id = ? WHERE {ADOPTABLE_RETRIES}", (campaign_id,))
+            conn.row_factory = sqlite3.Row
+            rows = [dict(row) for row in conn.execute(
+                "SELECT * FROM cola_reintentos WHERE campaign_id = ? ORDER BY proximo_intento", (campaign_id,)
+            )]
+            conn.commit()
+        finally:
+            conn.close()
+        return rows
+
+    def count_pending_retries(self):
+        conn = self.get_connection()
+        count = conn.execute(f"SELECT COUNT(*) FROM cola_reintentos WHERE {ADOPTABLE_RETRIES}").fetchone()[0]
+        conn.close()
+        return count
+
+    def get_dead_letters(self, limit=500):
+        conn = self.get_connection()
+        df = pd.read_sql_query('''
+        SELECT id, fecha, campaign_id, razon_social, telefono, ciudad, intentos, ultimo_error
+        FROM envios_fallidos
+        ORDER BY id DESC
+        LIMIT ?
+        ''', conn, params=[limit])
+        conn.close()
+        return df
+
+    def create_campaign(self, total, test_mode=False, template_id=None):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO campaigns (total, modo_prueba, plantilla_id) VALUES (?, ?, ?)",
+            (total, int(test_mode), template_id)
+        )
+        campaign_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return campaign_id
+
+    def update_campaign(self, campaign_id, campaign_stats, estado=None, avg_send_seconds=None):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        self._write_campaign_stats(cursor, campaign_id, campaign_stats)
+        if avg_send_seconds is not None:
+            cursor.execute(
+                "UPDATE campaigns SET seg_envio_promedio = ? WHERE id = ?",
+                (avg_send_seconds, campaign_id)
+            )
+        if estado in FINAL_CAMPAIGN_STATES:
+            cursor.execute(
+                "UPDATE campaigns SET estado = ?, fecha_fin = CURRENT_TIMESTAMP WHERE id = ?",
+                (estado, campaign_id)
+            )
+        elif estado is not None:
+            cursor.execute("UPDATE campaigns SET estado = ? WHERE id = ?", (estado, campaign_id))
+        conn.commit()
+        conn.close()
+
+    def _write_campaign_stats(self, cursor, campaign_id, campaign_stats):
+        cursor.execute('''
+        UPDATE campaigns
+        SET total = ?, enviados = ?, fallidos = ?, duplicados = ?, invalidos = ?, suprimidos = ?, segundos = ?
+        WHERE id = ?
+        ''', (
+            campaign_stats.total,
+            campaign_stats.enviados,
+            campaign_stats.fallidos,
+            campaign_stats.duplicados,
+            campaign_stats.invalidos,
+            campaign_stats.suprimidos,
+            campaign_stats.elapsed,
+            campaign_id
+        ))
+
+    def save_template(self, name, content, content_hash, variables, unknown):
+        # Nueva versión solo si el contenido cambió respecto a la última; devuelve (id, versión, es_nueva)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        latest = cursor.execute(
+            "SELECT id, version, hash FROM plantillas WHERE nombre = ? ORDER BY version DESC LIMIT 1", (name,)
+        ).fetchone()
+        if latest is not None and latest[2] == content_hash:
+            conn.close()
+            return latest[0], latest[1], False
+        version = latest[1] + 1 if latest is not None else 1
+        cursor.execute('''
+        INSERT INTO plantillas (nombre, version, contenido, hash, variables, desconocidas)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', (name, version, content, content_hash, variables, unknown))
+        template_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return template_id, version, True
+
+    def get_template(self, template_id):
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT * FROM plantillas WHERE id = ?", (template_id,)).fetchone()
+        conn.close()
+        return dict(row) if row is not None else None
+
+    def get_latest_template(self, name):
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        row = conn.execute(
+            "SELECT * FROM plantillas WHERE nombre = ? ORDER BY version DESC LIMIT 1", (name,)
+        ).fetchone()
+        conn.close()
+        return dict(row) if row is not None else None
+
+    def get_template_names(self):
+        conn = self.get_connection()
+        names = [row[0] for row in conn.execute("SELECT DISTINCT nombre FROM plantillas ORDER BY nombre")]
+        conn.close()
+        return names
+
+    def get_campaign(self, campaign_id):
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT * FROM campaigns WHERE id = ?", (campaign_id,)).fetchone()
+        conn.close()
+        if row is None:
+            return None
+        campaign = dict(row)
+        segundos = campaign['segundos'] or 0
+        campaign['msgs_por_min'] = campaign['enviados'] * 60.0 / segundos if segundos > 0 else 0.0
+        return campaign
+
+    def get_average_send_latency(self, last_campaigns=5):
+        # Latencia medida del transporte en las últimas campañas con envíos reales
+        conn = self.get_connection()
+        row = conn.execute('''
+        SELECT AVG(seg_envio_promedio) FROM (
+            SELECT seg_envio_promedio FROM campaigns
+            WHERE seg_envio_promedio IS NOT NULL
+            ORDER BY id DESC LIMIT ?
+        )
+        ''', (last_campaigns,)).fetchone()
+        conn.close()
+        return row[0]
+
+    def add_scheduled_campaign(self, start_at, template, filters, check_history, respect_window, rate_per_hour,
+                               attachment=None, template_id=None):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+        INSERT INTO campanas_programadas
+            (inicio_programado, plantilla, filtros, evitar_reenvios, respetar_horario, mensajes_por_hora, adjunto,
+             plantilla_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (start_at, template, filters, int(check_history), int(respect_window), rate_per_hour, attachment,
+              template_id))
+        job_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return job_id
+
+    def get_scheduled_campaigns(self, estados=None):
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        query = "SELECT * FROM campanas_programadas"
+        params = []
+        if estados:
+            query += f" WHERE estado IN ({','.join('?' for _ in estados)})"
+            params = list(estados)
+        rows = conn.execute(query + " ORDER BY inicio_programado, id", params).fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def update_scheduled_campaign(self, job_id, estado, campaign_id=None):
+        conn = self.get_connection()
+        conn.execute(
+            "UPDATE campanas_programadas SET estado = ?, campaign_id = COALESCE(?, campaign_id) WHERE id = ?",
+            (estado, campaign_id, job_id)
+        )
+        conn.commit()
+        conn.close()
+
+    def get_campaigns(self, limit=50):
+        conn = self.get_connection()
+        query = '''
+        SELECT c.id, c.fecha_inicio, c.estado,
+               p.nombre || ' v' || p.version AS plantilla,
+               c.total, c.enviados, c.fallidos, c.duplicados, c.invalidos, c.suprimidos,
+               ROUND(c.segundos, 1) AS segundos,
+               CASE WHEN c.segundos > 0 THEN ROUND(c.enviados * 60.0 / c.segundos, 2) ELSE 0 END AS msgs_por_min
+        FROM campaigns c
+        LEFT JOIN plantillas p ON p.id = c.plantilla_id
+        ORDER BY c.id DESC
+        LIMIT ?
+        '''
+        df = pd.read_sql_query(query, conn, params=[limit])
+        conn.close()
+        return df
+
+    @staticmethod
+    def _touch_rendered_template(cursor, template_hash):
+        # Milisegundos: planificar y enviar la misma campaña ocurre a veces en el mismo segundo
+        cursor.execute('''
+        INSERT INTO uso_mensajes_renderizados (plantilla_hash, ultimo_uso)
+        VALUES (?, strftime('%Y-%m-%d %H:%M:%f', 'now'))
+        ON CONFLICT(plantilla_hash) DO UPDATE SET ultimo_uso = excluded.ultimo_uso
+        ''', (template_hash,))
+
+    def get_rendered_messages(self, template_hash):
+        conn = self.get_connection()
+        rows = conn.execute(
+            "SELECT fila_hash, mensaje FROM mensajes_renderizados WHERE plantilla_hash = ?", (template_hash,)
+        ).fetchall()
+        if rows:
+            self._touch_rendered_template(conn.cursor(), template_hash)
+            conn.commit()
+        conn.close()
+        return dict(rows)
+
+    def store_rendered_messages(self, template_hash, row_hashes, messages):
         conn = self.get_connection()
         cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT OR REPLACE INTO mensajes_renderizados (plantilla_hash, fila_hash, mensaje) VALUES (?, ?, ?)",
+            ((template_hash, int(h), m) for h, m in zip(row_hashes, messages))
+        )
+        self._touch_rendered_template(cursor, template_hash)
+        # Solo se conservan los mensajes de las plantillas leídas o escritas más recientemente
         cursor.execute('''
-        INSERT INTO historial_envios (razon_social, telefono, ciudad, resultado)
-        VALUES (?, ?, ?, ?)
-        ''', (razon_social, telefono, ciudad, resultado))
+        DELETE FROM uso_mensajes_renderizados WHERE plantilla_hash NOT IN (
+            SELECT plantilla_hash FROM uso_mensajes_renderizados ORDER BY ultimo_uso DESC LIMIT ?
+        )
+        ''', (RENDER_CACHE_MAX_TEMPLATES,))
+        cursor.execute('''
+        DELETE FROM mensajes_renderizados
+        WHERE plantilla_hash NOT IN (SELECT plantilla_hash FROM uso_mensajes_renderizados)
+        ''')
         conn.commit()
         conn.close()
 
     def get_sent_phones(self):
+        # Incluye los envíos ya archivados: sale del resumen, no de historial_envios
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT telefono FROM historial_envios WHERE resultado = 'Éxito'")
+        cursor.execute("SELECT telefono FROM ultimo_envio_exitoso")
         phones = [row[0] for row in cursor.fetchall()]
         conn.close()
         return set(phones)
 
+    def archive_history(self, before, archive_file):
+        """Mueve el historial anterior a before ('AAAA-MM-DD') a tablas por mes en otra base.
+
+        Cada mes queda en archive_file como historial_envios_AAAA_MM, con los mismos ids. Copia y borrado
+        van en una sola transacción. Devuelve {'AAAA_MM': filas movidas}.
+        """
+        conn = self.get_connection()
+        try:
+            conn.execute("ATTACH DATABASE ? AS archivo", (archive_file,))
+            conn.execute("BEGIN IMMEDIATE")
+            months = conn.execute('''
+            SELECT strftime('%Y_%m', fecha_hora) AS mes, COUNT(*)
+            FROM historial_envios
+            WHERE fecha_hora < ?
+            GROUP BY mes
+            ''', (before,)).fetchall()
+            archived = {}
+            for month, rows in months:
+                if month is None:
+                    continue
+                conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS archivo.historial_envios_{month} (
+                    id INTEGER PRIMARY KEY,
+                    fecha_hora TIMESTAMP,
+                    razon_social TEXT,
+                    telefono TEXT,
+                    ciudad TEXT,
+                    resultado TEXT,
+                    campaign_id INTEGER
+                )
+                ''')
+                conn.execute(f'''
+                INSERT OR IGNORE INTO archivo.historial_envios_{month}
+                    (id, fecha_hora, razon_social, telefono, ciudad, resultado, campaign_id)
+                SELECT id, fecha_hora, razon_social, telefono, ciudad, resultado, campaign_id
+                FROM historial_envios
+                WHERE fecha_hora < ? AND strftime('%Y_%m', fecha_hora) = ?
+                ''', (before, month))
+                conn.execute(
+                    "DELETE FROM historial_envios WHERE fecha_hora < ? AND strftime('%Y_%m', fecha_hora) = ?",
+                    (before, month)
+                )
+                archived[month] = rows
+            conn.commit()
+            return archived
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def get_archived_months(self, archive_file):
+        # [(mes 'AAAA_MM', filas)] de las tablas de archivo, del más antiguo al más reciente
+        conn = sqlite3.connect(archive_file, timeout=DB_BUSY_TIMEOUT)
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'historial_envios_%' ORDER BY name"
+        )]
+        months = [(table[len('historial_envios_'):], conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0])
+                  for table in tables]
+        conn.close()
+        return months
+
+    def get_storage_stats(self):
+        # Tamaño de la base (páginas usadas y libres) y filas de las tablas de historial
+        conn = self.get_connection()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        history_rows = conn.execute("SELECT COUNT(*) FROM historial_envios").fetchone()[0]
+        summary_rows = conn.execute("SELECT COUNT(*) FROM ultimo_envio_exitoso").fetchone()[0]
+        conn.close()
+        return {
+            'bytes': page_size * page_count,
+            'bytes_libres': page_size * free_pages,
+            'auto_vacuum': auto_vacuum,
+            'filas_historial': history_rows,
+            'filas_resumen': summary_rows,
+        }
+
+    def vacuum_and_analyze(self, max_pages=None):
+        """Devuelve al disco las páginas libres y actualiza las estadísticas del planificador.
+
+        La primera vez se activa auto_vacuum=INCREMENTAL, lo que exige un VACUUM completo; después solo se
+        liberan páginas de a poco (PRAGMA incremental_vacuum). Devuelve True si hubo VACUUM completo.
+        """
+        # VACUUM no puede correr dentro de una transacción
+        conn = self.get_connection()
+        conn.isolation_level = None
+        try:
+            full = conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2
+            if full:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+            elif max_pages:
+                conn.execute(f"PRAGMA incremental_vacuum({int(max_pages)})").fetchall()
+            else:
+                conn.execute("PRAGMA incremental_vacuum").fetchall()
+            conn.execute("ANALYZE")
+            return full
+        finally:
+            conn.close()
+
+    def record_maintenance(self, detalle):
+        conn = self.get_connection()
+        conn.execute("INSERT INTO mantenimientos (detalle) VALUES (?)", (detalle,))
+        conn.commit()
+        conn.close()
+
+    def get_last_maintenance(self):
+        # (fecha UTC, detalle JSON) del último mantenimiento, o None
+        conn = self.get_connection()
+        row = conn.execute("SELECT fecha, detalle FROM mantenimientos ORDER BY id DESC LIMIT 1").fetchone()
+        conn.close()
+        return row
+
+    def get_table_columns(self, table):
+        # (nombre, tipo declarado) de cada columna, en el orden de la tabla
+        conn = self.get_connection()
+        columns = [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({table})")]
+        conn.close()
+        return columns
+
+    def iter_table_chunks(self, table, columns, since_id=0, chunk_size=5000):
+        # Recorre la tabla por id ascendente en lotes de chunk_size filas, sin cargarla completa
+        conn = self.get_connection()
+        try:
+            cursor = conn.execute(
+                f"SELECT {', '.join(columns)} FROM {table} WHERE id > ? ORDER BY id",
+                (since_id or 0,)
+            )
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    def get_last_export_id(self, table):
+        conn = self.get_connection()
+        row = conn.execute("SELECT MAX(hasta_id) FROM exportaciones WHERE tabla = ?", (table,)).fetchone()
+        conn.close()
+        return row[0] or 0
+
+    def record_export(self, table, fmt, path, since_id, last_id, rows):
+        conn = self.get_connection()
+        conn.execute('''
+        INSERT INTO exportaciones (tabla, formato, ruta, desde_id, hasta_id, filas)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', (table, fmt, path, since_id, last_id, rows))
+        conn.commit()
+        conn.close()
+
+    def _begin_immediate(self):
+        # Toma el bloqueo de escritura al inicio: dos nodos no pueden leer y reservar la misma fila
+        conn = self.get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def enqueue_send_jobs(self, campaign_id, jobs):
+        # Un número aparece una sola vez por campaña; devuelve cuántos trabajos se agregaron
+        conn = self.get_connection()
+        before = conn.total_changes
+        conn.executemany('''
+        INSERT OR IGNORE INTO trabajos_envio (campaign_id, razon_social, telefono, ciudad, mensaje, adjunto, cuenta)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', ((campaign_id, job['razon_social'], job['telefono'], job['ciudad'], job['mensaje'],
+               job.get('adjunto'), job.get('cuenta')) for job in jobs))
+        added = conn.total_changes - before
+        conn.commit()
+        conn.close()
+        return added
+
+    def claim_send_job(self, node, account, min_interval, lease_until, now):
+        # Reserva el siguiente trabajo junto con el turno de envío de la cuenta, en una sola transacción.
+        # Devuelve (trabajo, 0), (None, segundos que faltan para el turno) o (None, 0) si no hay trabajos.
+        conn = self._begin_immediate()
+        conn.row_factory = sqlite3.Row
+        try:
+            row = conn.execute('''
+            SELECT id FROM trabajos_envio
+            WHERE estado = 'pendiente'
+              AND (cuenta IS NULL OR cuenta = ?)
+              AND (disponible_desde IS NULL OR disponible_desde <= ?)
+            ORDER BY id
+            LIMIT 1
+            ''', (account, now)).fetchone()
+            if row is None:
+                conn.rollback()
+                return None, 0
+            last = conn.execute("SELECT ultimo_envio FROM cuentas_envio WHERE cuenta = ?", (account,)).fetchone()
+            if last and last[0]:
+                elapsed = (datetime.datetime.fromisoformat(now) - datetime.datetime.fromisoformat(last[0])).total_seconds()
+                if elapsed < min_interval:
+                    conn.rollback()
+                    return None, min_interval - elapsed
+            conn.execute(
+                "UPDATE trabajos_envio SET estado = 'reservado', nodo = ?, lease_hasta = ? WHERE id = ?",
+                (node, lease_until, row['id'])
+            )
+            conn.execute('''
+            INSERT INTO cuentas_envio (cuenta, ultimo_envio, envios) VALUES (?, ?, 1)
+            ON CONFLICT(cuenta) DO UPDATE SET ultimo_envio = excluded.ultimo_envio, envios = envios + 1
+            ''', (account, now))
+            job = conn.execute("SELECT * FROM trabajos_envio WHERE id = ?", (row['id'],)).fetchone()
+            conn.commit()
+            return dict(job), 0
+        finally:
+            conn.close()
+
+    def start_send_job(self, job_id, node, lease_until, now):
+        # Falla si la reserva venció y otro nodo pudo tomar el trabajo: en ese caso no se envía
+        conn = self.get_connection()
+        cursor = conn.execute('''
+        UPDATE trabajos_envio SET estado = 'enviando', intentos = intentos + 1, lease_hasta = ?
+        WHERE id = ? AND nodo = ? AND estado = 'reservado' AND lease_hasta > ?
+        ''', (lease_until, job_id, node, now))
+        started = cursor.rowcount == 1
+        conn.commit()
+        conn.close()
+        return started
+
+    def complete_send_job(self, job, resultado, counter, dead_letter=None):
+        # Historial, contador de la campaña y estado del trabajo en la misma transacción
+        conn = self._begin_immediate()
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE trabajos_envio SET estado = ?, lease_hasta = NULL, ultimo_error = ? "
+            "WHERE id = ? AND estado = 'enviando'",
+            ('enviado' if counter == 'enviados' else 'fallido',
+             dead_letter['ultimo_error'] if dead_letter else None, job['id'])
+        )
+        if cursor.rowcount == 0:
+            # Otro nodo ya lo dio por incierto tras vencer la reserva; su resultado es el que queda
+            conn.rollback()
+            conn.close()
+            return False
+        self._finish_send_job(cursor, job, resultado, counter, dead_letter)
+        conn.commit()
+        conn.close()
+        return True
+
+    def _finish_send_job(self, cursor, job, resultado, counter, dead_letter):
+        if counter not in ('enviados', 'fallidos'):
+            raise ValueError(f"Contador desconocido: {counter}")
+        cursor.execute('''
+        INSERT INTO historial_envios (razon_social, telefono, ciudad, resultado, campaign_id)
+        VALUES (?, ?, ?, ?, ?)
+        ''', (job['razon_social'], job['telefono'], job['ciudad'], resultado, job['campaign_id']))
+        if dead_letter is not None:
+            cursor.execute('''
+            INSERT INTO envios_fallidos (campaign_id, razon_social, telefono, ciudad, mensaje, intentos, ultimo_error)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (job['campaign_id'], job['razon_social'], job['telefono'], job['ciudad'], job['mensaje'],
+                  dead_letter['intentos'], dead_letter['ultimo_error']))
+        # Los nodos suman sobre el contador compartido en vez de escribir sus propias estadísticas
+        cursor.execute(f'''
+        UPDATE campaigns
+        SET {counter} = {counter} + 1,
+            segundos = (julianday('now') - julianday(fecha_inicio)) * 86400
+        WHERE id = ?
+        ''', (job['campaign_id'],))
+        self._complete_queued_campaign(cursor, job['campaign_id'])
+
+    def _complete_queued_campaign(self, cursor, campaign_id):
+        placeholders = ','.join('?' for _ in OPEN_JOB_STATES)
+        cursor.execute(f'''
+        UPDATE campaigns SET estado = 'completada', fecha_fin = CURRENT_TIMESTAMP
+        WHERE id = ? AND estado = 'en_curso' AND NOT EXISTS (
+            SELECT 1 FROM trabajos_envio WHERE campaign_id = ? AND estado IN ({placeholders})
+        )
+        ''', (campaign_id, campaign_id, *OPEN_JOB_STATES))
+
+    def retry_send_job(self, job_id, available_at, ultimo_error):
+        conn = self.get_connection()
+        conn.execute('''
+        UPDATE trabajos_envio
+        SET estado = 'pendiente', disponible_desde = ?, ultimo_error = ?, nodo = NULL, lease_hasta = NULL
+        WHERE id = ? AND estado = 'enviando'
+        ''', (available_at, ultimo_error, job_id))
+        conn.commit()
+        conn.close()
+
+    def release_send_jobs(self, node):
+        # Reservas que el nodo no alcanzó a enviar (p. ej. al detenerlo) vuelven a la cola
+        conn = self.get_connection()
+        cursor = conn.execute(
+            "UPDATE trabajos_envio SET estado = 'pendiente', nodo = NULL, lease_hasta = NULL "
+            "WHERE nodo = ? AND estado = 'reservado'", (node,)
+        )
+        released = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return released
+
+    def reclaim_send_jobs(self, now):
+        # Reservas vencidas de nodos caídos. Las que no se alcanzaron a enviar vuelven a la cola; las que
+        # quedaron a mitad de envío no se repiten (el mensaje pudo salir) y pasan a envios_fallidos.
+        conn = self._begin_immediate()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE trabajos_envio SET estado = 'pendiente', nodo = NULL, lease_hasta = NULL "
+            "WHERE estado = 'reservado' AND lease_hasta <= ?", (now,)
+        )
+        released = cursor.rowcount
+        stale = [dict(row) for row in cursor.execute(
+            "SELECT * FROM trabajos_envio WHERE estado = 'enviando' AND lease_hasta <= ?", (now,)
+        ).fetchall()]
+        for job in stale:
+            error = f"Nodo {job['nodo']} sin respuesta durante el envío; no se reintenta para evitar duplicados"
+            cursor.execute(
+                "UPDATE trabajos_envio SET estado = 'incierto', lease_hasta = NULL, ultimo_error = ? WHERE id = ?",
+                (error, job['id'])
+            )
+            self._finish_send_job(cursor, job, "Error - Resultado incierto", 'fallidos',
+                                  {'intentos': job['intentos'], 'ultimo_error': error})
+        conn.commit()
+        conn.close()
+        return released, len(stale)
+
+    def count_active_leases(self, now):
+        # Trabajos que algún nodo tiene reservados o enviando con su plazo vigente
+        conn = self.get_connection()
+        count = conn.execute(
+            "SELECT COUNT(*) FROM trabajos_envio WHERE estado IN ('reservado', 'enviando') AND lease_hasta > ?",
+            (now,)
+        ).fetchone()[0]
+        conn.close()
+        return count
+
+    def count_send_jobs(self, campaign_id=None):
+        conn = self.get_connection()
+        query = "SELECT estado, COUNT(*) FROM trabajos_envio"
+        params = []
+        if campaign_id is not None:
+            query += " WHERE campaign_id = ?"
+            params.append(campaign_id)
+        counts = dict(conn.execute(query + " GROUP BY estado", params).fetchall())
+        conn.close()
+        return counts
+
+    def add_suppressed_phones(self, phones, motivo, origen):
+        # Devuelve cuántos números nuevos se agregaron. Los trabajos de la cola compartida aún sin enviar
+        # (pendientes o reservados por un nodo) se cancelan: el nodo no podrá marcarlos como "enviando".
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        before = conn.total_changes
+        cursor.executemany(
+            "INSERT OR IGNORE INTO suppressed_phones (telefono, motivo, origen) VALUES (?, ?, ?)",
+            ((phone, motivo, origen) for phone in phones)
+        )
+        added = conn.total_changes - before
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS tmp_suprimidos (telefono TEXT PRIMARY KEY) WITHOUT ROWID")
+        cursor.execute("DELETE FROM tmp_suprimidos")
+        cursor.executemany("INSERT OR IGNORE INTO tmp_suprimidos VALUES (?)", ((phone,) for phone in phones))
+        cancelled = cursor.execute('''
+        SELECT campaign_id, COUNT(*) FROM trabajos_envio
+        WHERE estado IN ('pendiente', 'reservado') AND telefono IN (SELECT telefono FROM tmp_suprimidos)
+        GROUP BY campaign_id
+        ''').fetchall()
+        if cancelled:
+            cursor.execute('''
+            UPDATE trabajos_envio SET estado = 'suprimido', nodo = NULL, lease_hasta = NULL
+            WHERE estado IN ('pendiente', 'reservado') AND telefono IN (SELECT telefono FROM tmp_suprimidos)
+            ''')
+            for campaign_id, count in cancelled:
+                cursor.execute("UPDATE campaigns SET suprimidos = suprimidos + ? WHERE id = ?", (count, campaign_id))
+                self._complete_queued_campaign(cursor, campaign_id)
+        conn.commit()
+        conn.close()
+        return added
+
+    def remove_suppressed_phone(self, phone):
+        conn = self.get_connection()
+        conn.execute("DELETE FROM suppressed_phones WHERE telefono = ?", (phone,))
+        conn.commit()
+        conn.close()
+
+    def get_suppressed_phones(self):
+        conn = self.get_connection()
+        phones = {row[0] for row in conn.execute("SELECT telefono FROM suppressed_phones")}
+        conn.close()
+        return phones
+
     def get_message_history(self, limit=100):
         conn = self.get_connection()
         query = '''
-        SELECT id, fecha_hora, razon_social, telefono, ciudad, resultado
+        SELECT id, fecha_hora, razon_social, telefono, ciudad, resultado, campaign_id
         FROM historial_envios
         ORDER BY fecha_hora DESC
         LIMIT ?
@@ -159,44 +1275,146 @@ class DatabaseManager:
         print(f"DatabaseManager: get_message_history returning {len(df)} records.") # Added print
         return df
 
-
-
-    def on_click_delete_history(self):
-        # Get selected records IDs (you'll need to implement this)
-        ids = self.collect_ids()  # You'll need to implement collect_ids()
-        if ids:
-            self.delete_history_records(ids)
-
-    # File src/models/database.py
-
     def delete_history_records(self, record_ids):
+        """Elimina registros del historial guardando una copia para poder deshacerlo.
+
+        Los ids van a una tabla temporal (sin el límite de variables de un IN (...)) y las filas se copian a
+        historial_eliminado bajo un lote de eliminaciones_historial. Devuelve el id del lote, o None si no
+        había nada que eliminar.
+        """
+        conn = self.get_connection()
         try:
-            # Conectamos a la base de datos
-            # Reemplaza con tu ruta o variable de conexión
-            conn = sqlite3.connect('nostra_whatsapp.db')
             cursor = conn.cursor()
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS ids_historial (id INTEGER PRIMARY KEY)")
+            cursor.execute("DELETE FROM temp.ids_historial")
+            cursor.executemany("INSERT OR IGNORE INTO temp.ids_historial (id) VALUES (?)",
+                               ((int(record_id),) for record_id in record_ids))
+            cursor.execute("INSERT INTO eliminaciones_historial (filas) VALUES (0)")
+            batch_id = cursor.lastrowid
+            cursor.execute('''
+            INSERT INTO historial_eliminado
+                (eliminacion_id, id, fecha_hora, razon_social, telefono, ciudad, resultado, campaign_id)
+            SELECT ?, h.id, h.fecha_hora, h.razon_social, h.telefono, h.ciudad, h.resultado, h.campaign_id
+            FROM historial_envios h JOIN temp.ids_historial t ON t.id = h.id
+            ''', (batch_id,))
+            deleted = cursor.rowcount
+            if not deleted:
+                conn.rollback()
+                return None
+            cursor.execute("DELETE FROM historial_envios WHERE id IN (SELECT id FROM temp.ids_historial)")
+            cursor.execute("UPDATE eliminaciones_historial SET filas = ? WHERE id = ?", (deleted, batch_id))
+            self._refresh_last_success(cursor, batch_id)
+            conn.commit()
+            return batch_id
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
 
-            # Convertimos los IDs a enteros para la consulta SQL
-            ids = [int(id) for id in record_ids]
-            
-            placeholders = ','.join('?' for _ in ids)
-            delete_query = f'DELETE FROM historial_envios WHERE id IN ({placeholders})'
-            cursor.execute(delete_query, ids)
-
+    def undo_history_deletion(self, batch_id):
+        # Devuelve las filas del lote al historial con sus ids originales; retorna cuántas se restauraron
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+            INSERT OR IGNORE INTO historial_envios
+                (id, fecha_hora, razon_social, telefono, ciudad, resultado, campaign_id)
+            SELECT id, fecha_hora, razon_social, telefono, ciudad, resultado, campaign_id
+            FROM historial_eliminado
+            WHERE eliminacion_id = ?
+            ''', (batch_id,))
+            restored = cursor.rowcount
+            cursor.execute("DELETE FROM historial_eliminado WHERE eliminacion_id = ?", (batch_id,))
+            cursor.execute("UPDATE eliminaciones_historial SET deshecha = 1 WHERE id = ?", (batch_id,))
             conn.commit()
-            print(f"DatabaseManager: Committed deletion of {len(ids)} records.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error al eliminar registros: {str(e)}")
+            return restored
+        except Exception:
+            conn.rollback()
             raise
         finally:
             conn.close()
 
+    def _refresh_last_success(self, cursor, batch_id):
+        # Solo los teléfonos cuyo resumen venía de un envío eliminado: vuelven al éxito anterior que quede en el
+        # historial activo o, si ya no hay, en el archivo. Sin ninguno salen del resumen y se les puede volver
+        # a enviar, como antes de existir el resumen.
+        cursor.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS telefonos_eliminados (telefono TEXT PRIMARY KEY) WITHOUT ROWID
+        ''')
+        cursor.execute("DELETE FROM temp.telefonos_eliminados")
+        cursor.execute('''
+        INSERT OR IGNORE INTO temp.telefonos_eliminados (telefono)
+        SELECT e.telefono FROM historial_eliminado e
+        JOIN ultimo_envio_exitoso u ON u.telefono = e.telefono AND e.fecha_hora >= u.fecha
+        WHERE e.eliminacion_id = ? AND e.resultado = 'Éxito'
+        ''', (batch_id,))
+        cursor.execute("DELETE FROM ultimo_envio_exitoso WHERE telefono IN (SELECT telefono FROM temp.telefonos_eliminados)")
+        cursor.execute('''
+        INSERT INTO ultimo_envio_exitoso (telefono, fecha, campaign_id)
+        SELECT h.telefono, MAX(h.fecha_hora), h.campaign_id
+        FROM historial_envios h JOIN temp.telefonos_eliminados t ON t.telefono = h.telefono
+        WHERE h.resultado = 'Éxito'
+        GROUP BY h.telefono
+        ''')
+        missing = [row[0] for row in cursor.execute('''
+        SELECT telefono FROM temp.telefonos_eliminados
+        WHERE telefono NOT IN (SELECT telefono FROM ultimo_envio_exitoso)
+        ''')]
+        if missing:
+            cursor.executemany(
+                "INSERT INTO ultimo_envio_exitoso (telefono, fecha, campaign_id) VALUES (?, ?, ?)",
+                self._archived_last_success(missing)
+            )
 
-    def on_click_delete_history(self):
+    def _archived_last_success(self, phones):
+        # [(teléfono, fecha, campaign_id)] del último éxito archivado de cada teléfono. Conexión aparte:
+        # no se puede hacer ATTACH dentro de la transacción de la eliminación.
+        archive_file = archive_file_for(self.db_file)
+        if not os.path.exists(archive_file):
+            return []
+        conn = sqlite3.connect(archive_file, timeout=DB_BUSY_TIMEOUT)
         try:
-            ids = self.collect_ids()  # Debug print to verify IDs collected
-            if ids:
-                self.delete_history_records(ids)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error en el método on_click_delete_history: {str(e)}")
-            raise
\ No newline at end of file
+            tables = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'historial_envios_%'"
+            )]
+            if not tables:
+                return []
+            conn.execute("CREATE TEMP TABLE telefonos (telefono TEXT PRIMARY KEY) WITHOUT ROWID")
+            conn.executemany("INSERT OR IGNORE INTO temp.telefonos (telefono) VALUES (?)", ((p,) for p in phones))
+            archived = " UNION ALL ".join(
+                f"SELECT telefono, fecha_hora, campaign_id FROM {table} "
+                f"WHERE resultado = 'Éxito' AND telefono IN (SELECT telefono FROM temp.telefonos)"
+                for table in tables
+            )
+            return conn.execute(
+                f"SELECT telefono, MAX(fecha_hora), campaign_id FROM ({archived}) GROUP BY telefono"
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def get_history_deletions(self, limit=20):
+        conn = self.get_connection()
+        df = pd.read_sql_query('''
+        SELECT id, fecha, filas FROM eliminaciones_historial
+        WHERE deshecha = 0
+        ORDER BY id DESC
+        LIMIT ?
+        ''', conn, params=[limit])
+        conn.close()
+        return df
+
+    def purge_history_deletions(self, before):
+        # Las eliminaciones anteriores a before ya no se pueden deshacer
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+        DELETE FROM historial_eliminado WHERE eliminacion_id IN (
+            SELECT id FROM eliminaciones_historial WHERE fecha < ?
+        )
+        ''', (before,))
+        purged = cursor.rowcount
+        cursor.execute("DELETE FROM eliminaciones_historial WHERE fecha < ?", (before,))
+        conn.commit()
+        conn.close()
+        return purged
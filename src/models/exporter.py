@@ -0,0 +1,144 @@
+import csv
+import json
+import os
+import time
+from ..utils.constants import EXPORT_CHUNK_SIZE, EXPORT_FORMATS
+
+# Tablas exportables y su nombre en la interfaz
+EXPORT_TABLES = {
+    'clientes': "Clientes",
+    'historial_envios': "Historial de envíos",
+}
+
+FORMAT_EXTENSIONS = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.parquet': 'parquet',
+}
+
+
+class _CsvWriter:
+    def __init__(self, path, columns, column_types):
+        self.file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class _JsonlWriter:
+    def __init__(self, path, columns, column_types):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.columns = columns
+
+    def write(self, rows):
+        columns = self.columns
+        self.file.write(''.join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in rows
+        ))
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path, columns, column_types):
+        # Dependencia opcional: solo se necesita para exportar a Parquet
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Para exportar a Parquet instala pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.types = [self._arrow_type(declared) for declared in column_types]
+        self.schema = pa.schema(list(zip(columns, self.types)))
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def _arrow_type(self, declared):
+        # SQLite solo conserva el tipo declarado; se traduce a un tipo Arrow fijo para todos los lotes
+        declared = (declared or '').upper()
+        if 'INT' in declared:
+            return self.pa.int64()
+        if 'REAL' in declared or 'FLOA' in declared or 'DOUB' in declared:
+            return self.pa.float64()
+        return self.pa.string()
+
+    def write(self, rows):
+        pa = self.pa
+        arrays = []
+        for values, arrow_type in zip(zip(*rows), self.types):
+            if arrow_type == pa.string():
+                # SQLite admite números en columnas TEXT (p. ej. teléfonos importados como número)
+                values = [v if v is None or isinstance(v, str) else str(v) for v in values]
+            arrays.append(pa.array(values, type=arrow_type))
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {
+    'csv': _CsvWriter,
+    'jsonl': _JsonlWriter,
+    'parquet': _ParquetWriter,
+}
+
+
+def format_from_path(path):
+    return FORMAT_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+
+class DataExporter:
+    """Exporta clientes e historial por lotes, sin cargar la tabla completa en memoria."""
+
+    def __init__(self, db_manager, chunk_size=EXPORT_CHUNK_SIZE):
+        self.db_manager = db_manager
+        self.chunk_size = chunk_size
+
+    def export(self, table, path, fmt=None, incremental=False):
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"Tabla no exportable: {table}")
+        fmt = fmt or format_from_path(path)
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportación desconocido: {fmt}")
+
+        # Exportación incremental: solo filas con id mayor al de la última exportación de la tabla
+        since_id = self.db_manager.get_last_export_id(table) if incremental else 0
+        table_columns = self.db_manager.get_table_columns(table)
+        columns = [name for name, _ in table_columns]
+        column_types = [declared for _, declared in table_columns]
+        id_position = columns.index('id')
+
+        start = time.perf_counter()
+        rows_written = 0
+        last_id = since_id
+        # Se escribe a un archivo temporal para no dejar exportaciones a medias con el nombre final
+        tmp_path = path + '.tmp'
+        writer = WRITERS[fmt](tmp_path, columns, column_types)
+        try:
+            for rows in self.db_manager.iter_table_chunks(table, columns, since_id, self.chunk_size):
+                writer.write(rows)
+                rows_written += len(rows)
+                last_id = rows[-1][id_position]
+            writer.close()
+        except Exception:
+            writer.close()
+            os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)
+
+        self.db_manager.record_export(table, fmt, path, since_id, last_id, rows_written)
+        return {
+            'tabla': table,
+            'formato': fmt,
+            'ruta': path,
+            'filas': rows_written,
+            'desde_id': since_id,
+            'hasta_id': last_id,
+            'segundos': time.perf_counter() - start,
+        }
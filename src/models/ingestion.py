@@ -0,0 +1,139 @@
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from ..utils.constants import REQUIRED_COLUMNS, COLUMN_ALIASES, IMPORT_FILE_EXTENSIONS, IMPORT_MAX_WORKERS
+from ..utils.phone import normalize_phones
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_header(name):
+    # 'Teléfono ', 'TELEFONO' y 'telefono_' se comparan igual: sin tildes, minúsculas y espacios simples
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    return _NON_ALNUM.sub(' ', text.lower()).strip()
+
+
+def map_columns(columns):
+    # Renombre de los encabezados reconocidos a REQUIRED_COLUMNS; el nombre exacto tiene prioridad sobre un alias
+    canonical = {normalize_header(col): col for col in REQUIRED_COLUMNS}
+    aliases = {normalize_header(alias): col for alias, col in COLUMN_ALIASES.items()}
+    rename = {}
+    for lookup in (canonical, aliases):
+        for column in columns:
+            target = lookup.get(normalize_header(column))
+            if target is not None and column not in rename and target not in rename.values():
+                rename[column] = target
+    return rename
+
+
+def expand_sources(paths):
+    # Archivos sueltos y carpetas (recorridas completas) a una lista ordenada de planillas/CSV
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(os.path.join(root, name) for name in sorted(names))
+        else:
+            files.append(path)
+    return [
+        f for f in files
+        if f.lower().endswith(IMPORT_FILE_EXTENSIONS) and not os.path.basename(f).startswith('~$')
+    ]
+
+
+def _read_csv(path):
+    # Parser C de pandas; el separador (',' o ';') se deduce de la primera línea
+    for encoding in ('utf-8-sig', 'latin-1'):
+        try:
+            with open(path, encoding=encoding) as f:
+                first_line = f.readline()
+            sep = ';' if first_line.count(';') > first_line.count(',') else ','
+            return pd.read_csv(path, sep=sep, dtype=str, keep_default_na=False,
+                               encoding=encoding, engine='c')
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("codificación no reconocida")
+
+
+def _prepare_sheet(df):
+    df = df.rename(columns=map_columns(df.columns))
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        return None, f"Columnas faltantes: {', '.join(missing_columns)}"
+    df = df[REQUIRED_COLUMNS].fillna("")
+    for col in REQUIRED_COLUMNS:
+        df[col] = df[col].astype(str)
+    return df, None
+
+
+def parse_source(path):
+    """Lee un archivo completo (todas sus hojas si es Excel).
+
+    Devuelve una lista de (origen, DataFrame con REQUIRED_COLUMNS como texto o None, error).
+    Se ejecuta en un proceso aparte, por eso es una función de módulo.
+    """
+    name = os.path.basename(path)
+    try:
+        if path.lower().endswith('.csv'):
+            sheets = {None: _read_csv(path)}
+        else:
+            sheets = pd.read_excel(path, sheet_name=None)
+    except Exception as e:
+        return [(name, None, f"Error al leer: {str(e)}")]
+    results = []
+    for sheet, df in sheets.items():
+        origin = name if sheet is None else f"{name} [{sheet}]"
+        if df.empty:
+            continue
+        prepared, error = _prepare_sheet(df)
+        results.append((origin, prepared, error))
+    return results
+
+
+def read_sources(paths, max_workers=IMPORT_MAX_WORKERS):
+    """Lee y normaliza varias fuentes en paralelo (un proceso por archivo).
+
+    Devuelve (DataFrame combinado en el orden de los archivos, con las columnas Origen y Fila de cada fila,
+    lista de (origen, filas), lista de (origen, error)).
+    """
+    files = expand_sources(paths)
+    if not files:
+        return pd.DataFrame(columns=REQUIRED_COLUMNS), [], []
+    workers = min(len(files), max_workers or os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed = list(executor.map(parse_source, files))
+    else:
+        parsed = [parse_source(path) for path in files]
+
+    frames, loaded, errors = [], [], []
+    for results in parsed:
+        for origin, df, error in results:
+            if error:
+                errors.append((origin, error))
+            else:
+                # Número de fila en la planilla (encabezado en la fila 1), para los reportes de fusiones y rechazos
+                frames.append(df.assign(Origen=origin, Fila=df.index + 2))
+                loaded.append((origin, len(df)))
+    if not frames:
+        return pd.DataFrame(columns=REQUIRED_COLUMNS), loaded, errors
+    return pd.concat(frames, ignore_index=True), loaded, errors
+
+
+def validate_rows(df):
+    """Separa las filas importables de las que no se pueden contactar.
+
+    Devuelve (filas válidas, filas rechazadas con la columna 'Motivo'). Los dos conservan el índice de
+    df, que para una hoja recién leída corresponde a su número de fila (índice + 2 en la planilla).
+    """
+    phones = df['Teléfono'].str.strip()
+    empty = (df[REQUIRED_COLUMNS].apply(lambda column: column.str.strip()) == '').all(axis=1)
+    reasons = pd.Series('', index=df.index, dtype=object)
+    reasons[normalize_phones(phones) == ''] = 'Teléfono inválido'
+    reasons[phones == ''] = 'Sin teléfono'
+    reasons[empty] = 'Fila vacía'
+    rejected = reasons != ''
+    return df[~rejected], df[rejected].assign(Motivo=reasons[rejected])
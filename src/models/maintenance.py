@@ -0,0 +1,104 @@
+import datetime
+import json
+import os
+import time
+from ..utils.constants import (
+    HISTORY_RETENTION_DAYS, MAINTENANCE_INTERVAL_DAYS, HISTORY_ARCHIVE_SUFFIX, HISTORY_UNDO_DAYS
+)
+
+
+def archive_file_for(db_file):
+    # nostra_whatsapp.db -> nostra_whatsapp_archivo.db, en la misma carpeta
+    root, ext = os.path.splitext(db_file)
+    return f"{root}{HISTORY_ARCHIVE_SUFFIX}{ext or '.db'}"
+
+
+def _utc_now():
+    # UTC sin zona horaria, igual que CURRENT_TIMESTAMP de SQLite con el que se compara
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def _timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+class DatabaseMaintenance:
+    """Mantenimiento periódico de la base: archivo del historial antiguo, VACUUM incremental y ANALYZE.
+
+    El historial con más de retention_days días pasa a tablas por mes en la base de archivo. La
+    deduplicación no lo pierde: usa la tabla ultimo_envio_exitoso. Cada ejecución guarda un informe con el
+    tamaño de la base y el tiempo de las consultas de historial antes y después.
+    """
+
+    def __init__(self, db_manager, archive_file=None, retention_days=HISTORY_RETENTION_DAYS,
+                 interval_days=MAINTENANCE_INTERVAL_DAYS):
+        self.db_manager = db_manager
+        self.archive_file = archive_file or archive_file_for(db_manager.db_file)
+        self.retention_days = retention_days
+        self.interval_days = interval_days
+
+    def is_due(self, now=None):
+        now = now or _utc_now()
+        last = self.db_manager.get_last_maintenance()
+        if last is None:
+            return True
+        return datetime.datetime.fromisoformat(last[0]) + datetime.timedelta(days=self.interval_days) <= now
+
+    def measure(self):
+        # Tamaño y tiempo de las consultas que dependen del historial
+        stats = self.db_manager.get_storage_stats()
+        stats['seg_envios_previos'] = _timed(self.db_manager.get_sent_phones)
+        stats['seg_historial'] = _timed(lambda: self.db_manager.get_message_history(limit=500))
+        return stats
+
+    def run(self, now=None):
+        now = now or _utc_now()
+        before = self.measure()
+        cutoff = (now - datetime.timedelta(days=self.retention_days)).strftime('%Y-%m-%d %H:%M:%S')
+        archived = self.db_manager.archive_history(cutoff, self.archive_file)
+        # Las eliminaciones antiguas del historial dejan de poder deshacerse
+        purged = self.db_manager.purge_history_deletions(
+            (now - datetime.timedelta(days=HISTORY_UNDO_DAYS)).strftime('%Y-%m-%d %H:%M:%S')
+        )
+        start = time.perf_counter()
+        full_vacuum = self.db_manager.vacuum_and_analyze()
+        report = {
+            'fecha': now.strftime('%Y-%m-%d %H:%M:%S'),
+            'archivado_hasta': cutoff,
+            'archivo': self.archive_file,
+            'meses_archivados': archived,
+            'eliminados_purgados': purged,
+            'vacuum_completo': full_vacuum,
+            'seg_vacuum': time.perf_counter() - start,
+            'antes': before,
+            'despues': self.measure(),
+        }
+        self.db_manager.record_maintenance(json.dumps(report, ensure_ascii=False))
+        return report
+
+    def run_if_due(self, now=None):
+        return self.run(now) if self.is_due(now) else None
+
+    @staticmethod
+    def format_report(report):
+        before, after = report['antes'], report['despues']
+        mb = 1024 * 1024
+        rows = sum(report['meses_archivados'].values())
+        lines = [
+            f"Historial archivado: {rows} registros en {len(report['meses_archivados'])} meses "
+            f"(anteriores a {report['archivado_hasta'][:10]}).",
+            f"Tamaño de la base: {before['bytes'] / mb:.1f} MB -> {after['bytes'] / mb:.1f} MB "
+            f"({'VACUUM completo' if report['vacuum_completo'] else 'VACUUM incremental'}, "
+            f"{report['seg_vacuum']:.1f} s).",
+            f"Historial activo: {before['filas_historial']} -> {after['filas_historial']} registros; "
+            f"{after['filas_resumen']} teléfonos con envío exitoso en el resumen.",
+            f"Consulta de envíos previos: {before['seg_envios_previos'] * 1000:.0f} ms -> "
+            f"{after['seg_envios_previos'] * 1000:.0f} ms.",
+            f"Consulta del historial: {before['seg_historial'] * 1000:.0f} ms -> "
+            f"{after['seg_historial'] * 1000:.0f} ms.",
+        ]
+        if rows:
+            lines.append(f"Archivo: {report['archivo']}")
+        return "\n".join(lines)
@@ -13,6 +13,9 @@ class PandasModel(QAbstractTableModel):
 
     def data(self, index, role=Qt.DisplayRole):
         if index.isValid() and role == Qt.DisplayRole:
+            # Las vistas de ClientStore entregan la celda sin materializar un DataFrame
+            if hasattr(self._data, 'cell'):
+                return str(self._data.cell(index.row(), index.column()))
             return str(self._data.iloc[index.row(), index.column()])
         return None
 
@@ -1,6 +1,127 @@
 # Definición de constantes utilizadas en la aplicación
 DEFAULT_DB_FILE = "nostra_whatsapp.db"
+DB_BUSY_TIMEOUT = 30      # Segundos que una conexión espera un bloqueo de escritura
 REQUIRED_COLUMNS = [
     'Razón social', 'RUT', 'Giro', 'Dirección',
     'Comuna', 'Ciudad', 'Nombre contacto', 'Teléfono'
-]
\ No newline at end of file
+]
+# Instrumentación del envío (temporizadores por etapa)
+METRICS_ENABLED = True
+METRICS_MAX_SAMPLES = 10000
+
+# Tiempos de envío con pywhatkit (segundos)
+SEND_WAIT_TIME = 15       # Tiempo para cargar WhatsApp Web
+SEND_CLOSE_TIME = 3       # Tiempo para cerrar la pestaña
+POST_SEND_WAIT = 2        # Espera para que se complete el envío
+DELAY_RANGE = (3, 5)      # Espera aleatoria entre mensajes
+
+# Log de envíos: archivo rotativo completo y búfer acotado en la ventana de progreso
+LOG_DIR = "logs"
+LOG_FILE_NAME = "envios.log"
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_FLUSH_INTERVAL_MS = 100
+LOG_MAX_LINES = 2000
+
+# Horario permitido para envíos programados (lunes=0 ... domingo=6)
+SEND_WINDOW_START_HOUR = 9
+SEND_WINDOW_END_HOUR = 18
+SEND_WINDOW_WEEKDAYS = (0, 1, 2, 3, 4, 5)
+SCHEDULER_POLL_INTERVAL_MS = 30000
+
+# Exportación de clientes e historial (filas leídas de SQLite por lote)
+EXPORT_CHUNK_SIZE = 5000
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet')
+
+# Importación desde varias planillas/CSV: encabezados alternativos (sin tildes, en minúsculas) por columna
+COLUMN_ALIASES = {
+    'razon social': 'Razón social',
+    'empresa': 'Razón social',
+    'nombre empresa': 'Razón social',
+    'rut': 'RUT',
+    'rut empresa': 'RUT',
+    'giro': 'Giro',
+    'actividad': 'Giro',
+    'direccion': 'Dirección',
+    'domicilio': 'Dirección',
+    'comuna': 'Comuna',
+    'ciudad': 'Ciudad',
+    'nombre contacto': 'Nombre contacto',
+    'contacto': 'Nombre contacto',
+    'telefono': 'Teléfono',
+    'fono': 'Teléfono',
+    'celular': 'Teléfono',
+    'movil': 'Teléfono',
+    'whatsapp': 'Teléfono',
+}
+IMPORT_FILE_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+IMPORT_MAX_WORKERS = None  # None: un proceso por núcleo
+IMPORT_CHUNK_SIZE = 20000  # Filas por lote al guardar (progreso y punto de cancelación)
+IMPORT_REJECTS_DIR = "logs"  # Archivos de filas rechazadas al importar
+
+# Reintentos de envíos fallidos: backoff exponencial con jitter hasta RETRY_MAX_ATTEMPTS intentos
+RETRY_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 60     # Segundos antes del primer reintento
+RETRY_MAX_DELAY = 900
+RETRY_JITTER = 0.5        # Variación aleatoria de ±50% sobre la espera
+# Errores transitorios (por nombre de clase, incluye subclases); el resto va directo a envios_fallidos.
+# No se incluye OSError: FileNotFoundError o PermissionError no se arreglan reintentando.
+RETRYABLE_ERRORS = ('InternetException', 'ConnectionError', 'TimeoutError', 'Timeout')
+
+# Caché de mensajes renderizados: se conservan las últimas plantillas usadas
+RENDER_CACHE_MAX_TEMPLATES = 5
+
+# Adjuntos: caché local por contenido (sha256), acotada en disco con expulsión LRU
+MEDIA_CACHE_DIR = "media_cache"
+MEDIA_CACHE_MAX_BYTES = 500 * 1024 * 1024
+MEDIA_MAX_FILE_BYTES = 16 * 1024 * 1024   # Límite de WhatsApp para imágenes
+MEDIA_MAX_IMAGE_SIDE = 1600               # Las imágenes más grandes se reducen (requiere Pillow)
+MEDIA_JPEG_QUALITY = 85
+
+# Biblioteca de plantillas: el archivo solo se usa para sembrar la primera versión
+DEFAULT_TEMPLATE_FILE = "default_template.txt"
+DEFAULT_TEMPLATE_NAME = "Predeterminada"
+
+# Nodos trabajadores (worker.py) sobre una base compartida
+WORKER_LEASE_SECONDS = 600      # Tras este plazo sin respuesta del nodo, sus reservas vuelven a la cola
+WORKER_POLL_SECONDS = 15        # Espera cuando la cola está vacía
+# Separación mínima entre envíos de una misma cuenta de WhatsApp, sumando todos los nodos
+WORKER_ACCOUNT_MIN_INTERVAL = SEND_WAIT_TIME + SEND_CLOSE_TIME + POST_SEND_WAIT + sum(DELAY_RANGE) / 2
+
+# Orden de envío: los destinatarios se agrupan por estas columnas (y se reparten entre cuentas por grupo)
+RECIPIENT_ORDER_OPTIONS = {
+    'Ciudad y comuna': ('Ciudad', 'Comuna'),
+    'Ciudad': ('Ciudad',),
+    'Giro': ('Giro',),
+    'Giro, ciudad y comuna': ('Giro', 'Ciudad', 'Comuna'),
+    'Orden de importación': (),
+}
+DEFAULT_RECIPIENT_ORDER = 'Ciudad y comuna'
+
+# Lista de exclusión: respuestas que piden la baja (sin tildes y en minúsculas)
+# Una palabra clave cuenta solo si es la respuesta completa, a lo más con palabras de cortesía ("stop por favor")
+OPT_OUT_KEYWORDS = ('baja', 'stop', 'alto', 'salir', 'desuscribir', 'unsubscribe', 'cancelar')
+OPT_OUT_FILLER_WORDS = ('por', 'favor', 'porfa', 'gracias', 'muchas', 'please', 'ya')
+OPT_OUT_PHRASES = (
+    'dar de baja', 'darme de baja', 'de baja por favor', 'no me escriban', 'no me escribas', 'no me envien',
+    'no me manden', 'no enviar mas', 'no mas mensajes', 'no quiero recibir', 'no molestar', 'no me contacten',
+    'salir de la lista', 'sacarme de la lista', 'sacame de la lista',
+)
+
+# Almacén de clientes en memoria: columnas con pocos valores distintos (respecto a las filas) se codifican
+CATEGORY_MAX_RATIO = 0.5
+# Columnas con índice precalculado por valor para filtrar sin volver a SQLite
+FILTER_COLUMNS = ('Ciudad', 'Comuna', 'Giro')
+
+# Mantenimiento de la base: el historial más antiguo pasa a tablas por mes en <base>_archivo.db
+HISTORY_RETENTION_DAYS = 180
+HISTORY_ARCHIVE_SUFFIX = "_archivo"
+MAINTENANCE_INTERVAL_DAYS = 7   # Se ejecuta solo, sin envíos en curso, cuando pasó este plazo
+MAINTENANCE_STARTUP_DELAY_S = 600  # Ni al abrir la aplicación: primero se deja trabajar al usuario
+HISTORY_UNDO_DAYS = 30          # Plazo para deshacer una eliminación del historial
+
+# Modo perfilado (main.py --profile o Ctrl+Shift+P): un paquete perfil_<fecha> por sesión
+PROFILE_DIR = "perfiles"
+PROFILE_TOP_ALLOCATIONS = 15
+PROFILE_TOP_FUNCTIONS = 25
+PROFILE_STOP_WAIT_S = 10  # Espera máxima al detener el perfilado para que terminen las operaciones en curso
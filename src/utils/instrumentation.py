@@ -0,0 +1,115 @@
+import json
+import time
+from collections import deque
+
+
+class _NullTimer:
+    # Temporizador vacío usado cuando la instrumentación está deshabilitada
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ('_instrumentation', '_stage', '_start')
+
+    def __init__(self, instrumentation, stage):
+        self._instrumentation = instrumentation
+        self._stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._instrumentation.observe(self._stage, time.perf_counter() - self._start)
+        return False
+
+
+class Histogram:
+    """Muestras acotadas de una etapa, con percentiles calculados a demanda."""
+
+    def __init__(self, max_samples=10000):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {'count': 0, 'sum': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+
+        def pick(q):
+            return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'p50': pick(0.50),
+            'p95': pick(0.95),
+            'max': ordered[-1],
+        }
+
+
+class Instrumentation:
+    """Temporizadores monotónicos, contadores e histogramas por etapa del envío."""
+
+    def __init__(self, enabled=True, max_samples=10000):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self.histograms = {}
+        self.counters = {}
+
+    def timer(self, stage):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, stage)
+
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram(self.max_samples)
+        histogram.observe(seconds)
+
+    def incr(self, name, value=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        return {
+            'stages': {stage: hist.summary() for stage, hist in self.histograms.items()},
+            'counters': dict(self.counters),
+        }
+
+    def to_json(self, extra=None):
+        data = self.snapshot()
+        if extra:
+            data.update(extra)
+        return json.dumps(data, indent=2, ensure_ascii=False)
+
+    def to_prometheus(self, prefix="nostrawhatsapp"):
+        lines = [
+            f"# HELP {prefix}_stage_seconds Duración de cada etapa del envío.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for stage, summary in sorted(self.snapshot()['stages'].items()):
+            lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="0.5"}} {summary["p50"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="0.95"}} {summary["p95"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {summary["sum"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {summary["count"]}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,24 @@
+import logging
+import os
+from logging.handlers import RotatingFileHandler
+from .constants import LOG_DIR, LOG_FILE_NAME, LOG_FILE_MAX_BYTES, LOG_BACKUP_COUNT
+
+SEND_LOGGER_NAME = "nostrawhatsapp.envios"
+
+
+def get_send_logger():
+    # El handler se configura una sola vez aunque se creen varios hilos de envío
+    logger = logging.getLogger(SEND_LOGGER_NAME)
+    if not logger.handlers:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        handler = RotatingFileHandler(
+            os.path.join(LOG_DIR, LOG_FILE_NAME),
+            maxBytes=LOG_FILE_MAX_BYTES,
+            backupCount=LOG_BACKUP_COUNT,
+            encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
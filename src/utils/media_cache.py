@@ -0,0 +1,116 @@
+import hashlib
+import os
+import shutil
+from .constants import (
+    MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES, MEDIA_MAX_FILE_BYTES, MEDIA_MAX_IMAGE_SIDE, MEDIA_JPEG_QUALITY
+)
+
+# Firmas de los formatos que pywhatkit puede adjuntar (solo imágenes)
+IMAGE_SIGNATURES = {
+    b'\x89PNG\r\n\x1a\n': '.png',
+    b'\xff\xd8\xff': '.jpg',
+}
+PDF_SIGNATURE = b'%PDF'
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def detect_image_extension(path):
+    # El tipo se decide por el contenido, no por la extensión del nombre
+    with open(path, 'rb') as f:
+        header = f.read(8)
+    if header.startswith(PDF_SIGNATURE):
+        raise ValueError("pywhatkit no permite adjuntar PDF; envíe el catálogo como imagen (PNG/JPG) "
+                         "o incluya un enlace en el mensaje")
+    for signature, extension in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return extension
+    raise ValueError("Formato de adjunto no soportado: solo imágenes PNG o JPG")
+
+
+class MediaItem:
+    def __init__(self, source, path, sha256, size):
+        self.source = source
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+
+
+class MediaCache:
+    """Adjuntos validados y optimizados una sola vez, guardados por hash de contenido.
+
+    Todos los destinatarios (y cuentas) de una campaña reutilizan el mismo archivo preparado. La
+    carpeta se mantiene bajo max_bytes eliminando primero los archivos usados hace más tiempo.
+    """
+
+    def __init__(self, cache_dir=MEDIA_CACHE_DIR, max_bytes=MEDIA_CACHE_MAX_BYTES,
+                 max_side=MEDIA_MAX_IMAGE_SIDE, jpeg_quality=MEDIA_JPEG_QUALITY):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_side = max_side
+        self.jpeg_quality = jpeg_quality
+
+    def prepare(self, source):
+        if not os.path.isfile(source):
+            raise ValueError(f"No se encontró el archivo adjunto: {source}")
+        extension = detect_image_extension(source)
+        sha256 = file_sha256(source)
+        # La clave incluye los parámetros de procesamiento: si cambian, se genera otra variante
+        path = os.path.join(self.cache_dir, f"{sha256}_{self.max_side}_{self.jpeg_quality}{extension}")
+        if os.path.exists(path):
+            os.utime(path)  # Marca de uso para la expulsión LRU
+        else:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = path + '.tmp'
+            try:
+                self._optimize(source, tmp_path, extension)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        size = os.path.getsize(path)
+        if size > MEDIA_MAX_FILE_BYTES:
+            raise ValueError(f"El adjunto pesa {size / 1024 / 1024:.1f} MB; WhatsApp admite hasta "
+                             f"{MEDIA_MAX_FILE_BYTES // 1024 // 1024} MB")
+        self.evict(keep=path)
+        return MediaItem(source, path, sha256, size)
+
+    def _optimize(self, source, target, extension):
+        # Dependencia opcional: sin Pillow la imagen se copia tal cual
+        try:
+            from PIL import Image
+        except ImportError:
+            shutil.copyfile(source, target)
+            return
+        with Image.open(source) as image:
+            image.load()
+            if max(image.size) > self.max_side:
+                image.thumbnail((self.max_side, self.max_side))
+            if extension == '.jpg':
+                image.convert('RGB').save(target, 'JPEG', quality=self.jpeg_quality, optimize=True)
+            else:
+                image.save(target, 'PNG', optimize=True)
+
+    def evict(self, keep=None):
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if os.path.isfile(path) and not name.endswith('.tmp'):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            os.remove(path)
+            total -= size
@@ -0,0 +1,31 @@
+import re
+
+import pandas as pd
+
+_NON_DIGITS = re.compile(r'\D')
+# Excel entrega los teléfonos numéricos como '912345678.0'
+_EXCEL_FLOAT_SUFFIX = re.compile(r'\.0$')
+
+
+def normalize_phone(raw):
+    # Devuelve (teléfono formateado, es_válido); si no es válido se devuelven solo los dígitos
+    phone = _NON_DIGITS.sub('', _EXCEL_FLOAT_SUFFIX.sub('', str(raw).strip()))
+    if phone.startswith('9') and len(phone) == 9:
+        return f"+56{phone}", True
+    if phone.startswith('569') and len(phone) == 11:
+        return f"+{phone}", True
+    return phone, False
+
+
+def normalize_phones(values):
+    # Versión vectorizada: celulares chilenos en formato E.164, cadena vacía si no es válido
+    # Igual que normalize_phone: primero se quitan los espacios y luego el sufijo '.0' de Excel
+    digits = (pd.Series(values, dtype="object").fillna("").astype(str).str.strip()
+              .str.replace(r'\.0$', '', regex=True).str.replace(r'\D', '', regex=True))
+    lengths = digits.str.len()
+    local = digits.str.startswith('9') & (lengths == 9)
+    international = digits.str.startswith('569') & (lengths == 11)
+    result = pd.Series('', index=digits.index, dtype="object")
+    result[local] = '+56' + digits[local]
+    result[international] = '+' + digits[international]
+    return result
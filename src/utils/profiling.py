@@ -0,0 +1,271 @@
+"""Modo perfilado: cProfile, tracemalloc y tiempos de pared por operación, guardados en un paquete por sesión.
+
+Se activa con `python main.py --profile` o con Ctrl+Shift+P en la ventana principal. Para ver el resumen
+de un paquete (carpeta o .zip):
+
+    python -m src.utils.profiling perfiles/perfil_20250101_120000.zip
+"""
+import argparse
+import cProfile
+import datetime
+import functools
+import glob
+import json
+import os
+import platform
+import pstats
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from .constants import PROFILE_DIR, PROFILE_TOP_ALLOCATIONS, PROFILE_TOP_FUNCTIONS, PROFILE_STOP_WAIT_S
+
+SPANS_FILE = "spans.jsonl"
+ENVIRONMENT_FILE = "entorno.json"
+
+
+class Profiler:
+    """Captura por operación (span) mientras el modo perfilado está activo.
+
+    Cada span guarda su tiempo de pared; el más externo de cada hilo guarda además sus estadísticas de
+    cProfile (archivo .prof legible con pstats), el pico de memoria y las líneas con más memoria asignada
+    que sigue viva al terminar. Con el modo apagado un span solo revisa `enabled`.
+
+    tracemalloc mide un solo pico para todo el proceso. Si dos spans se superponen (p. ej. el envío y un
+    filtro en la interfaz), ambos informan el pico del conjunto desde que empezó el primero y quedan
+    marcados con memoria_pico_compartida.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.bundle_dir = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._tracing = 0
+        self._started_tracemalloc = False
+        self._count = 0
+        # Spans externos iniciados desde que el primero de los activos empezó (para marcar superposiciones)
+        self._overlap_starts = 0
+        self._idle = threading.Condition(self._lock)
+
+    def start(self, output_dir=PROFILE_DIR):
+        if self.enabled:
+            return self.bundle_dir
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.bundle_dir = os.path.join(output_dir, f"perfil_{timestamp}")
+        os.makedirs(self.bundle_dir, exist_ok=True)
+        with open(os.path.join(self.bundle_dir, ENVIRONMENT_FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                'inicio': datetime.datetime.now().isoformat(timespec='seconds'),
+                'python': sys.version,
+                'plataforma': platform.platform(),
+                'cpus': os.cpu_count(),
+                'argumentos': sys.argv,
+            }, f, indent=2, ensure_ascii=False)
+        self._count = 0
+        self.enabled = True
+        return self.bundle_dir
+
+    def stop(self, wait_seconds=PROFILE_STOP_WAIT_S):
+        # Comprime el paquete para enviarlo; devuelve la ruta del .zip o None si no estaba activo. Antes
+        # espera (hasta wait_seconds) a que terminen los spans en curso en otros hilos, para incluirlos.
+        if not self.enabled:
+            return None
+        self.enabled = False
+        with self._idle:
+            self._idle.wait_for(lambda: self._tracing == 0, timeout=wait_seconds)
+        return shutil.make_archive(self.bundle_dir, 'zip', self.bundle_dir)
+
+    def active_spans(self):
+        with self._lock:
+            return self._tracing
+
+    @contextmanager
+    def span(self, name):
+        if not self.enabled:
+            yield
+            return
+        bundle_dir = self.bundle_dir
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        outermost = depth == 0
+        profile = None
+        if outermost:
+            overlap_mark = self._start_tracing()
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Otro perfilador activo (p. ej. un depurador): solo tiempos y memoria
+                profile = None
+        started_at = datetime.datetime.now()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            self._local.depth = depth
+            entry = {
+                'nombre': name,
+                'inicio': started_at.isoformat(timespec='milliseconds'),
+                'segundos': seconds,
+                'hilo': threading.current_thread().name,
+                'anidado': not outermost,
+                'error': error,
+            }
+            if outermost:
+                entry.update(self._memory_summary())
+                entry['memoria_pico_compartida'] = self._stop_tracing(overlap_mark)
+            self._write(bundle_dir, entry, profile)
+            if outermost:
+                with self._idle:
+                    self._idle.notify_all()
+
+    def _start_tracing(self):
+        # tracemalloc es global: se inicia con el primer span activo y se detiene con el último. El pico solo
+        # se reinicia sin otros spans activos, para no borrar el de un span de otro hilo.
+        # Devuelve la marca para saber al terminar si otro span se superpuso.
+        with self._lock:
+            if self._tracing == 0:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._started_tracemalloc = True
+                tracemalloc.reset_peak()
+                self._overlap_starts = 0
+            self._tracing += 1
+            self._overlap_starts += 1
+            return self._overlap_starts, self._tracing > 1
+
+    def _stop_tracing(self, overlap_mark):
+        # Devuelve True si el pico de este span se compartió con otro span superpuesto
+        starts, shared = overlap_mark
+        with self._lock:
+            shared = shared or self._overlap_starts != starts
+            self._tracing -= 1
+            if self._tracing == 0 and self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+            return shared
+
+    def _memory_summary(self):
+        if not tracemalloc.is_tracing():
+            return {}
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+        top = snapshot.statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]
+        return {
+            'memoria_pico_bytes': peak,
+            'asignaciones': [
+                {'linea': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                 'bytes': stat.size, 'bloques': stat.count}
+                for stat in top
+            ],
+        }
+
+    def _write(self, bundle_dir, entry, profile):
+        with self._lock:
+            self._count += 1
+            if profile is not None:
+                entry['perfil'] = f"{self._count:04d}_{entry['nombre']}.prof"
+                profile.dump_stats(os.path.join(bundle_dir, entry['perfil']))
+            with open(os.path.join(bundle_dir, SPANS_FILE), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+PROFILER = Profiler()
+
+
+def profiled(name):
+    """Decorador: registra cada llamada como un span de PROFILER cuando el modo perfilado está activo."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return function(*args, **kwargs)
+            with PROFILER.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _short_location(filename, line, function):
+    parts = filename.replace('\\', '/').split('/')
+    return f"{'/'.join(parts[-2:])}:{line}({function})"
+
+
+def summarize(bundle, top=PROFILE_TOP_FUNCTIONS):
+    """Resumen en texto de un paquete (carpeta o .zip): operaciones, funciones más costosas y memoria."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if os.path.isfile(bundle):
+            shutil.unpack_archive(bundle, tmp_dir, 'zip')
+            bundle_dir = tmp_dir
+        else:
+            bundle_dir = bundle
+        spans = []
+        spans_path = os.path.join(bundle_dir, SPANS_FILE)
+        if os.path.exists(spans_path):
+            with open(spans_path, encoding='utf-8') as f:
+                spans = [json.loads(line) for line in f if line.strip()]
+        profiles = sorted(glob.glob(os.path.join(bundle_dir, '*.prof')))
+        stats = pstats.Stats(*profiles) if profiles else None
+
+    lines = [f"Paquete: {bundle}", "", "Operaciones (tiempo de pared):"]
+    by_name = defaultdict(list)
+    for span in spans:
+        by_name[span['nombre']].append(span)
+    for name, group in sorted(by_name.items(), key=lambda item: -sum(s['segundos'] for s in item[1])):
+        seconds = [s['segundos'] for s in group]
+        peak = max((s.get('memoria_pico_bytes', 0) for s in group), default=0)
+        errors = sum(1 for s in group if s.get('error'))
+        lines.append(
+            f"  {name:<28} {len(group):>4} veces  total {sum(seconds):9.3f} s  máx {max(seconds):9.3f} s"
+            f"  pico {peak / 1024 / 1024:8.1f} MB" + (f"  errores {errors}" if errors else "")
+        )
+    if not spans:
+        lines.append("  (sin operaciones registradas)")
+    elif any(span.get('memoria_pico_compartida') for span in spans):
+        lines.append("  (hubo operaciones superpuestas: su pico de memoria es el del conjunto)")
+
+    lines += ["", f"Funciones con más tiempo propio (top {top}):"]
+    if stats is not None:
+        rows = sorted(stats.stats.items(), key=lambda item: -item[1][2])[:top]
+        lines.append(f"  {'llamadas':>10} {'propio s':>10} {'acumulado s':>12}  función")
+        for (filename, line, function), (_, calls, own, cumulative, _) in rows:
+            lines.append(f"  {calls:>10} {own:>10.3f} {cumulative:>12.3f}  {_short_location(filename, line, function)}")
+    else:
+        lines.append("  (sin perfiles de cProfile)")
+
+    allocations = defaultdict(int)
+    for span in spans:
+        for allocation in span.get('asignaciones', []):
+            allocations[allocation['linea']] = max(allocations[allocation['linea']], allocation['bytes'])
+    if allocations:
+        lines += ["", "Líneas con más memoria viva al terminar una operación:"]
+        for location, size in sorted(allocations.items(), key=lambda item: -item[1])[:PROFILE_TOP_ALLOCATIONS]:
+            lines.append(f"  {size / 1024:10.1f} KB  {location}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumen de un paquete de perfilado de NostraWhatsApp")
+    parser.add_argument("paquete", help="Carpeta perfil_* o su .zip")
+    parser.add_argument("--top", type=int, default=PROFILE_TOP_FUNCTIONS, help="Funciones a mostrar")
+    args = parser.parse_args(argv)
+    print(summarize(args.paquete, top=args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+
+CHECK_DIGIT_CHARS = np.array(list('0123456789K'))
+
+
+def compute_check_values(bodies):
+    # Dígito verificador módulo 11 como entero (10 representa la K)
+    bodies = np.asarray(bodies, dtype=np.int64)
+    total = np.zeros(len(bodies), dtype=np.int64)
+    remaining = bodies.copy()
+    factor = 2
+    for _ in range(9):
+        total += (remaining % 10) * factor
+        remaining //= 10
+        factor = 2 if factor == 7 else factor + 1
+    return (11 - total % 11) % 11
+
+
+def compute_check_digits(bodies):
+    # Dígito verificador módulo 11 para un arreglo de cuerpos de RUT (int64)
+    return CHECK_DIGIT_CHARS[compute_check_values(bodies)]
+
+
+RUT_MAX_CHARS = 16
+_POWERS_OF_TEN = 10 ** np.arange(10, dtype=np.int32)
+_ZERO, _NINE, _UPPER_K, _LOWER_K, _DOT = ord('0'), ord('9'), ord('K'), ord('k'), ord('.')
+
+
+def normalize_ruts(values):
+    """Normaliza RUTs de forma vectorizada.
+
+    Devuelve un DataFrame con rut_num (cuerpo sin dígito verificador, 0 si no se pudo
+    interpretar), dv y rut_valido (el dígito verificador coincide con el módulo 11).
+    """
+    index = values.index if isinstance(values, pd.Series) else None
+    # None/NaN se convierten en 'None'/'nan', que no contienen dígitos y quedan como no interpretables
+    texts = values.to_numpy(dtype=object) if isinstance(values, pd.Series) else list(values)
+    n_rows = len(texts)
+    # Cada RUT como fila de una matriz de códigos Unicode (relleno con ceros a la derecha);
+    # la columna extra detecta textos más largos de lo que admite un RUT
+    width = RUT_MAX_CHARS + 1
+    chars = np.array(texts, dtype=f"U{width}").view(np.uint32).reshape(n_rows, width)
+    too_long = chars[:, RUT_MAX_CHARS] != 0
+    chars = chars[:, :RUT_MAX_CHARS]
+    lengths = (chars != 0).sum(axis=1)
+    rows = np.arange(n_rows)
+
+    # Excel entrega los RUT numéricos como '12345678.0': se descarta ese sufijo
+    excel_float = (lengths >= 2) & (chars[rows, np.maximum(lengths - 2, 0)] == _DOT) \
+        & (chars[rows, np.maximum(lengths - 1, 0)] == _ZERO)
+    chars[excel_float, lengths[excel_float] - 1] = 0
+    chars[excel_float, lengths[excel_float] - 2] = 0
+
+    # Solo cuentan dígitos y K; puntos, guiones y espacios se ignoran
+    is_digit = (chars >= _ZERO) & (chars <= _NINE)
+    is_k = (chars == _UPPER_K) | (chars == _LOWER_K)
+    keep = is_digit | is_k
+    has_any = keep.any(axis=1)
+    last = RUT_MAX_CHARS - 1 - np.argmax(keep[:, ::-1], axis=1)
+    dv_codes = chars[rows, last]
+
+    body = keep & (np.arange(RUT_MAX_CHARS) < last[:, None])
+    body_digits = body.sum(axis=1)
+    parseable = has_any & ~too_long & ~(body & is_k).any(axis=1) & (body_digits >= 1) & (body_digits <= 9)
+
+    # Valor del cuerpo: cada dígito por 10 elevado a la cantidad de dígitos que le siguen
+    exponents = np.cumsum(body[:, ::-1], axis=1)[:, ::-1] - 1
+    digit_values = np.where(body, chars.astype(np.int32) - _ZERO, 0)
+    numbers = (digit_values * _POWERS_OF_TEN[np.clip(exponents, 0, 9)]).sum(axis=1, dtype=np.int64)
+    numbers[~parseable] = 0
+
+    dv_values = np.where(np.isin(dv_codes, (_UPPER_K, _LOWER_K)), 10, dv_codes.astype(np.int64) - _ZERO)
+    dv_values = np.where(parseable, dv_values, 0)
+    valid = parseable & (numbers > 0) & (compute_check_values(numbers) == dv_values)
+    dv = np.where(parseable, CHECK_DIGIT_CHARS[dv_values], '')
+    return pd.DataFrame({'rut_num': numbers, 'dv': dv, 'rut_valido': valid}, index=index)
+
+
+def rut_keys(values):
+    # Clave canónica 'cuerpo-dv' para cruzar y deduplicar; cadena vacía si no se pudo interpretar
+    normalized = normalize_ruts(values)
+    keys = normalized['rut_num'].astype(str) + '-' + normalized['dv']
+    return keys.where(normalized['dv'] != '', '')
+
@@ -0,0 +1,63 @@
+import functools
+import hashlib
+import re
+
+import pandas as pd
+
+PLACEHOLDER_PATTERN = re.compile(r'\[([^\[\]]+)\]')
+
+
+def compile_template(template, columns):
+    # Separa la plantilla en segmentos: (True, columna) para variables y (False, texto) para literales.
+    # Las variables que no corresponden a una columna se conservan como texto literal.
+    segments, unknown = _compile_cached(template, tuple(columns))
+    return list(segments), list(unknown)
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_cached(template, columns):
+    # Cada plantilla se analiza una sola vez por conjunto de columnas durante la vida del proceso
+    columns = set(columns)
+    segments = []
+    unknown = []
+    position = 0
+    for match in PLACEHOLDER_PATTERN.finditer(template):
+        if match.group(1) not in columns:
+            if match.group(1) not in unknown:
+                unknown.append(match.group(1))
+            continue
+        if match.start() > position:
+            segments.append((False, template[position:match.start()]))
+        segments.append((True, match.group(1)))
+        position = match.end()
+    if position < len(template):
+        segments.append((False, template[position:]))
+    return tuple(segments), tuple(unknown)
+
+
+def render_frame(template, df):
+    # Renderiza la plantilla para todas las filas a la vez concatenando columnas completas
+    segments, _ = compile_template(template, df.columns)
+    result = pd.Series('', index=df.index, dtype="object")
+    for is_field, value in segments:
+        if is_field:
+            result = result + df[value].astype(str)
+        else:
+            result = result + value
+    return result
+
+
+def template_key(template, columns):
+    # Hash de la plantilla junto con los campos que reemplaza; devuelve (hash, campos)
+    segments, _ = compile_template(template, columns)
+    fields = list(dict.fromkeys(value for is_field, value in segments if is_field))
+    digest = hashlib.sha256("\0".join([template] + fields).encode("utf-8")).hexdigest()
+    return digest, fields
+
+
+def row_hashes(df, fields):
+    # Hash estable de 64 bits de los campos usados por la plantilla: cambia si cambia el dato del contacto
+    if not fields:
+        return pd.Series(0, index=df.index, dtype="int64")
+    hashes = pd.util.hash_pandas_object(df[fields].astype(str), index=False)
+    return pd.Series(hashes.to_numpy().view("int64"), index=df.index)
@@ -1,5 +1,6 @@
 from PyQt5.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QTableView, QLabel, QPushButton, QHeaderView, QHBoxLayout, QMessageBox
 from PyQt5.QtCore import Qt # Import Qt for selection behavior
+import numpy as np
 from ..models.pandas_model import PandasModel
 
 class HistoryWindow(QMainWindow):
@@ -11,11 +12,20 @@ class HistoryWindow(QMainWindow):
 
     def init_ui(self):
         self.setWindowTitle("Historial de Envíos")
-        self.setGeometry(150, 150, 800, 500)
+        self.setGeometry(150, 150, 800, 650)
         central_widget = QWidget()
         main_layout = QVBoxLayout()
 
-        main_layout.addWidget(QLabel(f"Últimos {len(self.history_df)} envíos registrados:"))
+        # Resumen por campaña (contadores mantenidos por el hilo de envío)
+        main_layout.addWidget(QLabel("Campañas recientes:"))
+        self.table_campaigns = QTableView()
+        self.table_campaigns.setMaximumHeight(160)
+        main_layout.addWidget(self.table_campaigns)
+        self.load_campaigns()
+
+        count_label = QLabel(f"Últimos {len(self.history_df)} envíos registrados:")
+        count_label.setObjectName("current_count_label")
+        main_layout.addWidget(count_label)
 
         self.table_history = QTableView()
         model = PandasModel(self.history_df)
@@ -30,6 +40,14 @@ class HistoryWindow(QMainWindow):
 
         main_layout.addWidget(self.table_history)
 
+        # Fallos definitivos (agotaron los reintentos), con el error para revisarlos o reenviarlos a mano
+        self.dead_letters_label = QLabel()
+        main_layout.addWidget(self.dead_letters_label)
+        self.table_dead_letters = QTableView()
+        self.table_dead_letters.setMaximumHeight(160)
+        main_layout.addWidget(self.table_dead_letters)
+        self.load_dead_letters()
+
         # Layout for buttons
         button_layout = QHBoxLayout()
 
@@ -37,6 +55,12 @@ class HistoryWindow(QMainWindow):
         self.btn_delete_selected.clicked.connect(self.delete_selected_history)
         button_layout.addWidget(self.btn_delete_selected)
 
+        # Deshace la última eliminación que siga registrada (ver HISTORY_UNDO_DAYS)
+        self.btn_undo_delete = QPushButton("Deshacer Eliminación")
+        self.btn_undo_delete.clicked.connect(self.undo_last_deletion)
+        button_layout.addWidget(self.btn_undo_delete)
+        self.update_undo_button()
+
         button_layout.addStretch() # Push buttons to the left
 
         btn_close = QPushButton("Cerrar")
@@ -49,53 +73,84 @@ class HistoryWindow(QMainWindow):
         self.setCentralWidget(central_widget)
 
     def delete_selected_history(self):
-        selected_indexes = self.table_history.selectedIndexes()
-        if not selected_indexes:
+        # Una entrada por fila seleccionada (selectedIndexes() devuelve una por celda)
+        selected_rows = self.table_history.selectionModel().selectedRows()
+        if not selected_rows:
             QMessageBox.information(self, "Información", "Seleccione los registros que desea eliminar.")
             return
 
-        # Get the row indices of the selected items
-        selected_rows = sorted(list(set(index.row() for index in selected_indexes)))
-
         reply = QMessageBox.question(
             self,
             "Confirmar Eliminación",
-            f"¿Está seguro de que desea eliminar {len(selected_rows)} registros del historial?",
+            f"¿Está seguro de que desea eliminar {len(selected_rows)} registros del historial?\n"
+            "Podrá deshacerlo con \"Deshacer Eliminación\".",
             QMessageBox.Yes | QMessageBox.No,
             QMessageBox.No
         )
+        if reply != QMessageBox.Yes:
+            return
 
-        if reply == QMessageBox.Yes:
-            model = self.table_history.model()
-            if not isinstance(model, PandasModel):
-                 QMessageBox.critical(self, "Error", "No se pudo obtener el modelo de datos.")
-                 return
-
-            # Get the IDs from the selected rows in the history_df
-            # Ensure 'id' column exists in history_df
-            if 'id' not in self.history_df.columns:
-                 QMessageBox.critical(self, "Error", "La columna 'id' no está disponible en los datos del historial.")
-                 return
-
-            ids_to_delete = [self.history_df.iloc[row]['id'] for row in selected_rows]
-
-            # Add a print statement to show IDs being deleted
-            print(f"Attempting to delete history records with IDs: {ids_to_delete}")
+        if 'id' not in self.history_df.columns:
+            QMessageBox.critical(self, "Error", "La columna 'id' no está disponible en los datos del historial.")
+            return
+        rows = np.fromiter((index.row() for index in selected_rows), dtype=np.intp, count=len(selected_rows))
+        ids_to_delete = self.history_df['id'].to_numpy()[rows]
 
-            try:
-                self.db_manager.delete_history_records(ids_to_delete)
-                QMessageBox.information(self, "Éxito", f"{len(ids_to_delete)} registros eliminados.")
-                self.refresh_history() # Refresh the displayed history
-                print(f"HistoryWindow: After refresh, history_df has {len(self.history_df)} records.") # Added print
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Error al eliminar registros: {str(e)}")
+        try:
+            batch_id = self.db_manager.delete_history_records(ids_to_delete)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error al eliminar registros: {str(e)}")
+            return
+        self.refresh_history()
+        self.update_undo_button()
+        if batch_id is None:
+            QMessageBox.information(self, "Información", "Los registros seleccionados ya no estaban en el historial.")
+        else:
+            QMessageBox.information(self, "Éxito", f"{len(ids_to_delete)} registros eliminados.")
+
+    def update_undo_button(self):
+        deletions = self.db_manager.get_history_deletions(limit=1)
+        self.last_deletion = None if deletions.empty else deletions.iloc[0]
+        self.btn_undo_delete.setEnabled(self.last_deletion is not None)
+        if self.last_deletion is not None:
+            self.btn_undo_delete.setToolTip(
+                f"Restaura {self.last_deletion['filas']} registros eliminados el {self.last_deletion['fecha']} (UTC)"
+            )
+
+    def undo_last_deletion(self):
+        if self.last_deletion is None:
+            return
+        try:
+            restored = self.db_manager.undo_history_deletion(int(self.last_deletion['id']))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error al deshacer la eliminación: {str(e)}")
+            return
+        self.refresh_history()
+        self.update_undo_button()
+        QMessageBox.information(self, "Historial", f"{restored} registros restaurados.")
+
+    def load_campaigns(self):
+        campaigns_df = self.db_manager.get_campaigns(limit=50)
+        self.table_campaigns.setModel(PandasModel(campaigns_df))
+        header = self.table_campaigns.horizontalHeader()
+        for i in range(len(campaigns_df.columns)):
+            header.setSectionResizeMode(i, QHeaderView.Stretch)
 
+    def load_dead_letters(self):
+        dead_letters_df = self.db_manager.get_dead_letters(limit=500)
+        self.dead_letters_label.setText(f"Envíos fallidos sin más reintentos ({len(dead_letters_df)} más recientes):")
+        self.table_dead_letters.setModel(PandasModel(dead_letters_df))
+        header = self.table_dead_letters.horizontalHeader()
+        for i in range(len(dead_letters_df.columns)):
+            header.setSectionResizeMode(i, QHeaderView.Stretch)
 
     def refresh_history(self):
         # Reload history from the database and update the table view
         try:
             updated_history_df = self.db_manager.get_message_history(limit=500)
             self.history_df = updated_history_df
+            self.load_campaigns()
+            self.load_dead_letters()
             model = PandasModel(updated_history_df)
             self.table_history.setModel(model)
             
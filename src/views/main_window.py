@@ -1,13 +1,34 @@
+import datetime
 import os
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QGroupBox, QHBoxLayout, QPushButton, QLabel,
-    QTableView, QComboBox, QTextEdit, QCheckBox, QProgressBar, QMessageBox
+    QTableView, QComboBox, QTextEdit, QCheckBox, QProgressBar, QMessageBox, QDateTimeEdit,
+    QInputDialog, QFileDialog, QProgressDialog, QApplication, QAction
 )
+from PyQt5.QtCore import QDateTime, QTimer, Qt
 from PyQt5.QtWidgets import QHeaderView
 from ..models.pandas_model import PandasModel
 from ..models.database import DatabaseManager
+from ..models.client_store import ClientStore
+from ..models.exporter import DataExporter, EXPORT_TABLES
+from ..models.maintenance import DatabaseMaintenance
 from ..controllers.whatsapp_sender import WhatsAppSenderThread
+from ..controllers.excel_importer import ExcelImportThread
+from ..controllers.maintenance_thread import MaintenanceThread
+from ..controllers.campaign_planner import CampaignPlanner
+from ..controllers.scheduler import CampaignScheduler
+from ..controllers.template_library import TemplateLibrary
+from ..controllers.job_store import SqliteJobStore, jobs_from_plan
+from ..controllers.recipient_sharding import order_recipients, shard_recipients
+from ..controllers.suppression import SuppressionList
+from ..utils.constants import (
+    SCHEDULER_POLL_INTERVAL_MS, DEFAULT_TEMPLATE_NAME, RECIPIENT_ORDER_OPTIONS, DEFAULT_RECIPIENT_ORDER,
+    MAINTENANCE_STARTUP_DELAY_S
+)
+from ..utils.media_cache import MediaCache
+from ..utils.profiling import PROFILER, profiled, summarize
 from .history_window import HistoryWindow
+from .scheduled_window import ScheduledCampaignsWindow
 from .progress_window import SendProgressDialog
 import os
 
@@ -15,13 +36,33 @@ import os
 class NostraWhatsApp(QMainWindow):
     def __init__(self):
         super().__init__()
+        # self.df y self.df_filtered son vistas (arreglos de posiciones) sobre el mismo ClientStore
+        self.client_store = None
         self.df = None
         self.df_filtered = None
         self.sender_thread = None
+        self.import_thread = None
         self.db_manager = DatabaseManager()
+        self.scheduler = CampaignScheduler(self.db_manager)
+        self.maintenance = DatabaseMaintenance(self.db_manager)
+        self.maintenance_thread = None
+        # El mantenimiento automático no corre al abrir la aplicación, aunque nunca se haya ejecutado
+        self.maintenance_not_before = datetime.datetime.now() + datetime.timedelta(seconds=MAINTENANCE_STARTUP_DELAY_S)
+        self.current_job_id = None
+        self.attachment_path = None
+        self.media_cache = MediaCache()
+        self.template_library = TemplateLibrary(self.db_manager)
+        self.template_library.seed_from_file()
         self.init_ui()
         self.load_data_from_db()
 
+        # Revisión periódica de campañas programadas (y reanudación tras un reinicio)
+        self.schedule_timer = QTimer(self)
+        self.schedule_timer.setInterval(SCHEDULER_POLL_INTERVAL_MS)
+        self.schedule_timer.timeout.connect(self.check_scheduled_jobs)
+        self.schedule_timer.start()
+        QTimer.singleShot(0, self.check_scheduled_jobs)
+
     def init_ui(self):
         self.setWindowTitle("NostraWhatsApp - Envío Masivo")
         self.setGeometry(100, 100, 1000, 700)
@@ -36,11 +77,23 @@ class NostraWhatsApp(QMainWindow):
         load_layout = QHBoxLayout()
         self.btn_load_excel = QPushButton("Importar desde Excel")
         self.btn_load_excel.clicked.connect(self.import_excel)
+        self.btn_load_folder = QPushButton("Importar Carpeta")
+        self.btn_load_folder.clicked.connect(self.import_folder)
         self.btn_view_history = QPushButton("Ver Historial de Envíos")
         self.btn_view_history.clicked.connect(self.view_history)
+        self.btn_export = QPushButton("Exportar Datos")
+        self.btn_export.clicked.connect(self.export_data)
+        self.btn_suppression = QPushButton("Lista de Exclusión")
+        self.btn_suppression.clicked.connect(self.import_suppression_list)
+        self.btn_maintenance = QPushButton("Mantenimiento")
+        self.btn_maintenance.clicked.connect(self.run_maintenance)
         self.lbl_data_status = QLabel("Base de datos cargada")
         load_layout.addWidget(self.btn_load_excel)
+        load_layout.addWidget(self.btn_load_folder)
         load_layout.addWidget(self.btn_view_history)
+        load_layout.addWidget(self.btn_export)
+        load_layout.addWidget(self.btn_suppression)
+        load_layout.addWidget(self.btn_maintenance)
         load_layout.addWidget(self.lbl_data_status)
         load_layout.addStretch()
         data_layout.addLayout(load_layout)
@@ -57,21 +110,22 @@ class NostraWhatsApp(QMainWindow):
         city_layout.addWidget(QLabel("Filtrar por Ciudad:"))
         self.cmb_cities = QComboBox()
         self.cmb_cities.setMinimumWidth(200)
-        self.cmb_cities.currentIndexChanged.connect(self.filter_data)
+        # Sin el índice de la señal: filter_data puede estar envuelto por @profiled (*args)
+        self.cmb_cities.currentIndexChanged.connect(lambda: self.filter_data())
         city_layout.addWidget(self.cmb_cities)
         filter_layout.addLayout(city_layout)
         commune_layout = QHBoxLayout()
         commune_layout.addWidget(QLabel("Filtrar por Comuna:"))
         self.cmb_communes = QComboBox()
         self.cmb_communes.setMinimumWidth(200)
-        self.cmb_communes.currentIndexChanged.connect(self.filter_data)
+        self.cmb_communes.currentIndexChanged.connect(lambda: self.filter_data())
         commune_layout.addWidget(self.cmb_communes)
         filter_layout.addLayout(commune_layout)
         giro_layout = QHBoxLayout()
         giro_layout.addWidget(QLabel("Filtrar por Giro:"))
         self.cmb_giros = QComboBox()
         self.cmb_giros.setMinimumWidth(200)
-        self.cmb_giros.currentIndexChanged.connect(self.filter_data)
+        self.cmb_giros.currentIndexChanged.connect(lambda: self.filter_data())
         giro_layout.addWidget(self.cmb_giros)
         filter_layout.addLayout(giro_layout)
         self.cmb_cities.currentIndexChanged.connect(self.city_filter_selected)
@@ -89,37 +143,42 @@ class NostraWhatsApp(QMainWindow):
 
         # Layout for label and save button
         message_header_layout = QHBoxLayout()
-        message_header_layout.addWidget(QLabel(
-            "Variables disponibles: [Razón social], [RUT], [Giro], [Dirección], [Comuna], [Ciudad], [Nombre contacto], [Teléfono]"))
+        message_header_layout.addWidget(QLabel("Plantilla:"))
+        self.cmb_templates = QComboBox()
+        self.cmb_templates.setMinimumWidth(160)
+        self.cmb_templates.currentIndexChanged.connect(self.load_selected_template)
+        message_header_layout.addWidget(self.cmb_templates)
         self.btn_save_message = QPushButton("Guardar Mensaje")
         self.btn_save_message.clicked.connect(self.save_message_template)
         message_header_layout.addWidget(self.btn_save_message)
         message_header_layout.addStretch() # Push button to the right
 
         message_layout.addLayout(message_header_layout) # Add the new header layout
+        message_layout.addWidget(QLabel(
+            "Variables disponibles: [Razón social], [RUT], [Giro], [Dirección], [Comuna], [Ciudad], [Nombre contacto], [Teléfono]"))
 
         self.txt_message = QTextEdit()
         self.txt_message.setPlaceholderText(
             "Escribe tu mensaje aquí usando variables entre corchetes..."
         )
-        # Read default message template from file in the current working directory
-        template_file_path = "default_template.txt" # Changed path
-        try:
-            with open(template_file_path, "r", encoding="utf-8") as f:
-                default_message = f.read()
-            self.txt_message.setText(default_message)
-        except FileNotFoundError:
-            print(f"Error: Default template file not found at {template_file_path}")
-            self.txt_message.setPlaceholderText(
-                "Error: Default template file not found. Please enter your message here."
-            )
-        except Exception as e:
-            print(f"Error reading default template file: {e}")
-            self.txt_message.setPlaceholderText(
-                f"Error reading template file: {e}. Please enter your message here."
-            )
+        # Última versión de la plantilla seleccionada en la biblioteca
+        self.load_template_names()
 
         message_layout.addWidget(self.txt_message)
+
+        # Imagen adjunta (catálogo), enviada con el mensaje como pie de foto
+        attachment_layout = QHBoxLayout()
+        self.btn_attach = QPushButton("Adjuntar Imagen")
+        self.btn_attach.clicked.connect(self.select_attachment)
+        self.btn_clear_attachment = QPushButton("Quitar")
+        self.btn_clear_attachment.clicked.connect(self.clear_attachment)
+        self.btn_clear_attachment.setEnabled(False)
+        self.lbl_attachment = QLabel("Sin adjunto")
+        attachment_layout.addWidget(self.btn_attach)
+        attachment_layout.addWidget(self.btn_clear_attachment)
+        attachment_layout.addWidget(self.lbl_attachment)
+        attachment_layout.addStretch()
+        message_layout.addLayout(attachment_layout)
         message_group.setLayout(message_layout)
         main_layout.addWidget(message_group)
 
@@ -137,15 +196,50 @@ class NostraWhatsApp(QMainWindow):
             "Evitar reenvíos a contactos ya en historial")
         self.chk_avoid_resend.setChecked(True)
         send_options_layout.addWidget(self.chk_avoid_resend)
+        send_options_layout.addWidget(QLabel("Orden:"))
+        self.cmb_order = QComboBox()
+        self.cmb_order.addItems(list(RECIPIENT_ORDER_OPTIONS))
+        self.cmb_order.setCurrentText(DEFAULT_RECIPIENT_ORDER)
+        send_options_layout.addWidget(self.cmb_order)
         send_options_layout.addStretch()
         send_options_group.setLayout(send_options_layout)
 
+        # Programación de envíos
+        schedule_group = QGroupBox("Programar envío")
+        schedule_layout = QHBoxLayout()
+        self.dt_schedule = QDateTimeEdit(QDateTime.currentDateTime().addSecs(3600))
+        self.dt_schedule.setCalendarPopup(True)
+        self.dt_schedule.setDisplayFormat("dd-MM-yyyy HH:mm")
+        schedule_layout.addWidget(self.dt_schedule)
+        self.chk_business_hours = QCheckBox("Solo en horario hábil")
+        self.chk_business_hours.setChecked(True)
+        schedule_layout.addWidget(self.chk_business_hours)
+        self.btn_schedule = QPushButton("Programar")
+        self.btn_schedule.clicked.connect(self.schedule_sending)
+        schedule_layout.addWidget(self.btn_schedule)
+        self.btn_scheduled_list = QPushButton("Programados")
+        self.btn_scheduled_list.clicked.connect(self.view_scheduled_campaigns)
+        schedule_layout.addWidget(self.btn_scheduled_list)
+        schedule_group.setLayout(schedule_layout)
+
         self.btn_send = QPushButton("Iniciar Envío")
         self.btn_send.setMinimumHeight(40)
         self.btn_send.clicked.connect(self.start_sending)
         self.btn_send.setEnabled(False)
 
+        self.btn_preview = QPushButton("Vista Previa")
+        self.btn_preview.setMinimumHeight(40)
+        self.btn_preview.clicked.connect(self.preview_campaign)
+
+        # Reparte el envío entre nodos trabajadores (worker.py) que comparten esta base
+        self.btn_enqueue = QPushButton("Encolar para Nodos")
+        self.btn_enqueue.setMinimumHeight(40)
+        self.btn_enqueue.clicked.connect(self.enqueue_for_workers)
+
         send_area_layout.addWidget(send_options_group)
+        send_area_layout.addWidget(schedule_group)
+        send_area_layout.addWidget(self.btn_preview)
+        send_area_layout.addWidget(self.btn_enqueue)
         send_area_layout.addWidget(self.btn_send)
         send_area_layout.addStretch() # Push options and button to the left
 
@@ -160,10 +254,22 @@ class NostraWhatsApp(QMainWindow):
 
         main_layout.addLayout(footer_layout)
 
+        # Acción oculta (sin menú visible): activa o detiene el modo perfilado
+        self.action_profile = QAction("Modo perfilado", self)
+        self.action_profile.setShortcut("Ctrl+Shift+P")
+        self.action_profile.setCheckable(True)
+        self.action_profile.setChecked(PROFILER.enabled)
+        self.action_profile.toggled.connect(self.toggle_profiling)
+        self.addAction(self.action_profile)
+        if PROFILER.enabled:
+            self.lbl_status.setText(f"Modo perfilado activo: {PROFILER.bundle_dir}")
+
 
+    @profiled("load_data_from_db")
     def load_data_from_db(self):
         try:
-            self.df = self.db_manager.get_all_clients()
+            self.client_store = ClientStore.from_db(self.db_manager)
+            self.df = self.client_store.all()
             if len(self.df) > 0:
                 model = PandasModel(self.df)
                 self.table_data.setModel(model)
@@ -184,55 +290,119 @@ class NostraWhatsApp(QMainWindow):
                 self, "Error", f"Error al cargar datos: {str(e)}")
 
     def import_excel(self):
-        try:
-            default_file = "clientes.xlsx"
-            if os.path.exists(default_file):
-                file_path = default_file
-            else:
-                from PyQt5.QtWidgets import QFileDialog
-                file_path, _ = QFileDialog.getOpenFileName(
-                    self, "Seleccionar archivo Excel", "", "Archivos Excel (*.xlsx *.xls)"
-                )
-            if not file_path:
-                return
-            success, message = self.db_manager.import_excel_to_db(file_path)
-            if success:
-                QMessageBox.information(self, "Importación exitosa", message)
-                self.load_data_from_db()
-            else:
-                QMessageBox.warning(self, "Error", message)
-        except Exception as e:
-            QMessageBox.critical(
-                self, "Error", f"Error al importar Excel: {str(e)}")
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "Seleccionar planillas", "", "Planillas (*.xlsx *.xls *.csv)"
+        )
+        if file_paths:
+            self.import_sources(file_paths)
+
+    def import_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Seleccionar carpeta con planillas")
+        if folder:
+            self.import_sources([folder])
+
+    def import_sources(self, paths):
+        # La lectura y la escritura corren en un hilo; la ventana sigue respondiendo y se puede cancelar
+        if self.import_thread is not None and self.import_thread.isRunning():
+            return
+        if self.maintenance_running():
+            QMessageBox.warning(self, "Importación", "Espere a que termine el mantenimiento de la base.")
+            return
+        self.import_progress = QProgressDialog("Leyendo planillas...", "Cancelar", 0, 0, self)
+        self.import_progress.setWindowTitle("Importando")
+        self.import_progress.setWindowModality(Qt.WindowModal)
+        self.import_progress.setMinimumDuration(0)
+        self.import_progress.setAutoClose(False)
+        self.import_progress.setAutoReset(False)
+        self.import_thread = ExcelImportThread(paths, self.db_manager)
+        self.import_thread.progress_update.connect(self.update_import_progress)
+        self.import_thread.finished_import.connect(self.import_finished)
+        self.import_progress.canceled.connect(self.cancel_import)
+        self.btn_load_excel.setEnabled(False)
+        self.btn_load_folder.setEnabled(False)
+        self.import_thread.start()
+
+    def update_import_progress(self, stage, done, total):
+        if stage == 'leidas':
+            self.import_progress.setLabelText(f"Leyendo planillas: {done} filas leídas...")
+        elif stage == 'validadas':
+            self.import_progress.setLabelText(f"Validando: {done} de {total} filas...")
+        else:
+            self.import_progress.setLabelText(f"Guardando: {done} de {total} filas...")
+            self.import_progress.setMaximum(total)
+            self.import_progress.setValue(done)
+
+    def cancel_import(self):
+        if self.import_thread is not None and self.import_thread.isRunning():
+            self.import_thread.cancel()
+            self.import_progress.setLabelText("Cancelando importación...")
+
+    def import_finished(self, success, message):
+        self.import_progress.canceled.disconnect(self.cancel_import)
+        self.import_progress.close()
+        self.btn_load_excel.setEnabled(True)
+        self.btn_load_folder.setEnabled(True)
+        if success:
+            QMessageBox.information(self, "Importación exitosa", message)
+            self.save_merge_report(self.import_thread.merges)
+            self.load_data_from_db()
+        else:
+            QMessageBox.warning(self, "Importación", message)
+
+    def save_merge_report(self, merges):
+        if merges is None or len(merges) == 0:
+            return
+        reply = QMessageBox.question(
+            self,
+            "Contactos fusionados",
+            f"Se fusionaron {len(merges)} grupos de filas duplicadas.\n¿Desea guardar el reporte de fusiones?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Guardar reporte de fusiones", "fusiones_importacion.csv", "Archivos CSV (*.csv)"
+        )
+        if file_path:
+            merges.to_csv(file_path, index=False, encoding='utf-8-sig')
 
     def update_filter_options(self):
         self.cmb_cities.clear()
         self.cmb_cities.addItem("Todas las ciudades")
-        cities = self.db_manager.get_unique_values("ciudad")
+        cities = self.client_store.unique_values("Ciudad")
         for city in cities:
             self.cmb_cities.addItem(city.capitalize())
         self.cmb_communes.clear()
         self.cmb_communes.addItem("Todas las comunas")
-        communes = self.db_manager.get_unique_values("comuna")
+        communes = self.client_store.unique_values("Comuna")
         for commune in communes:
             self.cmb_communes.addItem(commune.capitalize())
         self.cmb_giros.clear()
         self.cmb_giros.addItem("Todos los giros")
-        giros = self.db_manager.get_unique_values("giro")
+        giros = self.client_store.unique_values("Giro")
         for giro in giros:
             self.cmb_giros.addItem(giro.capitalize())
 
-    def filter_data(self):
-        if self.df is None:
-            return
+    def current_filters(self):
         selected_city = self.cmb_cities.currentText()
         selected_commune = self.cmb_communes.currentText()
         selected_giro = self.cmb_giros.currentText()
-        self.df_filtered = self.db_manager.get_filtered_clients(
-            city=selected_city if selected_city != "Todas las ciudades" else None,
-            commune=selected_commune if selected_commune != "Todas las comunas" else None,
-            giro=selected_giro if selected_giro != "Todos los giros" else None
-        )
+        return {
+            'city': selected_city if selected_city != "Todas las ciudades" else None,
+            'commune': selected_commune if selected_commune != "Todas las comunas" else None,
+            'giro': selected_giro if selected_giro != "Todos los giros" else None,
+        }
+
+    def current_order_keys(self):
+        return RECIPIENT_ORDER_OPTIONS.get(self.cmb_order.currentText(), ())
+
+    @profiled("filter_data")
+    def filter_data(self):
+        if self.df is None:
+            return
+        # Índices por valor precalculados en el almacén: sin consulta a SQLite ni copia de filas
+        self.df_filtered = self.client_store.filter(**self.current_filters())
         model = PandasModel(self.df_filtered)
         self.table_data.setModel(model)
         self.lbl_filter_count.setText(
@@ -251,21 +421,235 @@ class NostraWhatsApp(QMainWindow):
             QMessageBox.critical(
                 self, "Error", f"Error al cargar historial: {str(e)}")
 
+    def select_attachment(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Seleccionar imagen", "", "Imágenes (*.png *.jpg *.jpeg)"
+        )
+        if not file_path:
+            return
+        try:
+            # Se valida y optimiza ahora para avisar de inmediato si el archivo no sirve
+            item = self.media_cache.prepare(file_path)
+        except Exception as e:
+            QMessageBox.warning(self, "Adjunto no válido", str(e))
+            return
+        self.attachment_path = file_path
+        self.lbl_attachment.setText(f"{os.path.basename(file_path)} ({item.size / 1024:.0f} KB)")
+        self.btn_clear_attachment.setEnabled(True)
+
+    def clear_attachment(self):
+        self.attachment_path = None
+        self.lbl_attachment.setText("Sin adjunto")
+        self.btn_clear_attachment.setEnabled(False)
+
+    def export_data(self):
+        labels = list(EXPORT_TABLES.values())
+        label, ok = QInputDialog.getItem(self, "Exportar datos", "Datos a exportar:", labels, 0, False)
+        if not ok:
+            return
+        table = list(EXPORT_TABLES)[labels.index(label)]
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Exportar datos", f"{table}.csv",
+            "CSV (*.csv);;JSON Lines (*.jsonl);;Parquet (*.parquet)"
+        )
+        if not file_path:
+            return
+        if not os.path.splitext(file_path)[1]:
+            file_path += "." + selected_filter.split("*.")[1].rstrip(")")
+        incremental = False
+        if self.db_manager.get_last_export_id(table):
+            reply = QMessageBox.question(
+                self,
+                "Exportación incremental",
+                "¿Exportar solo los registros nuevos desde la última exportación?",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.Yes
+            )
+            incremental = reply == QMessageBox.Yes
+        try:
+            result = DataExporter(self.db_manager).export(table, file_path, incremental=incremental)
+            QMessageBox.information(
+                self, "Exportación completa",
+                f"Se exportaron {result['filas']} registros a {result['ruta']} "
+                f"en {result['segundos']:.1f} s."
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error al exportar: {str(e)}")
+
+    def import_suppression_list(self):
+        suppression = SuppressionList(self.db_manager).load()
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            f"Importar lista de exclusión ({len(suppression)} números excluidos)",
+            "",
+            "Archivos CSV (*.csv)"
+        )
+        if not file_path:
+            return
+        try:
+            added = suppression.import_csv(file_path)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"No se pudo importar la lista de exclusión: {str(e)}")
+            return
+        QMessageBox.information(
+            self,
+            "Lista de exclusión",
+            f"Se agregaron {added} números a la lista de exclusión ({len(suppression)} en total).\n\n"
+            "Si el archivo trae una columna de mensaje o respuesta, solo se excluyen quienes pidieron la baja."
+        )
+
+    def toggle_profiling(self, enabled):
+        if enabled:
+            bundle_dir = PROFILER.start()
+            self.lbl_status.setText(f"Modo perfilado activo: {bundle_dir}")
+            return
+        # Las operaciones en otros hilos deben terminar dentro del paquete: no se detiene con ellas en curso
+        running = [name for name, thread in (
+            ("el envío", self.sender_thread), ("la importación", self.import_thread),
+            ("el mantenimiento", self.maintenance_thread),
+        ) if thread is not None and thread.isRunning()]
+        if running:
+            self.action_profile.blockSignals(True)
+            self.action_profile.setChecked(True)
+            self.action_profile.blockSignals(False)
+            QMessageBox.warning(self, "Modo perfilado",
+                                f"Espere a que termine {' y '.join(running)} para guardar el perfil.")
+            return
+        bundle = PROFILER.stop()
+        if bundle is None:
+            return
+        self.lbl_status.setText(f"Perfil guardado en {bundle}")
+        box = QMessageBox(self)
+        box.setWindowTitle("Modo perfilado")
+        box.setText(f"Se guardó el perfil en:\n{bundle}\n\nEnvíe este archivo junto con la descripción del problema.")
+        box.setDetailedText(summarize(bundle))
+        box.exec_()
+
+    def maintenance_blocker(self):
+        # Motivo por el que no se puede mantener la base ahora, o None. VACUUM bloquea la base completa.
+        if self.maintenance_running():
+            return "Ya hay un mantenimiento en curso."
+        if self.sender_thread is not None and self.sender_thread.isRunning():
+            return "Espere a que termine el envío en curso."
+        if self.import_thread is not None and self.import_thread.isRunning():
+            return "Espere a que termine la importación en curso."
+        if SqliteJobStore(self.db_manager).has_active_leases(datetime.datetime.now()):
+            return "Hay nodos enviando mensajes de la cola compartida."
+        return None
+
+    def maintenance_running(self):
+        return self.maintenance_thread is not None and self.maintenance_thread.isRunning()
+
+    def run_maintenance(self):
+        blocker = self.maintenance_blocker()
+        if blocker:
+            QMessageBox.warning(self, "Mantenimiento", blocker)
+            return
+        self.start_maintenance(only_if_due=False)
+
+    def run_scheduled_maintenance(self):
+        # Solo sin envíos, importaciones ni nodos activos; el informe queda en la tabla mantenimientos
+        if datetime.datetime.now() < self.maintenance_not_before or self.maintenance_blocker():
+            return
+        try:
+            if not self.maintenance.is_due():
+                return
+        except Exception as e:
+            self.lbl_status.setText(f"Error en el mantenimiento de la base: {str(e)}")
+            return
+        self.start_maintenance(only_if_due=True)
+
+    def start_maintenance(self, only_if_due):
+        self.btn_maintenance.setEnabled(False)
+        self.lbl_status.setText("Mantenimiento de la base en curso...")
+        self.maintenance_thread = MaintenanceThread(self.maintenance, only_if_due=only_if_due)
+        self.maintenance_thread.finished_maintenance.connect(self.maintenance_finished)
+        self.maintenance_thread.start()
+
+    def maintenance_finished(self, report, error):
+        self.btn_maintenance.setEnabled(True)
+        manual = not self.maintenance_thread.only_if_due
+        if error:
+            self.lbl_status.setText(f"Error en el mantenimiento de la base: {error}")
+            if manual:
+                QMessageBox.critical(self, "Error", f"Error en el mantenimiento de la base: {error}")
+            return
+        if report is None:
+            self.lbl_status.setText("")
+            return
+        archived = sum(report['meses_archivados'].values())
+        self.lbl_status.setText(
+            f"Mantenimiento de la base: {archived} registros de historial archivados, "
+            f"{report['antes']['bytes'] / 1024 / 1024:.1f} MB -> {report['despues']['bytes'] / 1024 / 1024:.1f} MB"
+        )
+        if manual:
+            QMessageBox.information(self, "Mantenimiento", DatabaseMaintenance.format_report(report))
+
+    def plan_campaign(self, message_template):
+        planner = CampaignPlanner(self.db_manager)
+        return planner.plan(
+            message_template,
+            check_history=self.chk_avoid_resend.isChecked(),
+            test_mode=self.chk_test_mode.isChecked(),
+            order_keys=self.current_order_keys(),
+            **self.current_filters()
+        )
+
+    def preview_campaign(self):
+        message_template = self.txt_message.toPlainText()
+        if not message_template:
+            QMessageBox.warning(self, "Error", "Debe ingresar un mensaje")
+            return
+        try:
+            plan = self.plan_campaign(message_template)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error al planificar el envío: {str(e)}")
+            return
+
+        reply = QMessageBox.question(
+            self,
+            "Vista previa del envío",
+            plan.summary_text() + "\n\n¿Desea guardar un archivo con la vista previa de los mensajes?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Guardar vista previa", "vista_previa_envio.csv", "Archivos CSV (*.csv)"
+        )
+        if not file_path:
+            return
+        try:
+            plan.write_preview(file_path)
+            QMessageBox.information(self, "Vista previa", f"Vista previa guardada en {file_path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"No se pudo guardar la vista previa: {str(e)}")
+
     def start_sending(self):
         if self.df_filtered is None or len(self.df_filtered) == 0:
             QMessageBox.warning(
                 self, "Error", "No hay contactos seleccionados para enviar")
             return
+        if self.maintenance_running():
+            QMessageBox.warning(self, "Error", "Espere a que termine el mantenimiento de la base.")
+            return
 
         message_template = self.txt_message.toPlainText()
         if not message_template:
             QMessageBox.warning(self, "Error", "Debe ingresar un mensaje")
             return
 
+        try:
+            plan_summary = self.plan_campaign(message_template).summary_text() + "\n\n"
+        except Exception as e:
+            plan_summary = f"No se pudo planificar el envío: {str(e)}\n\n"
+
         # Add confirmation dialog here
         reply = QMessageBox.question(
             self,
             "Confirmar envío",
+            plan_summary +
             "¿Ha iniciado sesión en WhatsApp Web en Google Chrome y está listo para enviar los mensajes?",
             QMessageBox.Yes | QMessageBox.No,
             QMessageBox.No
@@ -284,14 +668,30 @@ class NostraWhatsApp(QMainWindow):
             )
             return # Stop the sending process if user is not ready
 
+        self.launch_sender(
+            # Solo al enviar se arma un DataFrame, y únicamente con las filas filtradas
+            order_recipients(self.df_filtered.to_frame(), self.current_order_keys()),
+            message_template,
+            test_mode=self.chk_test_mode.isChecked(),
+            check_history=self.chk_avoid_resend.isChecked(),
+            attachment=self.attachment_path,
+            template_id=self.current_template_id(message_template)
+        )
+
+    def launch_sender(self, df, message_template, test_mode, check_history, job_id=None, **sender_options):
+        self.current_job_id = job_id
+
         # Crear y mostrar ventana de progreso
         self.progress_dialog = SendProgressDialog(self)
         self.progress_dialog.stop_requested.connect(self.stop_sending)
+        self.progress_dialog.pause_requested.connect(self.pause_sending)
+        self.progress_dialog.resume_requested.connect(self.resume_sending)
         self.progress_dialog.show()
 
         # Configurar interfaz (deshabilitar controles principales)
         self.btn_send.setEnabled(False)
         self.btn_load_excel.setEnabled(False)
+        self.btn_load_folder.setEnabled(False)
         self.cmb_cities.setEnabled(False)
         self.cmb_communes.setEnabled(False)
         self.cmb_giros.setEnabled(False)
@@ -299,11 +699,12 @@ class NostraWhatsApp(QMainWindow):
 
         # Iniciar hilo de envío
         self.sender_thread = WhatsAppSenderThread(
-            self.df_filtered,
+            df,
             message_template,
             self.db_manager,
-            test_mode=self.chk_test_mode.isChecked(),
-            check_history=self.chk_avoid_resend.isChecked()
+            test_mode=test_mode,
+            check_history=check_history,
+            **sender_options
         )
 
         # Conectar señales
@@ -311,6 +712,7 @@ class NostraWhatsApp(QMainWindow):
         self.sender_thread.message_sent.connect(self.register_sent_message) # This slot is empty
         self.sender_thread.finished_sending.connect(self.sending_finished)
         self.sender_thread.log_message.connect(self.progress_dialog.add_log_entry)
+        self.sender_thread.metrics_update.connect(self.progress_dialog.update_metrics)
 
         self.sender_thread.start()
 
@@ -318,35 +720,181 @@ class NostraWhatsApp(QMainWindow):
         self.lbl_status.setText("Iniciando envío...")
 
 
+    def enqueue_for_workers(self):
+        message_template = self.txt_message.toPlainText()
+        if not message_template:
+            QMessageBox.warning(self, "Error", "Debe ingresar un mensaje")
+            return
+        try:
+            plan = self.plan_campaign(message_template)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error al planificar el envío: {str(e)}")
+            return
+        if plan.to_send == 0:
+            QMessageBox.warning(self, "Error", "No hay destinatarios para encolar")
+            return
+        text, ok = QInputDialog.getText(
+            self, "Encolar para nodos",
+            "Cuentas entre las que repartir los grupos, separadas por coma\n"
+            "(vacío: cualquier nodo toma cualquier mensaje):"
+        )
+        if not ok:
+            return
+        accounts = [account.strip() for account in text.split(',') if account.strip()]
+        assigned = None
+        detail = ""
+        if accounts:
+            sendable = plan.rows[plan.rows['estado'] == 'enviar']
+            _, assigned, shards = shard_recipients(sendable, self.current_order_keys(), accounts)
+            detail = "\n".join(
+                f"{account}: {shard['destinatarios']} mensajes en {shard['grupos']} grupos"
+                for account, shard in shards.items()
+            ) + "\n"
+        reply = QMessageBox.question(
+            self,
+            "Encolar para nodos",
+            plan.summary_text() + "\n\n" + detail + "\n¿Desea dejar estos mensajes en la cola compartida? "
+            "Los enviarán los nodos que ejecuten worker.py sobre esta base de datos.",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        try:
+            campaign_id = self.db_manager.create_campaign(
+                plan.to_send, self.chk_test_mode.isChecked(), self.current_template_id(message_template)
+            )
+            added = SqliteJobStore(self.db_manager).enqueue(
+                campaign_id, jobs_from_plan(plan, attachment=self.attachment_path, accounts=assigned)
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"No se pudo encolar el envío: {str(e)}")
+            return
+        QMessageBox.information(
+            self,
+            "Envío encolado",
+            f"Campaña #{campaign_id}: {added} mensajes en la cola compartida.\n\n"
+            f"Inicie en cada nodo:\npython worker.py --db \"{os.path.abspath(self.db_manager.db_file)}\" "
+            f"--cuenta {accounts[0] if accounts else '<nombre de la cuenta>'}"
+        )
+
+    def schedule_sending(self):
+        message_template = self.txt_message.toPlainText()
+        if not message_template:
+            QMessageBox.warning(self, "Error", "Debe ingresar un mensaje")
+            return
+        start_at = self.dt_schedule.dateTime().toPyDateTime().replace(second=0, microsecond=0)
+        try:
+            plan = self.plan_campaign(message_template)
+            job_id = self.scheduler.schedule(
+                start_at,
+                message_template,
+                dict(self.current_filters(), orden=list(self.current_order_keys())),
+                check_history=self.chk_avoid_resend.isChecked(),
+                respect_window=self.chk_business_hours.isChecked(),
+                attachment=self.attachment_path,
+                template_id=self.current_template_id(message_template)
+            )
+            windows = []
+            if self.chk_business_hours.isChecked() and plan.to_send:
+                windows = self.scheduler.plan(start_at, plan.to_send)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"No se pudo programar el envío: {str(e)}")
+            return
+        detail = f"Campaña #{job_id} programada para {start_at:%d-%m-%Y %H:%M} ({plan.to_send} mensajes)."
+        if windows:
+            detail += (f"\nSe enviará en {len(windows)} bloques de horario hábil, "
+                       f"terminando aprox. el {windows[-1]['fin']:%d-%m-%Y %H:%M}.")
+        QMessageBox.information(self, "Envío programado", detail)
+
+    def view_scheduled_campaigns(self):
+        self.scheduled_window = ScheduledCampaignsWindow(self)
+        self.scheduled_window.show()
+
+    def cancel_scheduled_job(self, job_id):
+        self.scheduler.cancel(job_id)
+        # Si es la campaña que se está enviando, se detiene sin que sending_finished cambie su estado
+        if job_id == self.current_job_id and self.sender_thread is not None and self.sender_thread.isRunning():
+            self.current_job_id = None
+            self.stop_sending()
+
+    def check_scheduled_jobs(self):
+        if self.sender_thread is not None and self.sender_thread.isRunning() or self.maintenance_running():
+            return
+        try:
+            jobs = self.scheduler.due_jobs()
+            if not jobs:
+                self.run_scheduled_maintenance()
+                return
+            job = jobs[0]
+            # Las campañas programadas antes de existir el orden de envío no traen 'orden'
+            order_keys = job['filtros'].pop('orden', ())
+            df = order_recipients(self.db_manager.get_filtered_clients(**job['filtros']), order_keys)
+            if len(df) == 0:
+                self.scheduler.mark_finished(job['id'], 'completada')
+                return
+            self.scheduler.mark_started(job['id'])
+            rate = job['mensajes_por_hora']
+            self.launch_sender(
+                df,
+                job['plantilla'],
+                test_mode=False,
+                # Una campaña reanudada siempre omite a quienes ya recibieron el mensaje
+                check_history=bool(job['evitar_reenvios']) or job['estado'] == 'en_curso',
+                job_id=job['id'],
+                send_window=self.scheduler.window if job['respetar_horario'] else None,
+                min_interval=3600 / rate if rate else 0,
+                attachment=job.get('adjunto'),
+                template_id=job.get('plantilla_id')
+            )
+        except Exception as e:
+            self.lbl_status.setText(f"Error al iniciar campaña programada: {str(e)}")
+
     def stop_sending(self):
         if self.sender_thread and self.sender_thread.isRunning():
             self.sender_thread.stop()
 
+    def pause_sending(self):
+        if self.sender_thread and self.sender_thread.isRunning():
+            self.sender_thread.pause()
+            self.lbl_status.setText("Envío en pausa")
+
+    def resume_sending(self):
+        if self.sender_thread and self.sender_thread.isRunning():
+            self.sender_thread.resume()
+            self.lbl_status.setText("Envío reanudado")
+
     def register_sent_message(self, razon_social, telefono, ciudad, success):
         # This slot is connected but currently does nothing.
         # The progress dialog handles logging and the DB manager records the history.
         pass
 
     def sending_finished(self):
+        self.progress_dialog.flush()
+        self.progress_dialog.sending_stopped()
+        self.progress_dialog.enable_metrics_export(self.sender_thread.metrics)
         try:
-            # Fetch history to show summary. Limit to a reasonable number for the summary.
-            # The full history is in the DB and viewable via the history window.
-            history_df = self.db_manager.get_message_history(limit=500) # Increased limit for summary
-            # Filter for the current sending session if possible, or just show overall stats
-            # For simplicity, showing overall stats from recent history
-            total_attempts = len(history_df) # This is not accurate for the current session only
-            successful_sends = len(history_df[history_df['resultado'] == 'Éxito']) # Also not accurate for current session only
-
-            # A more accurate summary would require tracking results within the thread
-            # and passing them back, or querying history specifically for the last session.
-            # For now, let's provide a general message and direct to history window.
+            # Resumen exacto de la sesión a partir de la fila de su campaña
+            campaign = self.db_manager.get_campaign(self.sender_thread.campaign_id)
+            if campaign is None:
+                raise ValueError("No se encontró la campaña del envío")
+            if self.current_job_id is not None:
+                self.scheduler.mark_finished(self.current_job_id, campaign['estado'], campaign['id'])
+                self.current_job_id = None
 
             QMessageBox.information(
                 self,
                 "Envío completado",
-                "El proceso de envío ha finalizado.\n"
-                "Por favor, revise el log en la ventana de progreso para detalles.\n"
-                "El historial completo se guarda automáticamente en la base de datos y puede verlo en la ventana 'Ver Historial de Envíos'.\"\n\n"
+                f"El proceso de envío ha finalizado ({campaign['estado']}).\n\n"
+                f"Total contactos: {campaign['total']}\n"
+                f"Enviados con éxito: {campaign['enviados']}\n"
+                f"Fallidos: {campaign['fallidos']}\n"
+                f"Omitidos (ya enviados): {campaign['duplicados']}\n"
+                f"Números inválidos: {campaign['invalidos']}\n"
+                f"En lista de exclusión: {campaign['suprimidos']}\n"
+                f"En cola de reintentos: {self.db_manager.count_pending_retries()}\n"
+                f"Tiempo total: {campaign['segundos']:.1f} s ({campaign['msgs_por_min']:.1f} msgs/min)\n\n"
+                "El historial completo se guarda automáticamente en la base de datos y puede verlo en la ventana 'Ver Historial de Envíos'.\n\n"
                 "c1zc developer Contact: camilo.zavala.c@gmail.com" # Added contact info here too
             )
 
@@ -362,6 +910,7 @@ class NostraWhatsApp(QMainWindow):
         # Re-enable controls
         self.btn_send.setEnabled(True)
         self.btn_load_excel.setEnabled(True)
+        self.btn_load_folder.setEnabled(True)
         self.cmb_cities.setEnabled(True)
         self.cmb_communes.setEnabled(True)
         self.cmb_giros.setEnabled(True)
@@ -396,14 +945,51 @@ class NostraWhatsApp(QMainWindow):
             self.cmb_communes.setEnabled(True)
         self.filter_data()
 
+    def load_template_names(self, select=None):
+        names = self.template_library.names()
+        current = select or self.cmb_templates.currentText() or DEFAULT_TEMPLATE_NAME
+        self.cmb_templates.blockSignals(True)
+        self.cmb_templates.clear()
+        self.cmb_templates.addItems(names)
+        if current in names:
+            self.cmb_templates.setCurrentIndex(names.index(current))
+        self.cmb_templates.blockSignals(False)
+        self.load_selected_template()
+
+    def load_selected_template(self):
+        name = self.cmb_templates.currentText()
+        if not name:
+            return
+        template = self.template_library.latest(name)
+        if template is not None:
+            self.txt_message.setText(template['contenido'])
+
+    def current_template_id(self, message_template):
+        # Registra el texto que se va a enviar como versión de la plantilla seleccionada
+        name = self.cmb_templates.currentText() or DEFAULT_TEMPLATE_NAME
+        return self.template_library.save(name, message_template)['id']
+
     def save_message_template(self):
-        template_file_path = "default_template.txt" # Changed path
         message_content = self.txt_message.toPlainText()
+        if not message_content:
+            QMessageBox.warning(self, "Error", "Debe ingresar un mensaje")
+            return
+        name, ok = QInputDialog.getText(
+            self, "Guardar plantilla", "Nombre de la plantilla:",
+            text=self.cmb_templates.currentText() or DEFAULT_TEMPLATE_NAME
+        )
+        if not ok or not name.strip():
+            return
         try:
-            # Ensure the directory exists (not strictly needed for current dir, but good practice)
-            # os.makedirs(os.path.dirname(template_file_path), exist_ok=True) # Not needed for current dir
-            with open(template_file_path, "w", encoding="utf-8") as f:
-                f.write(message_content)
-            QMessageBox.information(self, "Guardado Exitoso", "El mensaje ha sido guardado en default_template.txt")
+            result = self.template_library.save(name.strip(), message_content)
         except Exception as e:
             QMessageBox.critical(self, "Error al Guardar", f"No se pudo guardar el mensaje: {str(e)}")
+            return
+        self.load_template_names(select=result['nombre'])
+        if result['nueva']:
+            detail = f"Plantilla '{result['nombre']}' guardada como versión {result['version']}."
+        else:
+            detail = f"Sin cambios: es la versión {result['version']} de '{result['nombre']}'."
+        if result['desconocidas']:
+            detail += "\nVariables desconocidas: " + ", ".join(f"[{v}]" for v in result['desconocidas'])
+        QMessageBox.information(self, "Guardado Exitoso", detail)
@@ -1,13 +1,28 @@
-from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QTextEdit, 
-                           QProgressBar, QPushButton, QLabel)
-from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPlainTextEdit,
+                           QProgressBar, QPushButton, QLabel, QFileDialog, QMessageBox)
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from ..utils.constants import LOG_FLUSH_INTERVAL_MS, LOG_MAX_LINES
+
+# Etapas del envío mostradas en el resumen de métricas
+METRIC_STAGES = ('parse_phone', 'render', 'send', 'post_send_sleep', 'db_write', 'delay')
 
 class SendProgressDialog(QDialog):
     stop_requested = pyqtSignal()
+    pause_requested = pyqtSignal()
+    resume_requested = pyqtSignal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.metrics = None
+        # Señales acumuladas entre refrescos; se aplican en lote cada LOG_FLUSH_INTERVAL_MS
+        self.pending_log = []
+        self.pending_progress = None
+        self.pending_metrics = None
         self.init_ui()
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self.flush_timer.timeout.connect(self.flush)
+        self.flush_timer.start()
 
     def init_ui(self):
         self.setWindowTitle("Progreso de Envío")
@@ -24,29 +39,116 @@ class SendProgressDialog(QDialog):
         self.progress_bar = QProgressBar()
         layout.addWidget(self.progress_bar)
 
+        # Velocidad, tiempo restante y tiempos por etapa
+        self.lbl_metrics = QLabel("")
+        self.lbl_metrics.setTextFormat(Qt.PlainText)
+        layout.addWidget(self.lbl_metrics)
+
         # Log detallado
-        self.log_text = QTextEdit()
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
+        self.log_text.setMaximumBlockCount(LOG_MAX_LINES)
         layout.addWidget(self.log_text)
 
+        button_layout = QHBoxLayout()
+
         # Botón detener
         self.btn_stop = QPushButton("Detener Envío")
         self.btn_stop.clicked.connect(self.request_stop)
-        layout.addWidget(self.btn_stop)
+        button_layout.addWidget(self.btn_stop)
+
+        self.btn_pause = QPushButton("Pausar")
+        self.btn_pause.clicked.connect(self.toggle_pause)
+        button_layout.addWidget(self.btn_pause)
+
+        self.btn_export_metrics = QPushButton("Exportar Métricas")
+        self.btn_export_metrics.clicked.connect(self.export_metrics)
+        self.btn_export_metrics.setEnabled(False)
+        button_layout.addWidget(self.btn_export_metrics)
+
+        layout.addLayout(button_layout)
 
         self.setLayout(layout)
 
     def update_progress(self, current, total):
+        self.pending_progress = (current, total)
+
+    def update_metrics(self, snapshot):
+        self.pending_metrics = snapshot
+
+    def add_log_entry(self, text):
+        self.pending_log.append(text)
+
+    def flush(self):
+        if self.pending_log:
+            self.log_text.appendPlainText("\n".join(self.pending_log))
+            self.pending_log = []
+            # Auto-scroll al final, una vez por lote
+            self.log_text.verticalScrollBar().setValue(
+                self.log_text.verticalScrollBar().maximum()
+            )
+        if self.pending_progress is not None:
+            self.show_progress(*self.pending_progress)
+            self.pending_progress = None
+        if self.pending_metrics is not None:
+            self.show_metrics(self.pending_metrics)
+            self.pending_metrics = None
+
+    def show_progress(self, current, total):
         self.progress_bar.setMaximum(total)
         self.progress_bar.setValue(current)
         self.lbl_progress.setText(f"Progreso: {current}/{total}")
 
-    def add_log_entry(self, text):
-        self.log_text.append(text)
-        # Auto-scroll al final
-        self.log_text.verticalScrollBar().setValue(
-            self.log_text.verticalScrollBar().maximum()
+    def show_metrics(self, snapshot):
+        eta = snapshot.get('eta_segundos')
+        eta_text = f"{eta / 60:.1f} min" if eta is not None else "-"
+        lines = [f"Velocidad: {snapshot.get('msgs_por_min', 0):.1f} msgs/min    Tiempo restante: {eta_text}"]
+        stages = snapshot.get('stages', {})
+        parts = []
+        for stage in METRIC_STAGES:
+            summary = stages.get(stage)
+            if summary and summary['count']:
+                parts.append(f"{stage} p50 {summary['p50']:.2f}s / p95 {summary['p95']:.2f}s")
+        if parts:
+            lines.append("  |  ".join(parts))
+        self.lbl_metrics.setText("\n".join(lines))
+
+    def enable_metrics_export(self, metrics):
+        self.metrics = metrics
+        self.btn_export_metrics.setEnabled(metrics is not None and metrics.enabled)
+
+    def export_metrics(self):
+        if self.metrics is None:
+            return
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Exportar métricas", "metricas_envio.json",
+            "JSON (*.json);;Prometheus (*.prom)"
         )
+        if not file_path:
+            return
+        try:
+            if selected_filter.startswith("Prometheus") or file_path.endswith(".prom"):
+                content = self.metrics.to_prometheus()
+            else:
+                content = self.metrics.to_json()
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(content)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"No se pudieron exportar las métricas: {str(e)}")
+
+    def toggle_pause(self):
+        if self.btn_pause.text() == "Pausar":
+            self.btn_pause.setText("Reanudar")
+            self.pause_requested.emit()
+        else:
+            self.btn_pause.setText("Pausar")
+            self.resume_requested.emit()
 
     def request_stop(self):
-        self.stop_requested.emit()
\ No newline at end of file
+        self.btn_stop.setEnabled(False)
+        self.btn_pause.setEnabled(False)
+        self.stop_requested.emit()
+
+    def sending_stopped(self):
+        self.btn_stop.setEnabled(False)
+        self.btn_pause.setEnabled(False)
@@ -0,0 +1,79 @@
+import pandas as pd
+from PyQt5.QtWidgets import (
+    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTableView, QLabel, QPushButton, QHeaderView, QMessageBox
+)
+from ..models.pandas_model import PandasModel
+
+# Campañas programadas que todavía se pueden cancelar
+OPEN_SCHEDULED_STATES = ('pendiente', 'en_curso')
+SCHEDULED_COLUMNS = ['id', 'inicio_programado', 'estado', 'mensajes_por_hora', 'respetar_horario',
+                     'evitar_reenvios', 'filtros', 'campaign_id']
+
+
+class ScheduledCampaignsWindow(QMainWindow):
+    """Campañas programadas pendientes o en curso, con la opción de cancelarlas."""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.main_window = parent
+        self.scheduler = parent.scheduler
+        self.jobs = pd.DataFrame(columns=SCHEDULED_COLUMNS)
+        self.init_ui()
+        self.refresh()
+
+    def init_ui(self):
+        self.setWindowTitle("Campañas Programadas")
+        self.setGeometry(180, 180, 800, 350)
+        central_widget = QWidget()
+        layout = QVBoxLayout()
+        self.lbl_count = QLabel()
+        layout.addWidget(self.lbl_count)
+        self.table_jobs = QTableView()
+        self.table_jobs.setSelectionBehavior(QTableView.SelectRows)
+        self.table_jobs.setSelectionMode(QTableView.ExtendedSelection)
+        layout.addWidget(self.table_jobs)
+
+        button_layout = QHBoxLayout()
+        self.btn_cancel_jobs = QPushButton("Cancelar Seleccionadas")
+        self.btn_cancel_jobs.clicked.connect(self.cancel_selected)
+        button_layout.addWidget(self.btn_cancel_jobs)
+        btn_refresh = QPushButton("Actualizar")
+        btn_refresh.clicked.connect(self.refresh)
+        button_layout.addWidget(btn_refresh)
+        button_layout.addStretch()
+        btn_close = QPushButton("Cerrar")
+        btn_close.clicked.connect(self.close)
+        button_layout.addWidget(btn_close)
+        layout.addLayout(button_layout)
+
+        central_widget.setLayout(layout)
+        self.setCentralWidget(central_widget)
+
+    def refresh(self):
+        jobs = self.scheduler.db_manager.get_scheduled_campaigns(OPEN_SCHEDULED_STATES)
+        self.jobs = pd.DataFrame(jobs, columns=SCHEDULED_COLUMNS)
+        self.table_jobs.setModel(PandasModel(self.jobs))
+        header = self.table_jobs.horizontalHeader()
+        for i in range(len(self.jobs.columns)):
+            header.setSectionResizeMode(i, QHeaderView.Stretch)
+        self.lbl_count.setText(f"{len(self.jobs)} campañas pendientes o en curso:")
+        self.btn_cancel_jobs.setEnabled(len(self.jobs) > 0)
+
+    def cancel_selected(self):
+        rows = [index.row() for index in self.table_jobs.selectionModel().selectedRows()]
+        if not rows:
+            QMessageBox.information(self, "Información", "Seleccione las campañas que desea cancelar.")
+            return
+        job_ids = [int(job_id) for job_id in self.jobs['id'].to_numpy()[rows]]
+        reply = QMessageBox.question(
+            self,
+            "Cancelar campañas",
+            f"¿Cancelar {len(job_ids)} campañas programadas? Una campaña en curso se detiene.",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        for job_id in job_ids:
+            self.main_window.cancel_scheduled_job(job_id)
+        self.refresh()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Las pruebas importan el código como la aplicación: `from src...` desde la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from benchmarks.fake_transport import FakeTransport
+from benchmarks.synthetic_data import generate_clients
+from src.controllers.recipient_sharding import order_recipients
+from src.controllers.whatsapp_sender import WhatsAppSenderThread
+from src.models.database import DatabaseManager, filter_key
+
+
+class PausingTransport(FakeTransport):
+    """Pide una pausa después del primer envío."""
+
+    def __init__(self):
+        super().__init__()
+        self.sender = None
+
+    def send(self, phone, message, media_path=None):
+        super().send(phone, message, media_path)
+        if self.sent == 1:
+            self.sender.pause()
+
+
+def campaign_row(db, campaign_id):
+    conn = db.get_connection()
+    row = conn.execute("SELECT estado, fecha_fin FROM campaigns WHERE id = ?", (campaign_id,)).fetchone()
+    conn.close()
+    return row
+
+
+def wait_for_state(db, sender, estado, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if sender.campaign_id is not None and campaign_row(db, sender.campaign_id)[0] == estado:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"La campaña no llegó al estado {estado}")
+
+
+def test_pause_and_resume_do_not_set_end_date(tmp_path):
+    db = DatabaseManager(str(tmp_path / "test.db"))
+    db.replace_clients(generate_clients(10))
+    transport = PausingTransport()
+    sender = WhatsAppSenderThread(db.get_filtered_clients(), "Hola [Razón social]", db, transport=transport,
+                                  post_send_wait=0, delay_range=(0, 0))
+    transport.sender = sender
+    thread = threading.Thread(target=sender.run)
+    thread.start()
+
+    wait_for_state(db, sender, 'pausada')
+    assert campaign_row(db, sender.campaign_id)[1] is None
+    sender.resume()
+    thread.join(timeout=10)
+
+    estado, fecha_fin = campaign_row(db, sender.campaign_id)
+    assert estado == 'completada'
+    assert fecha_fin is not None
+
+
+def test_recipient_groups_use_the_filter_key():
+    df = generate_clients(200)
+    df.loc[::3, 'Ciudad'] = df.loc[::3, 'Ciudad'].str.upper()
+    ordered = order_recipients(df, ['Ciudad'])
+
+    keys = ordered['Ciudad'].map(filter_key)
+    assert keys.is_monotonic_increasing
+    # Dentro de cada ciudad se conserva el orden original
+    assert all(group.index.is_monotonic_increasing for _, group in ordered.groupby(keys))
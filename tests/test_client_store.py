@@ -0,0 +1,48 @@
+import pandas as pd
+
+from benchmarks.synthetic_data import generate_clients
+from src.controllers.campaign_planner import CampaignPlanner
+from src.models.client_store import ClientStore
+from src.models.database import DatabaseManager
+from src.utils.template_renderer import row_hashes, template_key
+
+TEMPLATE = "Hola [Nombre contacto], su número registrado es [Teléfono]"
+
+
+def loaded_db(tmp_path, clients):
+    db = DatabaseManager(str(tmp_path / "test.db"))
+    db.replace_clients(clients)
+    return db
+
+
+def test_store_and_planner_render_the_same_phone(tmp_path):
+    clients = generate_clients(200)
+    clients.loc[:4, 'Teléfono'] = ['912345678.0', '9 8765 4321', '12345', '', 'sin número']
+    db = loaded_db(tmp_path, clients)
+    store = ClientStore.from_db(db)
+
+    frame = store.all().to_frame()
+    plan_rows = db.get_send_plan()
+    assert frame['Teléfono'].tolist() == plan_rows['Teléfono'].tolist()
+    assert frame['Teléfono'].tolist() == db.get_filtered_clients()['Teléfono'].tolist()
+
+    # Los mensajes que planifica la vista previa son los que el envío encuentra en la caché
+    _, fields = template_key(TEMPLATE, frame.columns)
+    assert row_hashes(frame, fields).tolist() == row_hashes(plan_rows, fields).tolist()
+    plan = CampaignPlanner(db).plan(TEMPLATE)
+    assert plan.messages.iloc[0] == f"Hola {frame['Nombre contacto'].iloc[0]}, su número registrado es +56912345678"
+
+
+def test_store_and_sql_filters_agree_on_accented_values(tmp_path):
+    clients = generate_clients(50)
+    clients.loc[:2, 'Ciudad'] = ['CONCEPCIÓN', 'Concepción', 'concepción']
+    clients.loc[3:, 'Ciudad'] = 'Temuco'
+    db = loaded_db(tmp_path, clients)
+    store = ClientStore.from_db(db)
+
+    view = store.filter(city='Concepción')
+    assert len(view) == 3
+    assert store.ids[view.positions].tolist() == db.get_filtered_client_ids(city='Concepción').tolist()
+    assert len(db.get_filtered_clients(city='Concepción')) == 3
+    assert len(db.get_send_plan(city='Concepción')) == 3
+    assert store.unique_values('Ciudad') == db.get_unique_values('ciudad')
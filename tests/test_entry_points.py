@@ -0,0 +1,74 @@
+import json
+import os
+import sqlite3
+
+import main
+import nostrawhatsapp
+from benchmarks.fake_transport import FakeTransport
+from src.controllers.campaign_planner import CampaignPlanner
+from src.controllers.whatsapp_sender import WhatsAppSenderThread
+from src.models.database import DatabaseManager
+from src.models.pandas_model import PandasModel
+from src.views.main_window import NostraWhatsApp
+
+# Salida del nostrawhatsapp.py original (antes de separarlo en src/) con legacy_clientes.xlsx:
+# la planilla se importó, se envió a la ciudad 'Santiago' y luego a todas, ambas veces revisando el
+# historial, con pywhatkit reemplazado por un registro de llamadas. La planilla no trae teléfonos inválidos:
+# el original los guardaba como clientes, y ahora la importación los rechaza (ver test_import).
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+with open(os.path.join(FIXTURES, 'legacy_golden.json'), encoding='utf-8') as f:
+    GOLDEN = json.load(f)
+
+
+def test_legacy_entry_point_reexports_shared_code():
+    assert nostrawhatsapp.main is main.main
+    assert nostrawhatsapp.PandasModel is PandasModel
+    assert nostrawhatsapp.DatabaseManager is DatabaseManager
+    assert nostrawhatsapp.WhatsAppSenderThread is WhatsAppSenderThread
+    assert nostrawhatsapp.NostraWhatsApp is NostraWhatsApp
+
+
+class RecordingTransport(FakeTransport):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def send(self, phone, message, media_path=None):
+        super().send(phone, message, media_path)
+        self.calls.append([phone, message])
+
+
+def dump(db, query):
+    conn = sqlite3.connect(db.db_file)
+    rows = [list(row) for row in conn.execute(query).fetchall()]
+    conn.close()
+    return rows
+
+
+def test_pipeline_reproduces_legacy_import_plan_and_history(tmp_path):
+    db = DatabaseManager(str(tmp_path / "clientes.db"))
+    success, _ = db.import_excel_to_db(os.path.join(FIXTURES, 'legacy_clientes.xlsx'))
+    assert success
+    assert dump(db, """
+        SELECT razon_social, rut, giro, direccion, comuna, ciudad, nombre_contacto, telefono
+        FROM clientes ORDER BY id
+    """) == GOLDEN['clientes']
+
+    template = GOLDEN['plantilla']
+    for campaign in GOLDEN['campañas']:
+        plan = CampaignPlanner(db).plan(template, city=campaign['ciudad'], check_history=True)
+        to_send = plan.rows[plan.rows['estado'] == 'enviar']
+        planned = [[phone, plan.messages[index]] for index, phone in to_send['telefono_e164'].items()]
+        assert planned == campaign['envios']
+
+        transport = RecordingTransport()
+        sender = WhatsAppSenderThread(
+            db.get_filtered_clients(city=campaign['ciudad']), template, db, check_history=True,
+            transport=transport, post_send_wait=0, delay_range=(0, 0),
+        )
+        sender.run()
+        assert transport.calls == campaign['envios']
+
+    assert dump(db, """
+        SELECT razon_social, telefono, ciudad, resultado FROM historial_envios ORDER BY id
+    """) == GOLDEN['historial']
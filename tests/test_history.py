@@ -0,0 +1,32 @@
+from src.models.database import DatabaseManager
+from src.models.maintenance import archive_file_for
+
+
+def add_history(db, telefono, fecha_hora, resultado="Éxito"):
+    conn = db.get_connection()
+    cursor = conn.execute(
+        "INSERT INTO historial_envios (fecha_hora, razon_social, telefono, ciudad, resultado) VALUES (?, ?, ?, ?, ?)",
+        (fecha_hora, "Cliente", telefono, "Santiago", resultado)
+    )
+    conn.commit()
+    conn.close()
+    return cursor.lastrowid
+
+
+def test_deleting_history_keeps_archived_and_newer_successes(tmp_path):
+    db = DatabaseManager(str(tmp_path / "test.db"))
+    add_history(db, "+56911111111", "2024-01-10 10:00:00")
+    newest = add_history(db, "+56911111111", "2025-06-01 10:00:00")
+    older = add_history(db, "+56922222222", "2025-05-01 10:00:00")
+    add_history(db, "+56922222222", "2025-06-01 10:00:00")
+    only = add_history(db, "+56933333333", "2025-06-01 10:00:00")
+    db.archive_history("2025-01-01", archive_file_for(db.db_file))
+
+    db.delete_history_records([newest, older, only])
+
+    # El primero conserva su éxito archivado; el segundo, su éxito más reciente; el tercero ya no tiene
+    assert db.get_sent_phones() == {"+56911111111", "+56922222222"}
+    conn = db.get_connection()
+    summary = dict(conn.execute("SELECT telefono, fecha FROM ultimo_envio_exitoso").fetchall())
+    conn.close()
+    assert summary == {"+56911111111": "2024-01-10 10:00:00", "+56922222222": "2025-06-01 10:00:00"}
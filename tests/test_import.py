@@ -0,0 +1,112 @@
+import pandas as pd
+import pytest
+
+from src.controllers.excel_importer import ExcelImportThread
+from src.models.database import DatabaseManager
+from src.utils.constants import REQUIRED_COLUMNS
+
+# Mismo RUT (con y sin puntos) y razones sociales distintas: la deduplicación difusa no las fusiona
+ROWS = [
+    ['Ferretería Sur SpA', '76.086.428-5', 'Ferretería', 'Calle 1', 'Santiago', 'Santiago', 'Ana', '912345678'],
+    ['Transportes Norte Ltda.', '76086428-5', 'Transporte', 'Calle 2', 'Maipú', 'Santiago', 'Luis', '987654321'],
+    ['Bodegas Centro S.A.', '11.111.111-1', 'Bodegaje', 'Calle 3', 'Ñuñoa', 'Santiago', 'Eva', '955555555'],
+]
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "clientes.csv"
+    pd.DataFrame(ROWS, columns=REQUIRED_COLUMNS).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("deduplicate, fuzzy_names", [(False, False), (True, True)])
+def test_repeated_rut_is_rejected_explicitly(tmp_path, source, deduplicate, fuzzy_names):
+    db = DatabaseManager(str(tmp_path / "test.db"))
+    thread = ExcelImportThread([source], db, deduplicate=deduplicate, fuzzy_names=fuzzy_names, max_workers=1,
+                               rejects_dir=str(tmp_path / "logs"))
+    success, message = thread.import_sources()
+
+    assert success
+    assert thread.imported == 2
+    assert "1 filas rechazadas por repetir el RUT" in message
+    assert "fusionadas" not in message
+    rejected = pd.read_csv(thread.rejects_file, dtype=str)
+    assert rejected[['Fila', 'RUT', 'Motivo']].values.tolist() == [['3', '76086428-5', 'RUT repetido']]
+
+
+def test_repeated_rut_in_synchronous_import(tmp_path, source):
+    db = DatabaseManager(str(tmp_path / "test.db"))
+    success, message = db.import_sources_to_db([source], deduplicate=False, max_workers=1)
+
+    assert success
+    assert "1 filas omitidas por repetir el RUT" in message
+    assert db.last_import_rut_conflicts['Razón social'].tolist() == ['Transportes Norte Ltda.']
+    assert db.get_client_by_rut('76086428-5')['razon_social'] == 'Ferretería Sur SpA'
+
+
+def test_import_without_valid_rows_keeps_clients(tmp_path, source):
+    db = DatabaseManager(str(tmp_path / "test.db"))
+    db.import_sources_to_db([source], max_workers=1)
+    invalid = tmp_path / "sin_telefonos.csv"
+    pd.DataFrame([row[:-1] + [''] for row in ROWS], columns=REQUIRED_COLUMNS).to_csv(invalid, index=False)
+
+    thread = ExcelImportThread([str(invalid)], db, max_workers=1, rejects_dir=str(tmp_path / "logs"))
+    success, message = thread.import_sources()
+
+    assert not success
+    assert "No se modificaron los clientes" in message
+    assert "3 filas rechazadas" in message
+    assert len(db.get_all_clients()) == 2
+
+
+def test_parallel_import_keeps_file_order(tmp_path):
+    # El mismo teléfono en varios archivos: la fila canónica es la del primer archivo, como en read_sources
+    paths = []
+    for number in range(4):
+        path = tmp_path / f"clientes_{number}.csv"
+        row = [f'Empresa {number}', '', 'Giro', 'Calle', 'Santiago', 'Santiago', f'Contacto {number}', '912345678']
+        pd.DataFrame([row], columns=REQUIRED_COLUMNS).to_csv(path, index=False)
+        paths.append(str(path))
+    db = DatabaseManager(str(tmp_path / "test.db"))
+    thread = ExcelImportThread(paths, db, max_workers=4, rejects_dir=str(tmp_path / "logs"))
+    success, _ = thread.import_sources()
+
+    assert success
+    assert db.get_all_clients()['Razón social'].tolist() == ['Empresa 0']
+
+
+def test_merge_report_names_source_and_row(tmp_path):
+    # La fila repetida es la segunda de datos del segundo archivo: fila 3 de esa planilla
+    first, second = tmp_path / "norte.csv", tmp_path / "sur.csv"
+    pd.DataFrame(ROWS[:1], columns=REQUIRED_COLUMNS).to_csv(first, index=False)
+    pd.DataFrame([ROWS[2], ROWS[0]], columns=REQUIRED_COLUMNS).to_csv(second, index=False)
+    db = DatabaseManager(str(tmp_path / "test.db"))
+    success, _ = db.import_sources_to_db([str(first), str(second)], max_workers=1)
+
+    assert success
+    assert db.last_import_merges['filas'].tolist() == ['norte.csv:2, sur.csv:3']
+
+
+def test_gui_and_synchronous_import_store_the_same_clients(tmp_path):
+    rows = ROWS[:1] + [
+        ['Sin Fono SpA', '', 'Giro', 'Calle 4', 'Santiago', 'Santiago', 'Rosa', ''],
+        ['Fono Corto Ltda.', '', 'Giro', 'Calle 5', 'Santiago', 'Santiago', 'Raúl', '12345'],
+        [''] * len(REQUIRED_COLUMNS),
+    ]
+    path = tmp_path / "clientes.csv"
+    pd.DataFrame(rows, columns=REQUIRED_COLUMNS).to_csv(path, index=False)
+
+    gui_db = DatabaseManager(str(tmp_path / "gui.db"))
+    thread = ExcelImportThread([str(path)], gui_db, max_workers=1, rejects_dir=str(tmp_path / "logs"))
+    assert thread.import_sources()[0]
+    db = DatabaseManager(str(tmp_path / "sync.db"))
+    success, message = db.import_sources_to_db([str(path)], max_workers=1)
+
+    assert success
+    assert "3 filas rechazadas" in message
+    pd.testing.assert_frame_equal(db.get_all_clients(), gui_db.get_all_clients())
+    assert db.get_all_clients()['Razón social'].tolist() == ['Ferretería Sur SpA']
+    assert db.last_import_rejected[['Fila', 'Motivo']].values.tolist() == [
+        [3, 'Sin teléfono'], [4, 'Teléfono inválido'], [5, 'Fila vacía']
+    ]
@@ -0,0 +1,30 @@
+import datetime
+
+from src.controllers.job_store import SqliteJobStore
+from src.models.database import DatabaseManager
+from src.models.maintenance import DatabaseMaintenance
+
+NOW = datetime.datetime(2025, 1, 6, 10)
+JOB = {'razon_social': 'Cliente', 'telefono': '+56912345678', 'ciudad': 'Santiago', 'mensaje': 'Hola',
+       'adjunto': None, 'cuenta': None}
+
+
+def test_active_leases_follow_the_lease_deadline(tmp_path):
+    store = SqliteJobStore(DatabaseManager(str(tmp_path / "test.db")))
+    store.enqueue(1, [JOB])
+    assert not store.has_active_leases(NOW)
+
+    store.claim("nodo1", None, 0, 60, NOW)
+    assert store.has_active_leases(NOW)
+    assert not store.has_active_leases(NOW + datetime.timedelta(seconds=61))
+
+
+def test_maintenance_is_due_again_after_the_interval(tmp_path):
+    db = DatabaseManager(str(tmp_path / "test.db"))
+    maintenance = DatabaseMaintenance(db, interval_days=7)
+    assert maintenance.is_due()
+
+    maintenance.run()
+    assert not maintenance.is_due()
+    assert maintenance.is_due(datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+                              + datetime.timedelta(days=7, minutes=1))
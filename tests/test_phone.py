@@ -0,0 +1,18 @@
+import pytest
+
+from src.utils.phone import normalize_phone, normalize_phones
+
+
+@pytest.mark.parametrize("raw", [
+    "912345678", "912345678.0 ", " 912345678.0", "56912345678.0", "+56 9 1234 5678", "9 1234 5678",
+    "912345678.01", "12345", "", "  ",
+])
+def test_planner_and_sender_agree(raw):
+    # El planificador usa la versión vectorizada y el hilo de envío la escalar
+    formatted, valid = normalize_phone(raw)
+    assert normalize_phones([raw]).iloc[0] == (formatted if valid else "")
+
+
+def test_excel_float_with_trailing_space():
+    assert normalize_phone("912345678.0 ") == ("+56912345678", True)
+    assert normalize_phones(["912345678.0 "]).iloc[0] == "+56912345678"
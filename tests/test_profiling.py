@@ -0,0 +1,48 @@
+import json
+import threading
+import zipfile
+
+from src.utils.profiling import Profiler, SPANS_FILE
+
+
+def spans_in(bundle):
+    with zipfile.ZipFile(bundle) as archive:
+        return [json.loads(line) for line in archive.read(SPANS_FILE).decode('utf-8').splitlines()]
+
+
+def test_stop_waits_for_spans_running_in_other_threads(tmp_path):
+    profiler = Profiler()
+    profiler.start(str(tmp_path))
+    started, release = threading.Event(), threading.Event()
+
+    def background():
+        with profiler.span("envio"):
+            started.set()
+            release.wait()
+
+    thread = threading.Thread(target=background)
+    thread.start()
+    started.wait()
+    with profiler.span("filter_data"):
+        pass
+    threading.Timer(0.2, release.set).start()
+    bundle = profiler.stop(wait_seconds=5)
+    thread.join()
+
+    spans = {span['nombre']: span for span in spans_in(bundle)}
+    assert set(spans) == {"envio", "filter_data"}
+    assert spans["envio"]['memoria_pico_compartida'] and spans["filter_data"]['memoria_pico_compartida']
+
+
+def test_sequential_spans_have_their_own_peak(tmp_path):
+    profiler = Profiler()
+    profiler.start(str(tmp_path))
+    with profiler.span("grande"):
+        data = bytearray(20 * 1024 * 1024)
+        del data
+    with profiler.span("chico"):
+        pass
+    spans = {span['nombre']: span for span in spans_in(profiler.stop())}
+
+    assert not spans["chico"]['memoria_pico_compartida']
+    assert spans["chico"]['memoria_pico_bytes'] < spans["grande"]['memoria_pico_bytes'] / 2
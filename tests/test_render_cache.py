@@ -0,0 +1,33 @@
+import pandas as pd
+
+from src.controllers.render_cache import RenderCache
+from src.models.database import DatabaseManager
+from src.utils.constants import RENDER_CACHE_MAX_TEMPLATES, REQUIRED_COLUMNS
+
+CLIENTS = pd.DataFrame(
+    [['Ferretería Sur SpA', '76.086.428-5', 'Ferretería', 'Calle 1', 'Santiago', 'Santiago', 'Ana', '912345678']],
+    columns=REQUIRED_COLUMNS,
+)
+
+
+def cached_templates(db):
+    conn = db.get_connection()
+    rows = conn.execute("SELECT DISTINCT mensaje FROM mensajes_renderizados").fetchall()
+    conn.close()
+    return {row[0] for row in rows}
+
+
+def test_reading_a_template_keeps_it_in_the_cache(tmp_path):
+    db = DatabaseManager(str(tmp_path / "test.db"))
+    cache = RenderCache(db)
+    cache.messages_for("Hola [Razón social] 0", CLIENTS)
+    for number in range(1, RENDER_CACHE_MAX_TEMPLATES):
+        cache.messages_for(f"Hola [Razón social] {number}", CLIENTS)
+    # La plantilla más antigua se vuelve a leer: la que se descarta es la 1
+    cache.messages_for("Hola [Razón social] 0", CLIENTS)
+    cache.messages_for("Hola [Razón social] nueva", CLIENTS)
+
+    cached = cached_templates(db)
+    assert "Hola Ferretería Sur SpA 0" in cached
+    assert "Hola Ferretería Sur SpA 1" not in cached
+    assert len(cached) == RENDER_CACHE_MAX_TEMPLATES
@@ -0,0 +1,36 @@
+import datetime
+
+import pytest
+
+from src.controllers.retry_policy import RetryPolicy
+from src.models.database import DatabaseManager
+
+DUE = datetime.datetime(2025, 1, 6, 9)
+
+
+def add_retry(db, campaign_id, telefono):
+    return db.add_retry(campaign_id, "Cliente", telefono, "Santiago", "Hola", 1, DUE, "TimeoutError: sin respuesta")
+
+
+def test_real_campaign_does_not_adopt_test_mode_retries(tmp_path):
+    db = DatabaseManager(str(tmp_path / "test.db"))
+    test_campaign = db.create_campaign(1, test_mode=True)
+    real_campaign = db.create_campaign(10)
+    add_retry(db, test_campaign, "+56911111111")
+    add_retry(db, real_campaign, "+56922222222")
+    add_retry(db, None, "+56933333333")
+
+    assert db.count_pending_retries() == 2
+    next_campaign = db.create_campaign(5)
+    adopted = db.adopt_retries(next_campaign)
+
+    assert sorted(row['telefono'] for row in adopted) == ["+56922222222", "+56933333333"]
+    assert all(row['campaign_id'] == next_campaign for row in adopted)
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (ConnectionResetError("reset"), True), (TimeoutError("sin respuesta"), True),
+    (FileNotFoundError("adjunto.png"), False), (PermissionError("sin acceso"), False), (OSError("otro"), False),
+])
+def test_only_transient_errors_are_retried(error, retryable):
+    assert RetryPolicy().is_retryable(error) is retryable
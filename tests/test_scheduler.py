@@ -0,0 +1,81 @@
+import datetime
+
+import pytest
+
+from benchmarks.fake_transport import FakeTransport
+from benchmarks.synthetic_data import generate_clients
+from src.controllers.scheduler import SendingWindow, SimulatedClock, plan_windows
+from src.controllers.whatsapp_sender import WhatsAppSenderThread
+from src.models.database import DatabaseManager
+from src.utils.phone import normalize_phones
+
+# Lunes 6 de enero de 2025; horario de 9 a 18, lunes a viernes
+MONDAY = datetime.datetime(2025, 1, 6)
+WINDOW = SendingWindow(9, 18, range(5))
+
+
+class ClockedTransport(FakeTransport):
+    """Registra el instante simulado de cada envío."""
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+        self.sent_at = []
+
+    def send(self, phone, message, media_path=None):
+        super().send(phone, message, media_path)
+        self.sent_at.append(self.clock.now())
+
+
+@pytest.mark.parametrize("moment, expected", [
+    (MONDAY.replace(hour=8, minute=59, second=59), False),
+    (MONDAY.replace(hour=9), True),
+    (MONDAY.replace(hour=17, minute=59, second=59), True),
+    (MONDAY.replace(hour=18), False),
+    (MONDAY + datetime.timedelta(days=5, hours=10), False),  # sábado
+])
+def test_window_boundaries(moment, expected):
+    assert WINDOW.is_open(moment) is expected
+
+
+def test_next_open_skips_night_and_weekend():
+    friday_evening = MONDAY + datetime.timedelta(days=4, hours=18)
+    assert WINDOW.next_open(friday_evening) == MONDAY + datetime.timedelta(days=7, hours=9)
+    assert WINDOW.next_open(MONDAY.replace(hour=7)) == MONDAY.replace(hour=9)
+    assert WINDOW.next_open(MONDAY.replace(hour=12)) == MONDAY.replace(hour=12)
+
+
+def test_plan_windows_spreads_over_days():
+    slots = plan_windows(20, MONDAY.replace(hour=16), 2, WINDOW)
+    assert [slot['mensajes'] for slot in slots] == [4, 16]
+    assert slots[0]['fin'] == MONDAY.replace(hour=18)
+    assert slots[1]['inicio'] == MONDAY.replace(day=7, hour=9)
+    assert sum(slot['mensajes'] for slot in slots) == 20
+
+
+def test_plan_windows_with_zero_capacity_terminates():
+    # Bloque de una hora y un mensaje cada dos horas: un mensaje por día hábil
+    slots = plan_windows(6, MONDAY, 0.5, SendingWindow(9, 10, range(5)))
+    assert [slot['mensajes'] for slot in slots] == [1] * 6
+    assert slots[-1]['inicio'] == MONDAY + datetime.timedelta(days=7, hours=9)
+    assert all(slot['fin'] <= slot['inicio'].replace(hour=10) for slot in slots)
+
+
+def test_sender_only_sends_inside_window(tmp_path):
+    db = DatabaseManager(str(tmp_path / "test.db"))
+    db.replace_clients(generate_clients(30))
+    df = db.get_filtered_clients()
+    # Viernes 17:00: una hora de envío y el resto el lunes siguiente
+    clock = SimulatedClock(MONDAY + datetime.timedelta(days=4, hours=17))
+    transport = ClockedTransport(clock)
+    sender = WhatsAppSenderThread(
+        df, "Hola [Razón social]", db, transport=transport, post_send_wait=0, delay_range=(300, 300),
+        send_window=WINDOW, clock=clock,
+    )
+    sender.run()
+
+    # Los teléfonos inválidos de los datos sintéticos no se intentan
+    assert transport.sent == (normalize_phones(df['Teléfono']) != '').sum()
+    assert all(WINDOW.is_open(moment) for moment in transport.sent_at)
+    assert any(moment.weekday() == 4 for moment in transport.sent_at)
+    assert any(moment.weekday() == 0 for moment in transport.sent_at)
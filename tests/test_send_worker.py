@@ -0,0 +1,70 @@
+import collections
+import datetime
+import sqlite3
+import threading
+
+from benchmarks.fake_transport import FakeTransport
+from src.controllers.job_store import SqliteJobStore
+from src.controllers.scheduler import SimulatedClock
+from src.controllers.send_worker import SendWorker
+from src.models.database import DatabaseManager
+
+NOW = datetime.datetime(2025, 1, 6, 10)
+
+
+class RecordingTransport(FakeTransport):
+    def __init__(self, phones):
+        super().__init__()
+        self.phones = phones
+
+    def send(self, phone, message, media_path=None):
+        super().send(phone, message, media_path)
+        self.phones.append(phone)
+
+
+def enqueue(db, count):
+    campaign_id = db.create_campaign(count)
+    jobs = [{'razon_social': f'Cliente {i}', 'telefono': f'+5691000{i:04d}', 'ciudad': 'Santiago',
+             'mensaje': 'Hola', 'adjunto': None, 'cuenta': None} for i in range(count)]
+    SqliteJobStore(db).enqueue(campaign_id, jobs)
+    return jobs
+
+
+def make_worker(db_file, node, phones, **kwargs):
+    return SendWorker(SqliteJobStore(DatabaseManager(db_file)), 'ventas1', node=node,
+                      transport=RecordingTransport(phones), post_send_wait=0, log=lambda text: None, **kwargs)
+
+
+def test_rate_limit_wait_does_not_outlive_the_lease(tmp_path):
+    # Cada envío espera 100 s al turno de la cuenta, más que la reserva: ningún trabajo se pierde
+    db_file = str(tmp_path / "compartida.db")
+    jobs = enqueue(DatabaseManager(db_file), 5)
+    phones = []
+    worker = make_worker(db_file, 'nodo1', phones, clock=SimulatedClock(NOW), min_interval=100, lease_seconds=60)
+
+    counts = worker.run(exit_when_idle=True)
+
+    assert counts['enviados'] == 5
+    assert counts['perdidos'] == 0
+    assert phones == [job['telefono'] for job in jobs]
+
+
+def test_two_nodes_on_a_shared_database_never_send_twice(tmp_path):
+    db_file = str(tmp_path / "compartida.db")
+    jobs = enqueue(DatabaseManager(db_file), 40)
+    phones = []
+    workers = [make_worker(db_file, f'nodo{i}', phones, min_interval=0.005) for i in (1, 2)]
+    threads = [threading.Thread(target=worker.run, kwargs={'exit_when_idle': True}) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=60)
+
+    assert sorted(phones) == sorted(job['telefono'] for job in jobs)
+    assert sum(worker.counts['enviados'] for worker in workers) == len(jobs)
+    conn = sqlite3.connect(db_file)
+    history = collections.Counter(row[0] for row in conn.execute("SELECT telefono FROM historial_envios"))
+    states = conn.execute("SELECT estado, COUNT(*) FROM trabajos_envio GROUP BY estado").fetchall()
+    conn.close()
+    assert set(history.values()) == {1} and len(history) == len(jobs)
+    assert states == [('enviado', len(jobs))]
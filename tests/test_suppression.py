@@ -0,0 +1,19 @@
+import pytest
+
+from src.controllers.suppression import is_opt_out
+
+
+@pytest.mark.parametrize("reply", [
+    "BAJA", "Baja!", "BAJA por favor", "stop.", "Stop, gracias", "Salir de la lista", "Por favor no me escriban más",
+    "quiero que me den de baja por favor",
+])
+def test_opt_out_replies(reply):
+    assert is_opt_out(reply)
+
+
+@pytest.mark.parametrize("reply", [
+    "Hola, ¿cuál es el precio?", "Me interesa, pero la próxima semana", "Bajada de precios?", "", "nan",
+    "Cancelar pedido 123", "Alto interés, llámenme", "Baja el precio?", "Salir a las 5, ¿me llaman después?",
+])
+def test_other_replies(reply):
+    assert not is_opt_out(reply)
@@ -0,0 +1,35 @@
+"""Nodo trabajador sin interfaz gráfica.
+
+Envía los trabajos que la aplicación dejó en la cola compartida ("Encolar para Nodos"). Cada máquina
+usa su propia sesión de WhatsApp Web y todas apuntan a la misma base:
+
+    python worker.py --db /ruta/compartida/nostra_whatsapp.db --cuenta ventas1
+"""
+import argparse
+import signal
+from src.models.database import DatabaseManager
+from src.controllers.job_store import SqliteJobStore
+from src.controllers.send_worker import SendWorker
+from src.utils.constants import DEFAULT_DB_FILE, WORKER_ACCOUNT_MIN_INTERVAL
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nodo de envío de NostraWhatsApp")
+    parser.add_argument("--db", default=DEFAULT_DB_FILE, help="Base SQLite compartida")
+    parser.add_argument("--cuenta", required=True, help="Cuenta de WhatsApp con sesión abierta en este nodo")
+    parser.add_argument("--nodo", default=None, help="Nombre del nodo (por defecto equipo-pid)")
+    parser.add_argument("--intervalo", type=float, default=WORKER_ACCOUNT_MIN_INTERVAL,
+                        help="Segundos mínimos entre envíos de la cuenta, sumando todos los nodos")
+    parser.add_argument("--salir-sin-trabajos", action="store_true",
+                        help="Terminar cuando la cola esté vacía en vez de esperar trabajos nuevos")
+    args = parser.parse_args()
+
+    store = SqliteJobStore(DatabaseManager(args.db))
+    worker = SendWorker(store, args.cuenta, node=args.nodo, min_interval=args.intervalo)
+    # Ctrl+C detiene el nodo de forma ordenada: las reservas sin enviar vuelven a la cola
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    worker.run(exit_when_idle=args.salir_sin_trabajos)
+
+
+if __name__ == "__main__":
+    main()